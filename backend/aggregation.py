@@ -0,0 +1,119 @@
+import os
+import threading
+
+import numpy as np
+
+# Batches at or above this many rows are aggregated on Spark; smaller batches
+# stay in-process where the JVM round trip would dominate the groupBy itself.
+SPARK_ROW_THRESHOLD = int(os.getenv('SPARK_ROW_THRESHOLD', 100000))
+
+_spark = None
+_spark_lock = threading.Lock()
+
+
+def get_spark_session():
+    """Create the shared Spark session on first use"""
+    global _spark
+    if _spark is None:
+        with _spark_lock:
+            if _spark is None:
+                from pyspark.sql import SparkSession
+                _spark = SparkSession.builder \
+                    .appName("WalmartDeliveryOptimization") \
+                    .config("spark.sql.adaptive.enabled", "true") \
+                    .config("spark.sql.adaptive.coalescePartitions.enabled", "true") \
+                    .getOrCreate()
+    return _spark
+
+
+class PandasAggregationEngine:
+    """Vectorized per-cluster aggregation for normal-sized batches"""
+    name = 'pandas'
+
+    def aggregate(self, clustered_orders):
+        cluster_ids = clustered_orders['cluster_id'].to_numpy()
+        uniques, inverse = np.unique(cluster_ids, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(uniques))
+
+        def cluster_sum(column):
+            values = clustered_orders[column].to_numpy(dtype=np.float64)
+            return np.bincount(inverse, weights=values, minlength=len(uniques))
+
+        sum_lat = cluster_sum('latitude')
+        sum_lon = cluster_sum('longitude')
+        total_volume = cluster_sum('volume')
+        total_weight = cluster_sum('weight')
+
+        # Stable sort keeps order_ids in their original batch order per cluster
+        order = np.argsort(inverse, kind='stable')
+        order_ids = clustered_orders['order_id'].to_numpy()[order]
+        splits = np.split(order_ids, np.cumsum(counts)[:-1])
+
+        return [
+            {
+                'cluster_id': int(uniques[i]),
+                'order_count': int(counts[i]),
+                'centroid_lat': float(sum_lat[i] / counts[i]),
+                'centroid_lon': float(sum_lon[i] / counts[i]),
+                'total_volume': float(total_volume[i]),
+                'total_weight': float(total_weight[i]),
+                'order_ids': splits[i].tolist()
+            }
+            for i in range(len(uniques))
+        ]
+
+
+class SparkAggregationEngine:
+    """Spark groupBy aggregation for batches too large to handle in-process"""
+    name = 'spark'
+
+    def aggregate(self, clustered_orders):
+        from pyspark.sql import functions as F
+
+        spark = get_spark_session()
+        columns = ['cluster_id', 'order_id', 'latitude', 'longitude', 'volume', 'weight']
+        # collect_list has no ordering guarantee across partitions, so carry each row's batch position
+        frame = clustered_orders[columns].assign(position=np.arange(len(clustered_orders)))
+        spark_df = spark.createDataFrame(frame)
+
+        route_metrics = spark_df.groupBy('cluster_id').agg(
+            F.count('order_id').alias('order_count'),
+            F.avg('latitude').alias('centroid_lat'),
+            F.avg('longitude').alias('centroid_lon'),
+            F.sum('volume').alias('total_volume'),
+            F.sum('weight').alias('total_weight'),
+            F.array_sort(F.collect_list(F.struct('position', 'order_id'))).getField('order_id').alias('order_ids')
+        ).orderBy('cluster_id').collect()
+
+        return [
+            {
+                'cluster_id': int(route['cluster_id']),
+                'order_count': int(route['order_count']),
+                'centroid_lat': float(route['centroid_lat']),
+                'centroid_lon': float(route['centroid_lon']),
+                'total_volume': float(route['total_volume']),
+                'total_weight': float(route['total_weight']),
+                'order_ids': list(route['order_ids'])
+            }
+            for route in route_metrics
+        ]
+
+
+class AggregationBackend:
+    """Pick the aggregation engine for a batch based on its size"""
+
+    def __init__(self, spark_threshold=SPARK_ROW_THRESHOLD):
+        self.spark_threshold = spark_threshold
+        self.pandas_engine = PandasAggregationEngine()
+        self.spark_engine = SparkAggregationEngine()
+
+    def engine_for(self, clustered_orders):
+        if self.spark_threshold and len(clustered_orders) >= self.spark_threshold:
+            return self.spark_engine
+        return self.pandas_engine
+
+    def aggregate(self, clustered_orders):
+        """Return one metrics dict per cluster, sorted by cluster_id"""
+        if len(clustered_orders) == 0:
+            return []
+        return self.engine_for(clustered_orders).aggregate(clustered_orders)
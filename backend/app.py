@@ -1,62 +1,143 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import pika
 import json
 import threading
 import time
 import os
+from collections import Counter
 from datetime import datetime
 import uuid
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import *
-from pyspark.sql.types import *
 import pandas as pd
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
+from aggregation import AggregationBackend
+from routing import RouteBuilder
+from spatial_index import DriverIndex, OrderIndex
+from multihop import DeliveryNetwork
+from snapshot import SnapshotPublisher
+from state_store import SECTION_KEYS, StateStore
+from publisher import QUEUES, PublisherPool, PublisherUnavailable
+from batch_decoder import decode_order_batch
+from transport import QueueFull, decode_json, make_transport
+from tracking import TrackStore, tracking_columns
+from fleet_state import FleetState
+from persistence import StatePersistence
+from route_jobs import JOB_COLUMNS, RouteJobEngine, normalize_parameters
+from route_memo import ClusterRouteMemo, order_set_digest
+from assignment import DRIVER_COLUMNS, DriverAssigner
+from eta import ETAEngine, local_clock
+from scheduling import TIME_WINDOWS, clock, drivers_per_window, requested_windows, schedule_report, schedule_routes
+from compact_store import ORDER_SCHEMA
+from lru_cache import LRUCache
+from concurrent_consumer import ConcurrentConsumer, StageStats
+from metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, SIZE_BUCKETS, SamplingProfiler
+from clustering import CLUSTER_FEATURES, HierarchicalClusterer, IncrementalClusterer, cluster_count
 
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Initialize Spark Session
-spark = SparkSession.builder \
-    .appName("WalmartDeliveryOptimization") \
-    .config("spark.sql.adaptive.enabled", "true") \
-    .config("spark.sql.adaptive.coalescePartitions.enabled", "true") \
-    .getOrCreate()
-
 # RabbitMQ Configuration
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST', 'localhost')
 RABBITMQ_PORT = int(os.getenv('RABBITMQ_PORT', 5672))
 RABBITMQ_USER = os.getenv('RABBITMQ_USER', 'admin')
 RABBITMQ_PASS = os.getenv('RABBITMQ_PASS', 'admin123')
 
-# Global variables for storing processed data
+# 'batch' refits KMeans for every batch, 'incremental' warm-starts across batches,
+# 'hierarchical' partitions by grid cell and time slot and clusters in a process pool
+CLUSTERING_MODE = os.getenv('CLUSTERING_MODE', 'incremental')
+# Batches this large always use hierarchical clustering
+HIERARCHICAL_MIN_ORDERS = int(os.getenv('HIERARCHICAL_MIN_ORDERS', 5000))
+
+# 'incremental' reuses memoized routes of unchanged clusters and repairs slightly changed
+# ones from their previous sequence; 'full' solves every cluster of every batch from scratch.
+# Repairs give way to a full solve once this share of a cluster's stops changed since its last one.
+ORDER_PLANNING = os.getenv('ORDER_PLANNING', 'incremental')
+ROUTE_MEMO_SIZE = int(os.getenv('ROUTE_MEMO_SIZE', 512))
+ROUTE_REPAIR_FRACTION = float(os.getenv('ROUTE_REPAIR_FRACTION', 0.2))
+
+# Message transport: 'rabbitmq', or 'memory' to run the data processor in this
+# process and pass messages as Python objects through bounded in-memory queues
+TRANSPORT = os.getenv('TRANSPORT', 'rabbitmq')
+MEMORY_QUEUE_SIZE = int(os.getenv('MEMORY_QUEUE_SIZE', 10000))
+DATA_PROCESSOR_DIR = os.getenv('DATA_PROCESSOR_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data-processor'))
+
+# Shared publisher: long-lived connections reused by every request and consumer thread
+PUBLISHER_POOL_SIZE = int(os.getenv('PUBLISHER_POOL_SIZE', 4))
+PUBLISHER_CONFIRMS = os.getenv('PUBLISHER_CONFIRMS', 'false').lower() == 'true'
+
+# Order batch consumer: prefetch window, worker pool size and kind ('thread' or 'process')
+ORDER_PREFETCH = int(os.getenv('ORDER_PREFETCH', 8))
+ORDER_WORKERS = int(os.getenv('ORDER_WORKERS', 4))
+ORDER_WORKER_MODE = os.getenv('ORDER_WORKER_MODE', 'thread')
+ORDER_APPLY_IN_ORDER = os.getenv('ORDER_APPLY_IN_ORDER', 'true').lower() == 'true'
+
+# Tracking: points kept per route, how often updates are coalesced into one emit, and prefetch
+TRACKING_HISTORY_POINTS = int(os.getenv('TRACKING_HISTORY_POINTS', 600))
+TRACKING_EMIT_INTERVAL = float(os.getenv('TRACKING_EMIT_INTERVAL', 1.0))
+TRACKING_PREFETCH = int(os.getenv('TRACKING_PREFETCH', 64))
+
+# Warm restart: snapshot + change log directory (empty disables persistence), how often
+# to snapshot, and how much log may accumulate before a snapshot is taken early
+STATE_DIR = os.getenv('STATE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'state'))
+SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', 60))
+SNAPSHOT_LOG_MB = float(os.getenv('SNAPSHOT_LOG_MB', 64))
+
+# Route-optimization jobs: solver processes, cached results and job records kept
+ROUTE_JOB_WORKERS = int(os.getenv('ROUTE_JOB_WORKERS', 2))
+ROUTE_RESULT_CACHE_SIZE = int(os.getenv('ROUTE_RESULT_CACHE_SIZE', 128))
+ROUTE_JOB_HISTORY = int(os.getenv('ROUTE_JOB_HISTORY', 1000))
+
+# How often queue depths are read from the transport for the queue_depth_messages gauge
+QUEUE_DEPTH_INTERVAL = float(os.getenv('QUEUE_DEPTH_INTERVAL', 5))
+
+# Stack sampling interval of the profiler toggled through /api/profiler; each sample of
+# every thread's stack takes about 0.2 ms, so 20 ms keeps it near 1% of one core
+PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', 20))
+
+# Agent workflow records kept for GET /api/agent-workflow/<id>
+AGENT_WORKFLOW_HISTORY = int(os.getenv('AGENT_WORKFLOW_HISTORY', 1000))
+
+# Global variables for storing processed data; orders and drivers live in fleet_state
 delivery_data = {
-    'orders': [],
     'clusters': [],
     'routes': [],
-    'drivers': [],
     'stats': {},
-    'tracking': {}
+    'tracking': {},
+    'assignments': [],
+    'schedule': {}
 }
 
 class DeliveryOptimizer:
     def __init__(self):
         self.scaler = StandardScaler()
+        self.aggregation = AggregationBackend()
+        self.route_builder = RouteBuilder()
+        self.incremental_clusterer = IncrementalClusterer()
+        self.hierarchical_clusterer = HierarchicalClusterer()
+        self.route_memo = ClusterRouteMemo(ROUTE_MEMO_SIZE, ROUTE_REPAIR_FRACTION)
         
     def cluster_orders(self, orders_df):
         """Cluster orders based on location and time windows"""
         if len(orders_df) < 2:
             return orders_df
             
+        if CLUSTERING_MODE == 'hierarchical' or len(orders_df) >= HIERARCHICAL_MIN_ORDERS:
+            orders_df['cluster_id'] = self.hierarchical_clusterer.fit_predict(orders_df)
+            return orders_df
+            
+        if CLUSTERING_MODE == 'incremental':
+            orders_df['cluster_id'] = self.incremental_clusterer.fit_predict(orders_df)
+            return orders_df
+            
         # Prepare features for clustering
-        features = orders_df[['latitude', 'longitude', 'delivery_time_numeric']].values
+        features = self.scaler.fit_transform(orders_df[CLUSTER_FEATURES].values)
         
         # Determine optimal number of clusters
-        n_clusters = min(8, max(2, len(orders_df) // 6))
+        n_clusters = cluster_count(len(orders_df))
         
         # Perform clustering
         kmeans = KMeans(n_clusters=n_clusters, random_state=42)
@@ -65,23 +146,28 @@ class DeliveryOptimizer:
         orders_df['cluster_id'] = clusters
         return orders_df
     
-    def optimize_routes(self, clustered_orders):
-        """Optimize routes using Spark for parallel processing"""
-        # Convert to Spark DataFrame
-        spark_df = spark.createDataFrame(clustered_orders)
-        
+    def optimize_routes(self, clustered_orders, timings=None):
+        """Optimize routes, aggregating on Spark only for very large batches
+
+        Returns the routes, {cluster_id: signature of its orders} and how
+        many clusters were memoized, repaired or solved. The aggregation
+        time goes into timings, keyed by the engine that ran it.
+        """
         # Group by cluster and calculate route metrics
-        route_metrics = spark_df.groupBy('cluster_id').agg(
-            count('order_id').alias('order_count'),
-            avg('latitude').alias('centroid_lat'),
-            avg('longitude').alias('centroid_lon'),
-            sum('volume').alias('total_volume'),
-            sum('weight').alias('total_weight'),
-            collect_list('order_id').alias('order_ids')
-        ).collect()
+        start = time.perf_counter()
+        route_metrics = self.aggregation.aggregate(clustered_orders)
+        if timings is not None:
+            engine = self.aggregation.engine_for(clustered_orders).name
+            timings[f'aggregate_{engine}'] = time.perf_counter() - start
+        cluster_positions = clustered_orders.groupby('cluster_id', sort=False).indices
         
         optimized_routes = []
+        signatures = {}
+        outcomes = Counter()
         for route in route_metrics:
+            signature, vehicle_routes, outcome = self.build_vehicle_routes(
+                clustered_orders, cluster_positions[route['cluster_id']], route['cluster_id'])
+            outcomes[outcome] += 1
             route_dict = {
                 'cluster_id': f"CLU-{route['cluster_id']:02d}",
                 'centroid_lat': route['centroid_lat'],
@@ -90,232 +176,739 @@ class DeliveryOptimizer:
                 'total_volume': route['total_volume'],
                 'total_weight': route['total_weight'],
                 'order_ids': route['order_ids'],
-                'estimated_duration': self.calculate_route_duration(route),
-                'time_window': self.assign_time_window(route)
+                'stops': [stop for vehicle_route in vehicle_routes for stop in vehicle_route['stops']],
+                'distance_km': round(sum(r['distance_km'] for r in vehicle_routes), 3),
+                'vehicle_routes': vehicle_routes,
+                'estimated_duration': self.calculate_route_duration(vehicle_routes)
             }
             optimized_routes.append(route_dict)
+            signatures[route_dict['cluster_id']] = signature
         
-        return optimized_routes
+        return optimized_routes, signatures, outcomes
     
-    def calculate_route_duration(self, route):
-        """Calculate estimated route duration"""
-        base_time = 30  # Base time in minutes
-        time_per_order = 8  # Minutes per order
-        distance_factor = route['total_volume'] * 2  # Volume impact
-        
-        return int(base_time + (route['order_count'] * time_per_order) + distance_factor)
+    def build_vehicle_routes(self, clustered_orders, positions, label):
+        """Sequence one cluster's stops and split it into vehicle-sized routes
+
+        Returns (signature of the cluster's orders, vehicle routes, 'memo' | 'repaired' | 'solved').
+        """
+        cluster = clustered_orders.iloc[positions]
+        columns = (
+            cluster['order_id'].tolist(),
+            cluster['latitude'].to_numpy(),
+            cluster['longitude'].to_numpy(),
+            cluster['volume'].to_numpy(),
+            cluster['weight'].to_numpy()
+        )
+        if ORDER_PLANNING == 'incremental':
+            return self.route_memo.solve(label, *columns, self.route_builder)
+        return order_set_digest(columns[0], columns[1:]), self.route_builder.build(*columns), 'solved'
     
-    def assign_time_window(self, route):
-        """Assign optimal time window based on route characteristics"""
-        time_windows = [
-            '09:00-11:00', '11:00-13:00', '13:00-15:00',
-            '15:00-17:00', '17:00-19:00', '19:00-21:00'
-        ]
-        
-        # Simple assignment based on cluster_id
-        return time_windows[route['cluster_id'] % len(time_windows)]
+    def calculate_route_duration(self, vehicle_routes):
+        """Calculate estimated route duration from the sequenced stop distances"""
+        return int(sum(r['estimated_duration'] for r in vehicle_routes))
 
 optimizer = DeliveryOptimizer()
+fleet_state = FleetState()
+driver_index = DriverIndex(resolve=fleet_state.driver_records, source=fleet_state.available_drivers)
+order_index = OrderIndex(resolve=fleet_state.order_records)
+delivery_network = DeliveryNetwork.load()
+state_store = StateStore()
 
-def get_rabbitmq_connection():
-    """Establish RabbitMQ connection"""
-    try:
-        credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=credentials)
-        )
-        return connection
-    except Exception as e:
-        print(f"Failed to connect to RabbitMQ: {e}")
-        return None
+def dashboard_sections():
+    """delivery_data plus the order and driver sections, taken already encoded from the state store"""
+    return dict(orders=state_store.section_json('orders'), drivers=state_store.section_json('drivers'), **delivery_data)
+
+dashboard_snapshots = SnapshotPublisher(dashboard_sections())
+persistence = StatePersistence(STATE_DIR, state_store, fleet_state, SNAPSHOT_INTERVAL,
+                               int(SNAPSHOT_LOG_MB * 2**20)) if STATE_DIR else None
+
+QUEUE_LAG = REGISTRY.histogram('pipeline_queue_lag_seconds', 'Time from publish to the start of processing',
+                               ('queue',))
+PRODUCER_SECONDS = REGISTRY.histogram('producer_publish_seconds',
+                                      'Data processor time to generate, encode and publish a message',
+                                      ('queue', 'stage'))
+PUBLISH_SECONDS = REGISTRY.histogram('state_publish_seconds', 'Time to diff a state section and emit its delta',
+                                     ('section',))
+FANOUT = REGISTRY.histogram('socket_fanout_clients', 'Clients each state delta is emitted to', ('section',),
+                            buckets=SIZE_BUCKETS)
+EMIT_BYTES = REGISTRY.counter('socket_emit_bytes_total', 'Bytes of state deltas sent, counting every client',
+                              ('section',))
+
+def room_size(room):
+    return len(socketio.server.manager.rooms.get('/', {}).get(room, ()))
+
+def emit_delta(section, encoded):
+    """Emit an encoded delta to a section's room, recording how many clients it went to"""
+    socketio.emit('state_delta', encoded, to=section)
+    clients = room_size(section)
+    FANOUT.observe(clients, section=section)
+    EMIT_BYTES.inc(len(encoded) * clients, section=section)
+
+def publish_state(section, records):
+    """Diff a section against the state store and emit the delta to that section's room"""
+    start = time.perf_counter()
+    encoded = state_store.replace(section, records)
+    if encoded is not None:
+        emit_delta(section, encoded)
+    PUBLISH_SECONDS.observe(time.perf_counter() - start, section=section)
+
+def publish_upsert(section, records, removed_keys=()):
+    """Merge records into a section, drop removed_keys, and emit only those as a delta"""
+    start = time.perf_counter()
+    encoded = state_store.upsert(section, records, removed_keys)
+    if encoded is not None:
+        emit_delta(section, encoded)
+    PUBLISH_SECONDS.observe(time.perf_counter() - start, section=section)
+
+def get_connection_parameters():
+    """Connection parameters shared by consumers and the publisher pool"""
+    credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
+    return pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=credentials)
+
+publisher = PublisherPool(
+    get_connection_parameters(),
+    size=PUBLISHER_POOL_SIZE,
+    confirms=PUBLISHER_CONFIRMS
+)
+
+transport = make_transport(TRANSPORT, get_connection_parameters(), publisher, maxsize=MEMORY_QUEUE_SIZE)
 
 def setup_rabbitmq_queues():
-    """Setup RabbitMQ queues"""
-    connection = get_rabbitmq_connection()
-    if connection:
-        channel = connection.channel()
-        
-        # Declare queues
-        channel.queue_declare(queue='order_data', durable=True)
-        channel.queue_declare(queue='route_optimization', durable=True)
-        channel.queue_declare(queue='driver_updates', durable=True)
-        channel.queue_declare(queue='tracking_updates', durable=True)
-        
-        connection.close()
+    """Setup RabbitMQ queues and the shared publisher"""
+    try:
+        transport.start()
+    except PublisherUnavailable as e:
+        print(e)
 
-def consume_order_data():
-    """Consume order data from RabbitMQ"""
-    connection = get_rabbitmq_connection()
-    if not connection:
-        return
-        
-    channel = connection.channel()
+# Delivery-time slots mapped to an ordinal for clustering
+TIME_SLOT_NUMERIC = {window: i + 1 for i, window in enumerate(TIME_WINDOWS)}
+
+def plan_order_batch(body, content_type=None):
+    """Decode, cluster and optimize one order batch; runs in a worker thread or process"""
+    timings = {}
+    received_at = time.time()
+    start = time.perf_counter()
+    metadata, orders_df = decode_order_batch(body, content_type)
+    timings['decode'] = time.perf_counter() - start
+    if orders_df is None:
+        return None, timings
     
-    def process_order_data(ch, method, properties, body):
-        try:
-            data = json.loads(body)
-            
-            # Process orders with Spark
-            if 'orders' in data:
-                orders_df = pd.DataFrame(data['orders'])
-                
-                # Add time numeric representation for clustering
-                time_mapping = {
-                    '09:00-11:00': 1, '11:00-13:00': 2, '13:00-15:00': 3,
-                    '15:00-17:00': 4, '17:00-19:00': 5, '19:00-21:00': 6
-                }
-                orders_df['delivery_time_numeric'] = orders_df['delivery_time_slot'].map(time_mapping)
-                
-                # Cluster orders
-                clustered_orders = optimizer.cluster_orders(orders_df)
-                
-                # Optimize routes
-                optimized_routes = optimizer.optimize_routes(clustered_orders)
-                
-                # Update global data
-                delivery_data['orders'] = clustered_orders.to_dict('records')
-                delivery_data['clusters'] = optimized_routes
-                
-                # Emit real-time updates
-                socketio.emit('data_update', {
-                    'type': 'orders_processed',
-                    'data': delivery_data
-                })
-                
-                print(f"Processed {len(orders_df)} orders into {len(optimized_routes)} routes")
-            
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            
-        except Exception as e:
-            print(f"Error processing order data: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+    start = time.perf_counter()
+    orders_df['delivery_time_numeric'] = orders_df['delivery_time_slot'].map(TIME_SLOT_NUMERIC).astype(np.float64)
+    timings['time_slots'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    clustered_orders = optimizer.cluster_orders(orders_df)
+    timings['cluster'] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    optimized_routes, signatures, outcomes = optimizer.optimize_routes(clustered_orders, timings)
+    timings['optimize'] = time.perf_counter() - start
+    
+    # Plain column arrays are what fleet_state stores, and cheap to pickle back from a process
+    start = time.perf_counter()
+    orders = {name: clustered_orders[name].to_numpy() for name in ORDER_SCHEMA if name in clustered_orders}
+    timings['to_columns'] = time.perf_counter() - start
+    
+    return {'orders': orders, 'clusters': optimized_routes, 'signatures': signatures,
+            'outcomes': dict(outcomes), 'sent_at': metadata.get('sent_at'), 'received_at': received_at}, timings
+
+def schedule_vehicle_routes(plan, routes):
+    """Book vehicle routes into delivery windows on the on-duty drivers and report the load per window
+
+    Sets time_window and the scheduled start and end on every route, None
+    when no driver had room, and gives each cluster the window most of its
+    routes start in.
+    """
+    start = time.perf_counter()
+    durations = [route['estimated_duration'] for route in routes]
+    route_stops = [route['stops'] for route in routes]
+    requested = requested_windows(route_stops, plan['orders']['order_id'], plan['orders']['delivery_time_numeric'])
+    window_drivers = drivers_per_window(fleet_state.on_duty_drivers())
+    windows, starts = schedule_routes(durations, requested, window_drivers)
+    
+    cluster_windows = {}
+    for route, window, begin, duration in zip(routes, windows.tolist(), starts.tolist(), durations):
+        if window < 0:
+            route.update(time_window=None, scheduled_start=None, scheduled_end=None)
+            continue
+        route.update(time_window=TIME_WINDOWS[window], scheduled_start=clock(begin),
+                     scheduled_end=clock(begin + duration))
+        cluster_windows.setdefault(route['cluster_id'], Counter())[route['time_window']] += 1
+    for cluster in plan['clusters']:
+        counts = cluster_windows.get(cluster['cluster_id'])
+        cluster['time_window'] = counts.most_common(1)[0][0] if counts else None
+    
+    report = schedule_report(durations, requested, window_drivers, windows, starts, route_stops)
+    report['seconds'] = round(time.perf_counter() - start, 4)
+    order_consumer.stats.record({'schedule': report['seconds']})
+    return report
+
+# Signature of every cluster as last applied, to tell which routes a batch changed
+applied_signatures = {}
+
+def apply_order_batch(plan):
+    """Publish a planned batch to the shared state and connected clients
+
+    Batches are applied one at a time and in order, so the order diff and
+    the changed clusters are relative to what clients currently hold.
+    """
+    start = time.perf_counter()
+    record_queue_lag('order_data', plan.get('sent_at'), plan.get('received_at'))
+    order_changes = fleet_state.replace_orders(plan['orders'])
+    changed_clusters = [cluster_id for cluster_id, signature in plan['signatures'].items()
+                        if applied_signatures.get(cluster_id) != signature]
+    removed_clusters = [cluster_id for cluster_id in applied_signatures if cluster_id not in plan['signatures']]
+    applied_signatures.clear()
+    applied_signatures.update(plan['signatures'])
+    order_index.update(*fleet_state.open_orders())
+    delivery_data['clusters'] = plan['clusters']
+    delivery_data['routes'] = [
+        dict(vehicle_route, cluster_id=route['cluster_id'], route_id=f"{route['cluster_id']}-{i + 1}")
+        for route in plan['clusters']
+        for i, vehicle_route in enumerate(route['vehicle_routes'])
+    ]
+    delivery_data['schedule'] = schedule_vehicle_routes(plan, delivery_data['routes'])
+    fleet_state.set_active_clusters(len(plan['clusters']))
+    delivery_data['stats'] = fleet_state.stats()
+    order_consumer.stats.record({'apply_state': time.perf_counter() - start})
     
-    channel.basic_consume(queue='order_data', on_message_callback=process_order_data)
+    # Emit real-time updates; only orders that were added, changed or removed are re-encoded
+    start = time.perf_counter()
+    publish_upsert('orders', fleet_state.order_records(order_changes['added'] + order_changes['changed']),
+                   order_changes['removed'])
+    publish_state('clusters', delivery_data['clusters'])
+    publish_state('routes', delivery_data['routes'])
+    publish_state('schedule', delivery_data['schedule'])
+    publish_state('stats', delivery_data['stats'])
+    dashboard_snapshots.publish(dashboard_sections())
+    order_consumer.stats.record({'apply_emit': time.perf_counter() - start})
+    assignment_due.set()
+    record_end_to_end(order_consumer.stats, plan.get('sent_at'))
+    for outcome, count in plan['outcomes'].items():
+        order_consumer.stats.count(f'clusters_{outcome}', count)
     
+    print(f"Processed {len(plan['orders']['order_id'])} orders into {len(plan['clusters'])} routes: "
+          f"orders +{len(order_changes['added'])} ~{len(order_changes['changed'])} -{len(order_changes['removed'])}, "
+          f"changed clusters {changed_clusters or 'none'}, removed {removed_clusters or 'none'}, "
+          f"unscheduled orders {delivery_data['schedule']['unscheduled_orders']}")
+
+# Process mode gives every worker its own optimizer, so incremental clustering
+# state and the route memo are per worker; prefer CLUSTERING_MODE=batch or
+# hierarchical with it.
+order_consumer = ConcurrentConsumer(
+    'order_data',
+    plan_order_batch,
+    apply_order_batch,
+    workers=ORDER_WORKERS,
+    mode=ORDER_WORKER_MODE,
+    prefetch=ORDER_PREFETCH,
+    ordered=ORDER_APPLY_IN_ORDER
+)
+driver_stats = StageStats('driver_updates')
+route_jobs = RouteJobEngine(
+    workers=ROUTE_JOB_WORKERS,
+    cache_size=ROUTE_RESULT_CACHE_SIZE,
+    history=ROUTE_JOB_HISTORY,
+    on_update=lambda job: socketio.emit('optimization_job', job, to=f"job:{job['job_id']}")
+)
+tracking_stats = StageStats('tracking_updates')
+driver_assigner = DriverAssigner()
+# Set by route and driver changes; the assignment thread coalesces bursts of them into one run
+assignment_due = threading.Event()
+# Set by frequent small updates; the tracking emitter rebuilds the dashboard snapshot once per tick
+snapshot_due = threading.Event()
+assignment_rebalance = threading.Event()
+agent_stats = StageStats('agent_results')
+agent_workflows = LRUCache(AGENT_WORKFLOW_HISTORY)
+track_store = TrackStore(capacity=TRACKING_HISTORY_POINTS)
+eta_engine = ETAEngine()
+profiler = SamplingProfiler(PROFILER_INTERVAL_MS / 1000)
+
+# Latest sampled depth per queue; scrapes read this rather than wait on a broker that may be down
+queue_depths = {}
+
+def sample_queue_depths():
+    """Read every queue's depth in the background; queues that cannot be read drop out of the gauge"""
+    while not transport.closed:
+        for queue in QUEUES:
+            try:
+                queue_depths[(queue,)] = transport.queue_depth(queue)
+            except Exception:
+                queue_depths.pop((queue,), None)
+        time.sleep(QUEUE_DEPTH_INTERVAL)
+
+REGISTRY.gauge('queue_depth_messages', 'Messages waiting in each queue', ('queue',),
+               collect=lambda: dict(queue_depths))
+
+def consume_order_data():
+    """Consume order data from RabbitMQ"""
     print("Starting to consume order data...")
-    channel.start_consuming()
+    order_consumer.run(transport)
+
+def record_end_to_end(stats, sent_at):
+    """Publish-to-emit latency for messages stamped by the data processor's load generator"""
+    if sent_at is not None:
+        stats.record({'end_to_end': time.time() - sent_at})
+
+def record_queue_lag(queue, sent_at, received_at=None):
+    """Publish-to-processing lag of a message stamped with the data processor's sent_at"""
+    if sent_at is not None:
+        QUEUE_LAG.observe(max(0.0, (received_at or time.time()) - sent_at), queue=queue)
+
+def record_producer_timings(queue, timings):
+    """Publish-path stage times reported by an embedded data processor"""
+    for stage, seconds in timings.items():
+        PRODUCER_SECONDS.observe(seconds, queue=queue, stage=stage)
 
 def consume_driver_updates():
     """Consume driver updates from RabbitMQ"""
-    connection = get_rabbitmq_connection()
-    if not connection:
-        return
-        
-    channel = connection.channel()
-    
-    def process_driver_update(ch, method, properties, body):
+    def process_driver_update(delivery):
         try:
-            data = json.loads(body)
+            received_at = time.time()
+            received = time.perf_counter()
+            data = decode_json(delivery.body)
+            timings = {'decode': time.perf_counter() - received}
+            record_queue_lag('driver_updates', data.get('sent_at'), received_at)
             
             if 'drivers' in data:
-                delivery_data['drivers'] = data['drivers']
-                
-                # Calculate stats
-                delivery_data['stats'] = {
-                    'total_drivers': len(data['drivers']),
-                    'available_drivers': len([d for d in data['drivers'] if d['status'] == 'Available']),
-                    'active_routes': len([d for d in data['drivers'] if d['status'] == 'On Route']),
-                    'pending_orders': len([o for o in delivery_data['orders'] if o.get('status') == 'Pending']),
-                    'completed_deliveries': np.random.randint(200, 300),
-                    'avg_delivery_time': np.random.randint(25, 35),
-                    'efficiency_score': np.random.randint(80, 95)
-                }
+                # Drivers not in this message keep their last known state
+                start = time.perf_counter()
+                fleet_state.upsert_drivers(data['drivers'])
+                driver_index.invalidate()
+                delivery_data['stats'] = fleet_state.stats()
+                timings['state'] = time.perf_counter() - start
                 
                 # Emit real-time updates
-                socketio.emit('data_update', {
-                    'type': 'driver_update',
-                    'data': delivery_data
-                })
+                start = time.perf_counter()
+                publish_upsert('drivers', data['drivers'])
+                publish_state('stats', delivery_data['stats'])
+                snapshot_due.set()
+                timings['emit'] = time.perf_counter() - start
+                assignment_due.set()
+                record_end_to_end(driver_stats, data.get('sent_at'))
             
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            delivery.ack()
+            timings['total'] = time.perf_counter() - received
+            driver_stats.record(timings)
+            driver_stats.count('acked')
             
         except Exception as e:
             print(f"Error processing driver update: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            driver_stats.count('failed')
+            delivery.nack(requeue=False)
+    
+    transport.consume('driver_updates', process_driver_update)
+
+def consume_tracking_updates():
+    """Consume vehicle tracking points into the per-route ring buffers"""
+    def process_tracking_update(delivery):
+        try:
+            received_at = time.time()
+            received = time.perf_counter()
+            data = decode_json(delivery.body)
+            record_queue_lag('tracking_updates', data.get('sent_at'), received_at)
+            if 'tracking_data' in data:
+                columns = tracking_columns(data['tracking_data'], data.get('sent_at') or time.time())
+                track_store.ingest(columns)
+                eta_engine.grid.observe(columns['latitude'], columns['longitude'], columns['speed'],
+                                        columns['timestamp'])
+            delivery.ack()
+            tracking_stats.record({'ingest': time.perf_counter() - received})
+            tracking_stats.count('acked')
+        except Exception as e:
+            print(f"Error processing tracking update: {e}")
+            tracking_stats.count('failed')
+            delivery.nack(requeue=False)
     
-    channel.basic_consume(queue='driver_updates', on_message_callback=process_driver_update)
-    channel.start_consuming()
+    transport.consume('tracking_updates', process_tracking_update, prefetch=TRACKING_PREFETCH)
+
+def optimization_orders(data):
+    """Job columns for a submission's explicit orders, its order_ids, or all open orders"""
+    if data.get('orders'):
+        orders_df = pd.DataFrame(data['orders'])
+        if 'delivery_time_numeric' not in orders_df:
+            orders_df['delivery_time_numeric'] = orders_df['delivery_time_slot'].map(TIME_SLOT_NUMERIC)
+        orders_df['order_id'] = orders_df['order_id'].astype(str)
+        return {name: orders_df[name].to_numpy() for name in JOB_COLUMNS}
+    return fleet_state.order_columns(JOB_COLUMNS, data.get('order_ids'))
+
+def consume_route_optimization():
+    """Turn route_optimization messages into solver jobs"""
+    def process_route_optimization(delivery):
+        job_id = None
+        try:
+            message = decode_json(delivery.body)
+            job_id = message.get('job_id')
+            data = message.get('data') or {}
+            route_jobs.run(job_id, optimization_orders(data), normalize_parameters(data.get('parameters')))
+            delivery.ack()
+        except Exception as e:
+            print(f"Error processing route optimization: {e}")
+            if job_id:
+                route_jobs.fail_job(job_id, e)
+            delivery.nack(requeue=False)
+    
+    transport.consume('route_optimization', process_route_optimization)
+
+def consume_agent_results():
+    """Record finished agent workflows and emit them to clients"""
+    def process_agent_result(delivery):
+        try:
+            results = decode_json(delivery.body)
+            agent_workflows.put(results['workflow_id'], results)
+            agent_stats.record({'workflow': results['latency_seconds'],
+                                'critical_path': results['critical_path_seconds']})
+            record_end_to_end(agent_stats, results.get('requested_at'))
+            agent_stats.count(results['status'])
+            socketio.emit('agent_workflow', results)
+            delivery.ack()
+            agent_stats.count('acked')
+        except Exception as e:
+            print(f"Error processing agent results: {e}")
+            delivery.nack(requeue=False)
+    
+    transport.consume('agent_results', process_agent_result, prefetch=32)
+
+def run_assignments():
+    """Re-match routes to available drivers whenever routes or drivers changed, publishing what moved"""
+    while not transport.closed:
+        if not assignment_due.wait(1.0):
+            continue
+        assignment_due.clear()
+        try:
+            rebalance = assignment_rebalance.is_set()
+            assignment_rebalance.clear()
+            # Routes restored from before centroids were recorded wait for the next order batch
+            routes = [route for route in delivery_data['routes'] if 'centroid_lat' in route]
+            drivers = fleet_state.available_driver_columns(DRIVER_COLUMNS)
+            delivery_data['assignments'] = driver_assigner.assign(routes, drivers, rebalance)
+            publish_state('assignments', delivery_data['assignments'])
+            dashboard_snapshots.publish(dashboard_sections())
+        except Exception as e:
+            print(f"Error assigning routes to drivers: {e}")
+
+def tracked_route_etas(records, departure):
+    """ETAs of the remaining stops of tracked routes, from their latest positions
+
+    A planned route is timed from its tracked next_delivery on, or from the
+    stop its progress has reached; a route that is not planned is timed to
+    its next_delivery alone. Returns ({route_id: minutes per stop}, {route_id:
+    the stop IDs those are for}); stops whose orders are unknown are left out.
+    """
+    planned = {route['route_id']: route['stops'] for route in delivery_data['routes']}
+    stop_ids = {}
+    for record in records:
+        stops = planned.get(record['route_id'])
+        if stops is None and record.get('next_delivery'):
+            stops = [record['next_delivery']]
+        if stops:
+            stop_ids[record['route_id']] = stops
+    columns = fleet_state.order_columns(['order_id', 'latitude', 'longitude'],
+                                        {stop for stops in stop_ids.values() for stop in stops})
+    positions = {order_id: i for i, order_id in enumerate(columns['order_id'].tolist())}
+    
+    requests, known_stops = [], {}
+    for record in records:
+        known = [stop for stop in stop_ids.get(record['route_id'], ()) if stop in positions]
+        if not known:
+            continue
+        rows = np.array([positions[stop] for stop in known], dtype=np.intp)
+        if record.get('next_delivery') in known:
+            next_stop = known.index(record['next_delivery'])
+        else:
+            next_stop = min(int((record.get('progress') or 0) * len(known)), len(known) - 1)
+        requests.append({'route_id': record['route_id'], 'latitude': record['latitude'],
+                         'longitude': record['longitude'], 'stop_lat': columns['latitude'][rows],
+                         'stop_lon': columns['longitude'][rows], 'next_stop': next_stop})
+        known_stops[record['route_id']] = known[next_stop:]
+    return eta_engine.estimate(requests, departure), known_stops
+
+def emit_tracking_updates():
+    """Once per tick, send the latest point of every route that moved as a single delta
+
+    Each point carries the estimated arrival at the route's next stop and at
+    its last one, timed on the travel-time grid from where the vehicle is.
+    The dashboard snapshot is rebuilt here too, once for all the tracking and
+    driver updates of the tick.
+    """
+    while not transport.closed:
+        time.sleep(TRACKING_EMIT_INTERVAL)
+        try:
+            eta_engine.grid.refresh()
+            records = track_store.drain_dirty()
+            if records:
+                emit_tracking_records(records)
+                snapshot_due.set()
+            if snapshot_due.is_set():
+                # Cleared first, so an update arriving mid-build is picked up next tick
+                snapshot_due.clear()
+                dashboard_snapshots.publish(dashboard_sections())
+        except Exception as e:
+            print(f"Error emitting tracking updates: {e}")
+
+def emit_tracking_records(records):
+    """Add ETAs to the latest tracking records and publish them"""
+    now = time.time()
+    etas, _ = tracked_route_etas(records, now)
+    for record in records:
+        minutes = etas.get(record['route_id'])
+        if minutes is not None:
+            record.update(eta=local_clock(now + minutes[0] * 60), eta_minutes=round(float(minutes[0]), 1),
+                          route_completion=local_clock(now + minutes[-1] * 60))
+    # Routes that did not move keep the point and ETAs they were last emitted with
+    delivery_data['tracking'] = dict(delivery_data['tracking'],
+                                     **{record['route_id']: record for record in records})
+    publish_upsert('tracking', records)
 
 # API Routes
 @app.route('/api/dashboard-data', methods=['GET'])
 def get_dashboard_data():
-    """Get current dashboard data"""
-    return jsonify(delivery_data)
+    """Get current dashboard data from the latest pre-encoded snapshot"""
+    sections = request.args.get('sections')
+    snapshot = dashboard_snapshots.current()
+    body, gzipped, etag = snapshot.render(sections.split(',') if sections else None)
+    
+    use_gzip = request.accept_encodings['gzip'] > 0
+    if use_gzip:
+        etag += '-gz'
+    headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+        body = gzipped
+    return Response(body, mimetype='application/json', headers=headers)
+
+@app.route('/api/pipeline-stats', methods=['GET'])
+def get_pipeline_stats():
+    """Queue-drain rate and per-stage latency of the consumers"""
+    return jsonify({
+        'order_data': order_consumer.stats.summary(),
+        'driver_updates': driver_stats.summary(),
+        'tracking_updates': tracking_stats.summary(),
+        'route_optimization': route_jobs.summary(),
+        'agent_results': agent_stats.summary(),
+        'assignments': driver_assigner.summary(),
+        'eta': eta_engine.summary()
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Stage latencies, queue lag, fan-out and consumer counters in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route('/api/profiler', methods=['GET'])
+def get_profiler():
+    """Most sampled functions, or every collapsed stack with ?format=collapsed for flame graphs"""
+    if request.args.get('format') == 'collapsed':
+        return Response(profiler.collapsed(), mimetype='text/plain')
+    return jsonify({'status': 'success', 'profiler': profiler.report(int(request.args.get('limit', 25)))})
+
+@app.route('/api/profiler', methods=['POST'])
+def toggle_profiler():
+    """Start or stop the sampling profiler; body: enabled, optional interval_ms and reset"""
+    data = request.get_json(silent=True) or {}
+    try:
+        interval = float(data['interval_ms']) / 1000 if 'interval_ms' in data else None
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'interval_ms must be a number'}), 400
+    if interval is not None and interval <= 0:
+        return jsonify({'status': 'error', 'message': 'interval_ms must be positive'}), 400
+    if data.get('reset'):
+        profiler.reset()
+    if data.get('enabled'):
+        profiler.start(interval)
+    elif 'enabled' in data:
+        profiler.stop()
+    return jsonify({'status': 'success', 'profiler': profiler.report()})
+
+@app.route('/api/assignments', methods=['GET'])
+def get_assignments():
+    """Current route-to-driver assignments and how the last run went"""
+    return jsonify({'status': 'success', 'assignments': delivery_data['assignments'],
+                    'summary': driver_assigner.summary()})
+
+@app.route('/api/assignments/rebalance', methods=['POST'])
+def rebalance_assignments():
+    """Re-match every route from scratch on the next run instead of keeping valid assignments"""
+    assignment_rebalance.set()
+    assignment_due.set()
+    return jsonify({'status': 'success', 'message': 'Rebalance scheduled'}), 202
+
+@app.route('/api/schedule', methods=['GET'])
+def get_schedule():
+    """Per-window driver utilization and the orders the last batch could not schedule"""
+    return jsonify({'status': 'success', 'schedule': delivery_data['schedule']})
+
+@app.route('/api/drivers/nearest', methods=['GET'])
+def get_nearest_drivers():
+    """Find the nearest available drivers with enough remaining capacity"""
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        k = int(request.args.get('k', 5))
+        min_volume = float(request.args.get('min_volume', 0))
+        min_weight = float(request.args.get('min_weight', 0))
+    except (KeyError, ValueError):
+        return jsonify({'status': 'error', 'message': 'lat and lon are required numbers'}), 400
+    
+    matches = driver_index.nearest_available(lat, lon, k, min_volume, min_weight)
+    return jsonify({
+        'status': 'success',
+        'drivers': [dict(driver, distance_km=round(distance, 3)) for driver, distance in matches]
+    })
+
+@app.route('/api/orders/within', methods=['GET'])
+def get_orders_within():
+    """List open orders inside a bounding box given as min_lat,min_lon,max_lat,max_lon"""
+    try:
+        min_lat, min_lon, max_lat, max_lon = [float(v) for v in request.args['bbox'].split(',')]
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except (KeyError, ValueError):
+        return jsonify({'status': 'error', 'message': 'bbox must be min_lat,min_lon,max_lat,max_lon'}), 400
+    
+    orders = order_index.within(min_lat, min_lon, max_lat, max_lon, limit)
+    return jsonify({'status': 'success', 'count': len(orders), 'orders': orders})
+
+@app.route('/api/tracking/<route_id>', methods=['GET'])
+def get_route_track(route_id):
+    """Latest position and time-bucketed history of one route for the map"""
+    try:
+        bucket = float(request.args['bucket']) if 'bucket' in request.args else None
+        since = float(request.args['since']) if 'since' in request.args else None
+        max_points = int(request.args['max_points']) if 'max_points' in request.args else None
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'bucket, since and max_points must be numbers'}), 400
+    
+    track = track_store.track(route_id, bucket, since, max_points)
+    if track is None:
+        return jsonify({'status': 'error', 'message': f'No tracking data for route {route_id}'}), 404
+    return jsonify({'status': 'success', 'latest': track_store.latest(route_id), 'track': track})
+
+def eta_response(etas, departure, stop_ids=None):
+    """Per-route minutes and local arrival times for an /api/eta response"""
+    routes = {}
+    for route_id, minutes in etas.items():
+        routes[route_id] = {'eta_minutes': np.round(minutes, 1).tolist(),
+                            'arrivals': [local_clock(departure + m * 60) for m in minutes.tolist()]}
+        if stop_ids is not None:
+            routes[route_id]['stops'] = stop_ids[route_id]
+    return jsonify({'status': 'success', 'departure': departure, 'count': len(routes), 'routes': routes})
+
+@app.route('/api/eta', methods=['GET'])
+def get_route_etas():
+    """ETAs of the remaining stops of tracked routes (route_id: comma-separated, default all)"""
+    route_ids = request.args.get('route_id')
+    if route_ids:
+        records = [track_store.latest(route_id) for route_id in route_ids.split(',')]
+        records = [record for record in records if record is not None]
+    else:
+        records = track_store.latest_all()
+    departure = time.time()
+    etas, stop_ids = tracked_route_etas(records, departure)
+    return eta_response(etas, departure, stop_ids)
+
+@app.route('/api/eta', methods=['POST'])
+def estimate_etas():
+    """ETAs for a batch of routes given by coordinates
+
+    Body: 'routes', each with route_id, the vehicle's latitude and longitude,
+    'stops' as [[lat, lon], ...] and optional next_stop (default 0), plus an
+    optional epoch 'departure' (default now).
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        departure = float(data.get('departure') or time.time())
+        requests = []
+        for route in data['routes']:
+            stops = np.asarray(route['stops'], dtype=np.float64).reshape(-1, 2)
+            requests.append({'route_id': str(route['route_id']), 'latitude': float(route['latitude']),
+                             'longitude': float(route['longitude']), 'stop_lat': stops[:, 0].copy(),
+                             'stop_lon': stops[:, 1].copy(), 'next_stop': int(route.get('next_stop', 0))})
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'routes need route_id, latitude, longitude and stops '
+                                                       'as [[lat, lon], ...]'}), 400
+    return eta_response(eta_engine.estimate(requests, departure), departure)
 
 @app.route('/api/optimize-routes', methods=['POST'])
 def optimize_routes():
-    """Trigger route optimization"""
+    """Queue a route-optimization job for the given orders (default: all open orders)
+
+    Body: optional 'orders' (records) or 'order_ids', and 'parameters'
+    overriding the solver defaults. Returns the job, whose progress is also
+    pushed as 'optimization_job' events to clients in the job's room.
+    """
+    job = None
     try:
-        data = request.json
+        data = request.json or {}
+        normalize_parameters(data.get('parameters'))
+        job = route_jobs.create()
         
         # Send to RabbitMQ for processing
-        connection = get_rabbitmq_connection()
-        if connection:
-            channel = connection.channel()
-            
-            message = {
-                'type': 'route_optimization',
-                'data': data,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            channel.basic_publish(
-                exchange='',
-                routing_key='route_optimization',
-                body=json.dumps(message),
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
-            
-            connection.close()
-            
-            return jsonify({'status': 'success', 'message': 'Route optimization queued'})
-        else:
-            return jsonify({'status': 'error', 'message': 'Failed to connect to message queue'}), 500
-            
+        message = {
+            'type': 'route_optimization',
+            'job_id': job['job_id'],
+            'data': data,
+            'timestamp': datetime.now().isoformat()
+        }
+        transport.publish('route_optimization', message)
+        
+        return jsonify({'status': 'success', 'message': 'Route optimization queued', 'job': job}), 202
+        
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except (PublisherUnavailable, QueueFull) as e:
+        if job:
+            route_jobs.fail_job(job['job_id'], e)
+        return jsonify({'status': 'error', 'message': 'Failed to connect to message queue'}), 500
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/optimize-routes/<job_id>', methods=['GET'])
+def get_optimization_job(job_id):
+    """Status and progress of a route-optimization job"""
+    job = route_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job {job_id}'}), 404
+    return jsonify({'status': 'success', 'job': job})
+
+@app.route('/api/optimize-routes/<job_id>/result', methods=['GET'])
+def get_optimization_result(job_id):
+    """Optimized routes of a completed job; 202 while it is still queued or running"""
+    found = route_jobs.result(job_id)
+    if found is None:
+        return jsonify({'status': 'error', 'message': f'Unknown job {job_id}'}), 404
+    job, result = found
+    if job['status'] == 'failed':
+        return jsonify({'status': 'error', 'message': job.get('error'), 'job': job}), 500
+    if result is None:
+        return jsonify({'status': 'pending', 'job': job}), 202
+    return jsonify({'status': 'success', 'job': job, 'result': result})
+
 @app.route('/api/multi-hop-delivery', methods=['POST'])
 def multi_hop_delivery():
     """Handle multi-hop delivery planning"""
     try:
         data = request.json
         
-        # Process with Spark
-        packages = data.get('packages', 5)
+        packages = int(data.get('packages', 5))
         priority = data.get('priority', 'time')
         algorithm = data.get('algorithm', 'astar')
         
-        # Generate mock network data
-        network_data = {
-            'nodes': [
-                {'id': 'warehouse', 'type': 'warehouse', 'x': 50, 'y': 250},
-                {'id': 'hub1', 'type': 'hub', 'x': 200, 'y': 150},
-                {'id': 'hub2', 'type': 'hub', 'x': 200, 'y': 350},
-            ],
-            'packages': packages,
-            'optimized_routes': [],
-            'total_cost': np.random.uniform(50, 150),
-            'total_time': np.random.uniform(2, 8),
-            'total_distance': np.random.uniform(20, 100)
-        }
-        
-        # Add customer nodes
-        for i in range(min(packages, 10)):
-            network_data['nodes'].append({
-                'id': f'customer{i+1}',
-                'type': 'customer',
-                'x': 500 + (i % 4) * 80,
-                'y': 80 + (i // 4) * 70
-            })
+        network_data = delivery_network.plan(packages, priority, algorithm, data.get('source'))
         
+        # Sources with a precomputed shortest-path tree report 'tree' rather than the requested search
         return jsonify({
             'status': 'success',
             'network': network_data,
-            'algorithm': algorithm,
+            'algorithm': network_data['algorithm'],
             'priority': priority
         })
         
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
@@ -325,34 +918,37 @@ def trigger_agent_workflow():
     try:
         data = request.json
         
+        workflow_id = f'WF-{uuid.uuid4().hex}'
+        
         # Send to RabbitMQ for agent processing
-        connection = get_rabbitmq_connection()
-        if connection:
-            channel = connection.channel()
-            
-            message = {
-                'type': 'agent_workflow',
-                'workflow_type': data.get('workflow_type', 'delivery_planning'),
-                'data': data,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            channel.basic_publish(
-                exchange='',
-                routing_key='agent_workflow',
-                body=json.dumps(message),
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
-            
-            connection.close()
-            
-            return jsonify({'status': 'success', 'message': 'Agent workflow triggered'})
-        else:
-            return jsonify({'status': 'error', 'message': 'Failed to connect to message queue'}), 500
-            
+        message = {
+            'type': 'agent_workflow',
+            'workflow_id': workflow_id,
+            'workflow_type': data.get('workflow_type', 'delivery_planning'),
+            'data': data,
+            'timestamp': datetime.now().isoformat(),
+            'requested_at': time.time()
+        }
+        # Recorded first, so a result arriving right away is not overwritten
+        agent_workflows.put(workflow_id, {'workflow_id': workflow_id, 'type': message['workflow_type'],
+                                          'status': 'queued'})
+        transport.publish('agent_workflow', message)
+        
+        return jsonify({'status': 'success', 'message': 'Agent workflow triggered', 'workflow_id': workflow_id})
+        
+    except (PublisherUnavailable, QueueFull):
+        return jsonify({'status': 'error', 'message': 'Failed to connect to message queue'}), 500
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/agent-workflow/<workflow_id>', methods=['GET'])
+def get_agent_workflow(workflow_id):
+    """Status of an agent workflow, with every agent's result and timing once it has finished"""
+    workflow = agent_workflows.get(workflow_id)
+    if workflow is None:
+        return jsonify({'status': 'error', 'message': f'Unknown workflow {workflow_id}'}), 404
+    return jsonify({'status': 'success', 'workflow': workflow})
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
@@ -364,11 +960,35 @@ def handle_disconnect():
     """Handle client disconnection"""
     print('Client disconnected')
 
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Join section rooms and replay what the client missed since its last version"""
+    sections = [s for s in (data or {}).get('sections', list(SECTION_KEYS)) if s in SECTION_KEYS]
+    for section in sections:
+        join_room(section)
+    for encoded in state_store.resync(sections, (data or {}).get('version')):
+        emit('state_delta', encoded)
+
+@socketio.on('subscribe_job')
+def handle_subscribe_job(data):
+    """Follow a route-optimization job; the current state is sent at once in case it already finished"""
+    job_id = (data or {}).get('job_id')
+    job = route_jobs.get(job_id)
+    if job is not None:
+        join_room(f'job:{job_id}')
+        emit('optimization_job', job)
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    """Leave section rooms"""
+    for section in (data or {}).get('sections', []):
+        leave_room(section)
+
 def start_rabbitmq_consumers():
     """Start RabbitMQ consumers in separate threads"""
     
     def consumer_thread(consumer_func):
-        while True:
+        while not transport.closed:
             try:
                 consumer_func()
             except Exception as e:
@@ -378,13 +998,59 @@ def start_rabbitmq_consumers():
     # Start consumers
     threading.Thread(target=consumer_thread, args=(consume_order_data,), daemon=True).start()
     threading.Thread(target=consumer_thread, args=(consume_driver_updates,), daemon=True).start()
+    threading.Thread(target=consumer_thread, args=(consume_tracking_updates,), daemon=True).start()
+    threading.Thread(target=consumer_thread, args=(consume_route_optimization,), daemon=True).start()
+    threading.Thread(target=consumer_thread, args=(consume_agent_results,), daemon=True).start()
+    threading.Thread(target=emit_tracking_updates, daemon=True).start()
+    threading.Thread(target=run_assignments, daemon=True).start()
+    threading.Thread(target=sample_queue_depths, daemon=True).start()
+
+def restore_state():
+    """Reload the last snapshot and change log, rebuild derived state, then start persisting"""
+    if persistence is None:
+        return
+    start = time.perf_counter()
+    try:
+        version = persistence.restore()
+    except Exception as e:
+        print(f"Could not restore state from {STATE_DIR}: {e}")
+        version = None
+    if version is not None:
+        for section in ('clusters', 'routes', 'stats', 'assignments', 'schedule'):
+            delivery_data[section] = json.loads(state_store.section_json(section))
+        driver_assigner.restore(delivery_data['assignments'])
+        delivery_data['tracking'] = {record['route_id']: record
+                                     for record in json.loads(state_store.section_json('tracking'))}
+        fleet_state.set_active_clusters(len(delivery_data['clusters']))
+        driver_index.update(*fleet_state.available_drivers())
+        order_index.update(*fleet_state.open_orders())
+        dashboard_snapshots.publish(dashboard_sections())
+        print(f"Restored state version {version} in {time.perf_counter() - start:.3f}s")
+        threading.Thread(target=persistence.warm_up, daemon=True).start()
+    persistence.start()
+
+def start_embedded_data_processor():
+    """Run the data processor in this process, publishing through the in-memory transport"""
+    import sys
+    sys.path.insert(0, DATA_PROCESSOR_DIR)
+    from data_processor import DeliveryDataProcessor
+    
+    processor = DeliveryDataProcessor(transport=transport, on_publish=record_producer_timings)
+    threading.Thread(target=processor.process_agent_workflow, daemon=True).start()
+    threading.Thread(target=processor.simulate_real_time_data, daemon=True).start()
 
 if __name__ == '__main__':
+    # Reload the previous run's state before any consumer touches it
+    restore_state()
+    
     # Setup RabbitMQ
     setup_rabbitmq_queues()
     
     # Start RabbitMQ consumers
     start_rabbitmq_consumers()
     
+    if transport.in_process:
+        start_embedded_data_processor()
+    
     # Start Flask app
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
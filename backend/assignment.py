@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+from scipy.spatial import cKDTree
+
+from spatial_index import haversine_km
+
+# Cost terms, in km of driving each is worth: leaving a whole vehicle's capacity
+# unused on a route, and the fixed cost of sending each vehicle type
+ASSIGNMENT_SLACK_KM = float(os.getenv('ASSIGNMENT_SLACK_KM', 5))
+VEHICLE_TYPE_COST_KM = {'Motorcycle': 0.0, 'Van': 1.0, 'Truck': 3.0}
+
+# Instances up to this many route x driver pairs get an exact dense matching; larger
+# ones are matched over each route's nearest feasible drivers, and past
+# ASSIGNMENT_GREEDY_ROUTES routes greedily over those candidates
+ASSIGNMENT_DENSE_LIMIT = int(os.getenv('ASSIGNMENT_DENSE_LIMIT', 2_000_000))
+ASSIGNMENT_CANDIDATES = int(os.getenv('ASSIGNMENT_CANDIDATES', 64))
+ASSIGNMENT_GREEDY_ROUTES = int(os.getenv('ASSIGNMENT_GREEDY_ROUTES', 20000))
+
+DRIVER_COLUMNS = ('driver_id', 'name', 'vehicle_type', 'latitude', 'longitude', 'vehicle_capacity_volume',
+                  'current_load_volume', 'vehicle_capacity_weight', 'current_load_weight')
+
+# Cost of leaving a route unassigned; above any real pairing
+UNASSIGNED_COST = 1e6
+
+
+def route_columns(routes):
+    """Column arrays of the fields assignment reads from vehicle route records"""
+    return {
+        'latitude': np.array([route['centroid_lat'] for route in routes], dtype=np.float64),
+        'longitude': np.array([route['centroid_lon'] for route in routes], dtype=np.float64),
+        'volume': np.array([route['total_volume'] for route in routes], dtype=np.float64),
+        'weight': np.array([route['total_weight'] for route in routes], dtype=np.float64)
+    }
+
+
+def driver_arrays(drivers):
+    """Remaining capacity and vehicle cost of drivers given as DRIVER_COLUMNS arrays"""
+    return {
+        'latitude': np.asarray(drivers['latitude'], dtype=np.float64),
+        'longitude': np.asarray(drivers['longitude'], dtype=np.float64),
+        'capacity': np.asarray(drivers['vehicle_capacity_volume'], dtype=np.float64),
+        'remaining_volume': drivers['vehicle_capacity_volume'] - drivers['current_load_volume'],
+        'remaining_weight': drivers['vehicle_capacity_weight'] - drivers['current_load_weight'],
+        'type_cost': np.array([VEHICLE_TYPE_COST_KM.get(kind, 0.0) for kind in drivers['vehicle_type']])
+    }
+
+
+def pair_costs(routes, drivers, r, d):
+    """(cost, distance km, feasible) of pairing routes r with drivers d, broadcasting like fancy indexing
+
+    A pair is feasible when the driver's remaining volume and weight hold the
+    route. Cost is the drive to the route's centroid, plus the share of the
+    vehicle's capacity the route leaves unused, plus the vehicle type's cost.
+    """
+    distance = haversine_km(routes['latitude'][r], routes['longitude'][r],
+                            drivers['latitude'][d], drivers['longitude'][d])
+    slack = drivers['remaining_volume'][d] - routes['volume'][r]
+    feasible = (slack >= 0) & (drivers['remaining_weight'][d] >= routes['weight'][r])
+    cost = distance + ASSIGNMENT_SLACK_KM * slack / drivers['capacity'][d] + drivers['type_cost'][d]
+    return cost, distance, feasible
+
+
+def candidate_edges(routes, drivers, k):
+    """(route, driver) pairs linking every route to up to k of its nearest feasible drivers"""
+    lon_scale = np.cos(np.radians(drivers['latitude'].mean()))
+    tree = cKDTree(np.column_stack([drivers['latitude'], drivers['longitude'] * lon_scale]))
+    points = np.column_stack([routes['latitude'], routes['longitude'] * lon_scale])
+    # Over-fetch, since many near drivers may lack the capacity
+    fetch = min(len(drivers['latitude']), k * 8)
+    _, nearest = tree.query(points, k=fetch)
+    nearest = nearest.reshape(len(points), fetch)
+    r = np.repeat(np.arange(len(points)), fetch)
+    d = nearest.ravel()
+    _, _, feasible = pair_costs(routes, drivers, r, d)
+    feasible = feasible.reshape(len(points), fetch)
+    keep = feasible & (np.cumsum(feasible, axis=1) <= k)
+    return r[keep.ravel()], d[keep.ravel()]
+
+
+def solve_dense(routes, drivers):
+    """Exact minimum-cost matching over every route and driver pair"""
+    n_routes = len(routes['latitude'])
+    cost, _, feasible = pair_costs(routes, drivers, np.arange(n_routes)[:, None],
+                                   np.arange(len(drivers['latitude']))[None, :])
+    cost = np.where(feasible, cost, UNASSIGNED_COST)
+    r, d = linear_sum_assignment(cost)
+    keep = feasible[r, d]
+    return r[keep], d[keep]
+
+
+def solve_sparse(routes, drivers, r, d):
+    """Exact minimum-cost matching restricted to the candidate pairs
+
+    Every route also gets a private "unassigned" column at UNASSIGNED_COST,
+    so a matching that covers all routes always exists.
+    """
+    n_routes, n_drivers = len(routes['latitude']), len(drivers['latitude'])
+    cost, _, _ = pair_costs(routes, drivers, r, d)
+    rows = np.concatenate((r, np.arange(n_routes)))
+    cols = np.concatenate((d, n_drivers + np.arange(n_routes)))
+    # The matching ignores stored zeros, so keep every weight strictly positive
+    weights = np.concatenate((cost, np.full(n_routes, UNASSIGNED_COST))) + 1e-6
+    graph = csr_matrix((weights, (rows, cols)), shape=(n_routes, n_drivers + n_routes))
+    matched_r, matched_d = min_weight_full_bipartite_matching(graph)
+    assigned = matched_d < n_drivers
+    return matched_r[assigned], matched_d[assigned]
+
+
+def solve_greedy(routes, drivers, r, d):
+    """Cheapest candidate pairs first, skipping routes and drivers already taken"""
+    cost, _, _ = pair_costs(routes, drivers, r, d)
+    taken_routes, taken_drivers = set(), set()
+    assigned_r, assigned_d = [], []
+    for edge in np.argsort(cost, kind='stable').tolist():
+        route, driver = int(r[edge]), int(d[edge])
+        if route in taken_routes or driver in taken_drivers:
+            continue
+        taken_routes.add(route)
+        taken_drivers.add(driver)
+        assigned_r.append(route)
+        assigned_d.append(driver)
+    return np.array(assigned_r, dtype=np.intp), np.array(assigned_d, dtype=np.intp)
+
+
+def match(routes, drivers):
+    """(route indices, driver indices, method) of a minimum-cost assignment of routes to drivers"""
+    n_routes, n_drivers = len(routes['latitude']), len(drivers['latitude'])
+    empty = np.array([], dtype=np.intp)
+    if n_routes == 0 or n_drivers == 0:
+        return empty, empty, 'none'
+    if n_routes * n_drivers <= ASSIGNMENT_DENSE_LIMIT:
+        return (*solve_dense(routes, drivers), 'hungarian')
+    r, d = candidate_edges(routes, drivers, ASSIGNMENT_CANDIDATES)
+    if len(r) == 0:
+        return empty, empty, 'sparse'
+    if n_routes <= ASSIGNMENT_GREEDY_ROUTES:
+        try:
+            return (*solve_sparse(routes, drivers, r, d), 'sparse')
+        except ValueError:
+            pass
+    return (*solve_greedy(routes, drivers, r, d), 'greedy')
+
+
+class DriverAssigner:
+    """Route-to-driver assignments kept across runs and re-solved only where they broke
+
+    Each run keeps a route's driver while that driver is still Available
+    and can still carry the route, and matches the remaining routes against
+    the drivers nobody holds. Driver updates then move only the routes they
+    affect instead of reshuffling the whole fleet. rebalance=True matches
+    everything from scratch.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # route_id -> driver_id
+        self.assignments = {}
+        self.last_run = {}
+
+    def assign(self, routes, drivers, rebalance=False):
+        """Assignment records for the given vehicle routes, one per route, driver None when unassigned"""
+        start = time.perf_counter()
+        route_ids = [route['route_id'] for route in routes]
+        route_arrays = route_columns(routes)
+        driver_data = driver_arrays(drivers)
+        driver_rows = {driver_id: i for i, driver_id in enumerate(np.asarray(drivers['driver_id']).tolist())}
+
+        with self.lock:
+            previous = {} if rebalance else self.assignments
+            kept_r = np.array([i for i, route_id in enumerate(route_ids) if previous.get(route_id) in driver_rows],
+                              dtype=np.intp)
+            kept_d = np.array([driver_rows[previous[route_ids[i]]] for i in kept_r], dtype=np.intp)
+            if len(kept_r):
+                _, _, feasible = pair_costs(route_arrays, driver_data, kept_r, kept_d)
+                # A driver may hold one route only; later duplicates go back to the pool
+                _, first = np.unique(kept_d, return_index=True)
+                unique = np.zeros(len(kept_d), dtype=bool)
+                unique[first] = True
+                kept_r, kept_d = kept_r[feasible & unique], kept_d[feasible & unique]
+
+            open_r = np.setdiff1d(np.arange(len(route_ids)), kept_r)
+            free_d = np.setdiff1d(np.arange(len(driver_rows)), kept_d)
+            sub_routes = {name: values[open_r] for name, values in route_arrays.items()}
+            sub_drivers = {name: values[free_d] for name, values in driver_data.items()}
+            new_r, new_d, method = match(sub_routes, sub_drivers)
+
+            r = np.concatenate((kept_r, open_r[new_r])).astype(np.intp)
+            d = np.concatenate((kept_d, free_d[new_d])).astype(np.intp)
+            cost, distance, _ = pair_costs(route_arrays, driver_data, r, d)
+            driver_ids = np.asarray(drivers['driver_id'])
+            self.assignments = {route_ids[i]: str(driver_ids[j]) for i, j in zip(r.tolist(), d.tolist())}
+
+            records = {route_id: {'route_id': route_id, 'cluster_id': route.get('cluster_id'), 'driver_id': None,
+                                  'driver_name': None, 'vehicle_type': None, 'distance_km': None, 'cost': None}
+                       for route_id, route in zip(route_ids, routes)}
+            for i, j, pair_cost, pair_distance in zip(r.tolist(), d.tolist(), cost.tolist(), distance.tolist()):
+                records[route_ids[i]].update(
+                    driver_id=str(driver_ids[j]), driver_name=str(drivers['name'][j]),
+                    vehicle_type=str(drivers['vehicle_type'][j]), distance_km=round(pair_distance, 3),
+                    cost=round(pair_cost, 3)
+                )
+            self.last_run = {
+                'routes': len(route_ids), 'drivers': len(driver_rows), 'kept': int(len(kept_r)),
+                'matched': int(len(new_r)), 'unassigned': len(route_ids) - int(len(r)), 'method': method,
+                'total_cost': round(float(cost.sum()), 3), 'seconds': round(time.perf_counter() - start, 4)
+            }
+        return list(records.values())
+
+    def restore(self, records):
+        """Adopt previously published assignment records, so a restart keeps them"""
+        with self.lock:
+            self.assignments = {record['route_id']: record['driver_id'] for record in records
+                                if record.get('driver_id') is not None}
+
+    def summary(self):
+        with self.lock:
+            return dict(self.last_run)
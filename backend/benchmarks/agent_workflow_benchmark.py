@@ -0,0 +1,47 @@
+"""Agent workflow throughput and latency with the DAG workflow engine.
+
+Submits a burst of workflows to the data processor's WorkflowEngine with
+its simulated agents and reports throughput, per-workflow latency, and the
+critical path through the agent DAG. It also reports the serial time, which
+is what one workflow at a time with one agent at a time used to take.
+
+Run from the backend directory:  python -m benchmarks.agent_workflow_benchmark
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from agent_workflow import WorkflowEngine, default_agents  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workflows', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--failure-rate', type=float, default=0.05, help='chance that an agent attempt fails')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--retries', type=int, default=2)
+    args = parser.parse_args()
+
+    engine = WorkflowEngine(default_agents(args.failure_rate), timeout=args.timeout, retries=args.retries,
+                            max_in_flight=args.concurrency)
+    start = time.perf_counter()
+    futures = [engine.submit(f'WF-{i}', 'benchmark') for i in range(args.workflows)]
+    records = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    engine.close()
+
+    summary = engine.summary()
+    serial = sum(record['serial_seconds'] for record in records)
+    print(f"{args.workflows} workflows, {args.concurrency} in flight: {elapsed:.2f} s, "
+          f"{args.workflows / elapsed:.1f} workflows/s")
+    print(f"one at a time, agents in sequence: {serial:.1f} s ({serial / elapsed:.0f}x longer)")
+    for name, latency in summary['latency'].items():
+        print(f"{name:<14} p50 {latency['p50_s']:6.3f} s  p95 {latency['p95_s']:6.3f} s")
+    print(f"counts {summary['counts']}")
+
+
+if __name__ == '__main__':
+    main()
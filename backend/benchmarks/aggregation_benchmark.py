@@ -0,0 +1,80 @@
+"""Per-batch latency and cold-start time for each aggregation engine.
+
+Run from the backend directory:  python -m benchmarks.aggregation_benchmark
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregation import PandasAggregationEngine, SparkAggregationEngine, get_spark_session
+
+
+def make_batch(n_orders, n_clusters=8, seed=42):
+    """Build a clustered order batch shaped like the one consume_order_data produces"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'order_id': [f'ORD-{str(i + 1).zfill(3)}' for i in range(n_orders)],
+        'latitude': 40.7589 + (rng.random(n_orders) - 0.5) * 0.1,
+        'longitude': -73.9851 + (rng.random(n_orders) - 0.5) * 0.1,
+        'volume': rng.uniform(0.1, 0.6, n_orders),
+        'weight': rng.uniform(1, 11, n_orders),
+        'cluster_id': rng.integers(0, n_clusters, n_orders)
+    })
+
+
+def time_engine(engine, batch, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = engine.aggregate(batch)
+    return (time.perf_counter() - start) / repeats * 1000, result
+
+
+def routes_match(left, right):
+    if len(left) != len(right):
+        return False
+    for a, b in zip(left, right):
+        if a['cluster_id'] != b['cluster_id'] or a['order_count'] != b['order_count']:
+            return False
+        if list(a['order_ids']) != list(b['order_ids']):
+            return False
+        for key in ('centroid_lat', 'centroid_lon', 'total_volume', 'total_weight'):
+            if not np.isclose(a[key], b[key]):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[30, 70, 1000, 100000])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--skip-spark', action='store_true')
+    args = parser.parse_args()
+
+    engines = [PandasAggregationEngine()]
+    # Time each engine's very first call the same way, before any batch warms it up
+    start = time.perf_counter()
+    engines[0].aggregate(make_batch(min(args.sizes)))
+    print(f"pandas cold start: {(time.perf_counter() - start) * 1000:.1f} ms")
+    if not args.skip_spark:
+        start = time.perf_counter()
+        get_spark_session()
+        print(f"spark cold start: {(time.perf_counter() - start) * 1000:.1f} ms")
+        engines.append(SparkAggregationEngine())
+
+    for size in args.sizes:
+        batch = make_batch(size)
+        results = {}
+        for engine in engines:
+            first_start = time.perf_counter()
+            engine.aggregate(batch)
+            first_ms = (time.perf_counter() - first_start) * 1000
+            per_batch_ms, results[engine.name] = time_engine(engine, batch, args.repeats)
+            print(f"{engine.name:>7} rows={size:>7} first={first_ms:9.2f} ms per_batch={per_batch_ms:9.2f} ms")
+        if 'spark' in results:
+            print(f"        rows={size:>7} identical={routes_match(results['pandas'], results['spark'])}")
+
+
+if __name__ == '__main__':
+    main()
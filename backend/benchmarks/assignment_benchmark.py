@@ -0,0 +1,85 @@
+"""Route-to-driver assignment time and cost for each matching method.
+
+Matches synthetic vehicle routes to synthetic drivers with the method the
+instance size selects, and forces the others for comparison: the exact
+dense matching on a smaller instance, where it is affordable, and the
+greedy fallback. Also times an incremental re-run after a share of the
+drivers changed.
+
+Run from the backend directory:  python -m benchmarks.assignment_benchmark
+"""
+import argparse
+import os
+import sys
+import time
+
+import assignment
+from assignment import DriverAssigner, candidate_edges, driver_arrays, match, solve_greedy, solve_sparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+
+def synthetic_routes(generator, count):
+    latitude, longitude = generator.locations(count)
+    volume = generator.rng.uniform(1, 10, count)
+    return [{'route_id': f'RTE-{i}', 'cluster_id': f'CLU-{i // 3:02d}', 'centroid_lat': float(lat),
+             'centroid_lon': float(lon), 'total_volume': float(v), 'total_weight': float(v * 60)}
+            for i, (lat, lon, v) in enumerate(zip(latitude, longitude, volume))]
+
+
+def driver_columns(generator, count):
+    columns = generator.driver_columns(count)
+    return {name: columns[name] for name in assignment.DRIVER_COLUMNS}
+
+
+def timed(label, solve, routes, drivers):
+    start = time.perf_counter()
+    r, d, method = solve()
+    elapsed = time.perf_counter() - start
+    cost, _, _ = assignment.pair_costs(routes, drivers, r, d)
+    print(f"{label:<34} {method:<10} {elapsed:7.3f} s  assigned {len(r):>6}  cost/route {cost.mean():7.3f}")
+
+
+def compare(generator, n_routes, n_drivers):
+    routes = assignment.route_columns(synthetic_routes(generator, n_routes))
+    drivers = driver_arrays(driver_columns(generator, n_drivers))
+    print(f"{n_routes} routes x {n_drivers} drivers")
+    timed('selected method', lambda: match(routes, drivers), routes, drivers)
+    r, d = candidate_edges(routes, drivers, assignment.ASSIGNMENT_CANDIDATES)
+    timed('sparse over nearest candidates', lambda: (*solve_sparse(routes, drivers, r, d), 'sparse'),
+          routes, drivers)
+    timed('greedy over nearest candidates', lambda: (*solve_greedy(routes, drivers, r, d), 'greedy'),
+          routes, drivers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--routes', type=int, default=5000)
+    parser.add_argument('--drivers', type=int, default=10000)
+    parser.add_argument('--changed', type=float, default=0.05, help='share of drivers changed before the re-run')
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(seed=42)
+    compare(generator, 1000, 2000)
+    print()
+    compare(generator, args.routes, args.drivers)
+    print()
+
+    routes = synthetic_routes(generator, args.routes)
+    drivers = driver_columns(generator, args.drivers)
+    assigner = DriverAssigner()
+    assigner.assign(routes, drivers)
+    print(f"first run       {assigner.summary()}")
+    # Changed drivers move and take on load, so some assignments break
+    changed = generator.rng.choice(args.drivers, int(args.changed * args.drivers), replace=False)
+    drivers['latitude'] = drivers['latitude'].copy()
+    drivers['current_load_volume'] = drivers['current_load_volume'].copy()
+    drivers['latitude'][changed] += generator.rng.normal(0, 0.01, len(changed))
+    drivers['current_load_volume'][changed] = generator.rng.uniform(0, 10, len(changed))
+    assigner.assign(routes, drivers)
+    print(f"incremental run {assigner.summary()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Hierarchical clustering wall time and speedup by worker count.
+
+Run from the backend directory:  python -m benchmarks.clustering_benchmark
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from clustering import HierarchicalClusterer
+
+
+def make_orders(n_orders, seed=42):
+    """Metro-wide order batch spread over a ~30 km box with six time slots"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'order_id': np.arange(n_orders),
+        'latitude': 40.7589 + (rng.random(n_orders) - 0.5) * 0.3,
+        'longitude': -73.9851 + (rng.random(n_orders) - 0.5) * 0.3,
+        'delivery_time_numeric': rng.integers(1, 7, n_orders),
+        'volume': rng.uniform(0.1, 0.6, n_orders),
+        'weight': rng.uniform(1, 11, n_orders)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        orders = make_orders(size)
+        baseline = None
+        for workers in args.workers:
+            clusterer = HierarchicalClusterer(workers=workers, parallel_min_orders=0)
+            if workers > 1:
+                clusterer.executor().submit(int).result()  # spawn workers outside the timing
+            start = time.perf_counter()
+            labels = clusterer.fit_predict(orders)
+            elapsed = time.perf_counter() - start
+            clusterer.shutdown()
+            baseline = baseline or elapsed
+            print(f"orders={size:>8} workers={workers:>3} clusters={labels.max() + 1:>7} "
+                  f"time={elapsed:8.2f} s speedup={baseline / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Polling load test for /api/dashboard-data: jsonify on every request vs pre-built snapshots.
+
+Run from the backend directory:  python -m benchmarks.dashboard_load_test
+Pass --url to poll a running backend instead of the in-process test client.
+"""
+import argparse
+import threading
+import time
+
+from flask import jsonify
+
+import app as backend
+from benchmarks.aggregation_benchmark import make_batch
+
+
+def populate(n_orders, n_drivers):
+    orders = make_batch(n_orders).to_dict('records')
+    drivers = [
+        {'driver_id': f'DRV-{i:05d}', 'status': 'Available', 'current_location': {'latitude': 40.75, 'longitude': -73.98}}
+        for i in range(n_drivers)
+    ]
+    backend.fleet_state.upsert_orders(orders)
+    backend.fleet_state.upsert_drivers(drivers)
+    backend.publish_state('orders', backend.fleet_state.order_records())
+    backend.publish_state('drivers', backend.fleet_state.driver_records())
+    backend.delivery_data['stats'] = {'total_drivers': n_drivers}
+    backend.dashboard_snapshots.publish(backend.dashboard_sections())
+    return dict(backend.delivery_data, orders=orders, drivers=drivers)
+
+
+def run_in_process(label, path, make_headers, seconds):
+    client = backend.app.test_client()
+    headers = make_headers(client)
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        client.get(path, headers=headers)
+        count += 1
+    print(f"{label:<28} {count / seconds:10.1f} req/s")
+
+
+def run_http(url, threads, seconds, gzip):
+    import requests
+
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(i):
+        session = requests.Session()
+        etag = None
+        while time.perf_counter() < deadline:
+            headers = {'Accept-Encoding': 'gzip' if gzip else 'identity'}
+            if etag:
+                headers['If-None-Match'] = etag
+            etag = session.get(url, headers=headers).headers.get('ETag')
+            counts[i] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    print(f"{url} threads={threads}: {sum(counts) / seconds:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--drivers', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--url')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--gzip', action='store_true')
+    args = parser.parse_args()
+
+    if args.url:
+        run_http(args.url, args.threads, args.seconds, args.gzip)
+        return
+
+    data = populate(args.orders, args.drivers)
+
+    # The pre-snapshot handler, registered under a separate rule for comparison
+    backend.app.add_url_rule('/api/dashboard-data-jsonify', 'dashboard_jsonify',
+                             lambda: jsonify(data))
+    path = '/api/dashboard-data'
+    run_in_process('before: jsonify', '/api/dashboard-data-jsonify', lambda c: {}, args.seconds)
+    run_in_process('after: snapshot', path, lambda c: {}, args.seconds)
+    run_in_process('after: snapshot + gzip', path, lambda c: {'Accept-Encoding': 'gzip'}, args.seconds)
+    run_in_process('after: If-None-Match (304)', path,
+                   lambda c: {'If-None-Match': c.get(path).headers['ETag']}, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""ETA throughput of the batched ETA engine, with and without cached stop tables.
+
+Times one batched call for the remaining stops of many synthetic routes:
+first with an empty cache, then again with vehicles moved on, when only
+the leg to each next stop is new, and after a grid refresh, which makes
+every cached table stale. Also times the same routes one call at a time.
+
+Run from the backend directory:  python -m benchmarks.eta_benchmark
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from eta import ETAEngine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+
+def synthetic_routes(generator, count, stops):
+    latitude, longitude = generator.locations(count * stops)
+    vehicles_lat, vehicles_lon = generator.locations(count)
+    return [{'route_id': f'RTE-{i}', 'latitude': float(vehicles_lat[i]), 'longitude': float(vehicles_lon[i]),
+             'stop_lat': latitude[i * stops:(i + 1) * stops].copy(),
+             'stop_lon': longitude[i * stops:(i + 1) * stops].copy(),
+             'next_stop': int(generator.rng.integers(0, stops))}
+            for i in range(count)]
+
+
+def timed(label, engine, routes, departure, repeat=1):
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        etas = engine.estimate(routes, departure)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    stops = sum(len(minutes) for minutes in etas.values())
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms  {len(routes) / elapsed:>10,.0f} routes/s  "
+          f"{stops / elapsed:>12,.0f} stop ETAs/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--routes', type=int, default=5000)
+    parser.add_argument('--stops', type=int, default=20)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(seed=42)
+    routes = synthetic_routes(generator, args.routes, args.stops)
+    engine = ETAEngine(cache_size=2 * args.routes)
+    departure = time.time()
+    print(f"{args.routes} routes, {args.stops} stops each")
+
+    # A first, uncached call warms up numpy's code paths as well
+    timed('first call (warm-up)', engine, synthetic_routes(generator, args.routes, args.stops), departure)
+    timed('batched, cold cache', engine, routes, departure)
+    for route in routes:
+        route['latitude'] += generator.rng.normal(0, 0.001)
+        route['next_stop'] = min(route['next_stop'] + 1, args.stops - 1)
+    timed('batched, vehicles moved', engine, routes, departure, repeat=5)
+
+    lat, lon = generator.locations(10000)
+    engine.grid.observe(lat, lon, generator.rng.uniform(10, 40, len(lat)), np.full(len(lat), departure))
+    engine.grid.refresh(force=True)
+    timed('batched, after grid refresh', engine, routes, departure)
+
+    for label in ('one route per call, cold', 'one route per call, cached'):
+        if label.endswith('cold'):
+            engine.tables.clear()
+        start = time.perf_counter()
+        for route in routes:
+            engine.estimate([route], departure)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<28} {elapsed * 1000:8.1f} ms  {len(routes) / elapsed:>10,.0f} routes/s")
+    print(engine.summary())
+
+
+if __name__ == '__main__':
+    main()
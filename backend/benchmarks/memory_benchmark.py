@@ -0,0 +1,89 @@
+"""Memory footprint of orders and drivers: lists of dicts vs compact record tables.
+
+Builds the same synthetic records both ways and measures what each holds
+with tracemalloc, plus the encoded copy the state store keeps for deltas.
+
+Run from the backend directory:  python -m benchmarks.memory_benchmark
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from compact_store import DRIVER_NESTED, DRIVER_SCHEMA, ORDER_SCHEMA, RecordTable
+from state_store import StateStore
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+
+def measure(build):
+    """(result, bytes still allocated by build, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def order_records(generator, count):
+    """Orders as the decoded messages hold them: one dict of Python values per order"""
+    columns = generator.order_columns(count)
+    columns['delivery_time_numeric'] = np.ones(count)
+    columns['cluster_id'] = np.arange(count) % 50
+    columns = {name: columns[name].tolist() for name in ORDER_SCHEMA}
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def driver_records(generator, count):
+    columns = generator.driver_columns(count)
+    columns = {name: columns[name].tolist() for name in DRIVER_SCHEMA}
+    records = [dict(zip(columns, row)) for row in zip(*columns.values())]
+    for record in records:
+        record['current_location'] = {'latitude': record.pop('latitude'), 'longitude': record.pop('longitude')}
+    return records
+
+
+def report(label, count, size, elapsed):
+    print(f"{label:<28} {size / 2**20:9.1f} MiB {size / count:7.0f} B/record  build {elapsed:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--drivers', type=int, default=100_000)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(seed=42)
+    for section, key, schema, nested, records in (
+            ('orders', 'order_id', ORDER_SCHEMA, None, lambda n: order_records(generator, n)),
+            ('drivers', 'driver_id', DRIVER_SCHEMA, DRIVER_NESTED, lambda n: driver_records(generator, n))):
+        count = getattr(args, section)
+        built, size, elapsed = measure(lambda: records(count))
+        report(f'{section}: list of dicts', count, size, elapsed)
+
+        def build_table():
+            table = RecordTable(key, schema, nested, capacity=count)
+            table.upsert_records(built)
+            return table
+        _, size, elapsed = measure(build_table)
+        report(f'{section}: RecordTable', count, size, elapsed)
+
+        def build_store():
+            store = StateStore()
+            store.replace(section, built)
+            return store
+        _, size, elapsed = measure(build_store)
+        report(f'{section}: state store bytes', count, size, elapsed)
+        del built
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Cost of the pipeline instrumentation per message, against the work it measures.
+
+Times the metric calls one order batch makes: stage timings through
+StageStats, consumer counters, queue lag, and the state publishes' latency,
+fan-out and byte counts. Those times are compared with clustering and
+routing a typical batch of the same size. Also times rendering
+/api/metrics, and how much of the wall time the sampling profiler spends
+sampling while the batch work runs.
+
+Run from the backend directory:  python -m benchmarks.metrics_benchmark
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from clustering import IncrementalClusterer
+from concurrent_consumer import StageStats
+from metrics import REGISTRY, SIZE_BUCKETS, SamplingProfiler
+from routing import RouteBuilder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+STAGES = ('decode', 'time_slots', 'cluster', 'aggregate_pandas', 'optimize', 'to_columns', 'apply_state',
+          'schedule', 'apply_emit', 'apply', 'total', 'end_to_end')
+SECTIONS = ('orders', 'clusters', 'routes', 'schedule', 'stats')
+
+
+def instrument_batch(stats, lag, publish_seconds, fanout, emit_bytes):
+    """The metric calls made while one order batch is processed"""
+    stats.count('received')
+    stats.record({stage: 0.003 for stage in STAGES})
+    lag.observe(0.02, queue='order_data')
+    for section in SECTIONS:
+        publish_seconds.observe(0.0004, section=section)
+        fanout.observe(3, section=section)
+        emit_bytes.inc(3 * 2048, section=section)
+    stats.count('acked')
+
+
+def process_batch(generator, clusterer, builder, size):
+    columns = generator.order_columns(size)
+    frame = pd.DataFrame({name: columns[name] for name in ('order_id', 'latitude', 'longitude', 'volume', 'weight')})
+    frame['delivery_time_numeric'] = generator.rng.integers(1, 7, size).astype(np.float64)
+    labels = clusterer.fit_predict(frame)
+    for label in np.unique(labels).tolist():
+        cluster = frame[labels == label]
+        builder.build(cluster['order_id'].tolist(), cluster['latitude'].to_numpy(), cluster['longitude'].to_numpy(),
+                      cluster['volume'].to_numpy(), cluster['weight'].to_numpy())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--batches', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=50, help='orders per batch')
+    args = parser.parse_args()
+
+    stats = StageStats('benchmark')
+    lag = REGISTRY.histogram('pipeline_queue_lag_seconds', 'Time from publish to the start of processing', ('queue',))
+    publish_seconds = REGISTRY.histogram('state_publish_seconds', 'Time to diff a state section and emit its delta',
+                                         ('section',))
+    fanout = REGISTRY.histogram('socket_fanout_clients', 'Clients each state delta is emitted to', ('section',),
+                                buckets=SIZE_BUCKETS)
+    emit_bytes = REGISTRY.counter('socket_emit_bytes_total', 'Bytes of state deltas sent, counting every client',
+                                  ('section',))
+
+    start = time.perf_counter()
+    for _ in range(args.batches):
+        instrument_batch(stats, lag, publish_seconds, fanout, emit_bytes)
+    instrumentation = (time.perf_counter() - start) / args.batches
+
+    generator = SyntheticDataGenerator(seed=42)
+    clusterer, builder = IncrementalClusterer(), RouteBuilder()
+    process_batch(generator, clusterer, builder, args.orders)
+    start = time.perf_counter()
+    for _ in range(args.batches // 10):
+        process_batch(generator, clusterer, builder, args.orders)
+    work = (time.perf_counter() - start) / (args.batches // 10)
+
+    print(f"instrumentation per batch  {instrumentation * 1e6:8.1f} us")
+    print(f"clustering and routing     {work * 1e3:8.2f} ms for {args.orders} orders")
+    print(f"overhead                   {instrumentation / work:8.3%}")
+
+    start = time.perf_counter()
+    body = REGISTRY.render()
+    print(f"render /api/metrics        {(time.perf_counter() - start) * 1e3:8.2f} ms, {len(body)} bytes")
+
+    profiler = SamplingProfiler(interval=0.01)
+    profiler.start()
+    start = time.perf_counter()
+    for _ in range(args.batches // 10):
+        process_batch(generator, clusterer, builder, args.orders)
+    profiled = (time.perf_counter() - start) / (args.batches // 10)
+    profiler.stop()
+    report = profiler.report(limit=3)
+    print(f"with the profiler running  {profiled * 1e3:8.2f} ms per batch, {report['samples']} samples, "
+          f"sampling {report['overhead']:.2%} of wall time")
+    for entry in report['top_functions']:
+        print(f"    {entry['share']:6.1%}  {entry['function']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""p50/p99 latency of the publishing endpoints under concurrent load.
+
+Compares a fresh BlockingConnection per request (the old handlers) with the
+shared PublisherPool. Needs a reachable RabbitMQ (RABBITMQ_HOST etc.).
+
+Run from the backend directory:  python -m benchmarks.publisher_benchmark
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import pika
+
+import app as backend
+
+
+def connection_per_request(routing_key, message):
+    connection = pika.BlockingConnection(backend.get_connection_parameters())
+    channel = connection.channel()
+    channel.basic_publish(exchange='', routing_key=routing_key, body=message,
+                          properties=pika.BasicProperties(delivery_mode=2))
+    connection.close()
+
+
+def run(label, publish, threads, requests_per_thread):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(requests_per_thread):
+            start = time.perf_counter()
+            publish('route_optimization', '{"type": "benchmark"}')
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    print(f"{label:<24} threads={threads:>3} p50={np.percentile(ms, 50):7.2f} ms "
+          f"p99={np.percentile(ms, 99):8.2f} ms throughput={len(ms) / elapsed:8.1f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    backend.publisher.start()
+    for threads in args.threads:
+        run('connection per request', connection_per_request, threads, args.requests)
+        run('pooled publisher', backend.publisher.publish, threads, args.requests)
+
+    # Drain what the benchmark published
+    connection = pika.BlockingConnection(backend.get_connection_parameters())
+    connection.channel().queue_purge('route_optimization')
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Re-planning cost per batch: solving every cluster vs the incremental route memo.
+
+Clusters a synthetic order set once, then replays batches that replace a
+small share of the orders. Each batch is routed both ways: every cluster
+solved from scratch, as ORDER_PLANNING=full does, and through the route
+memo, which reuses unchanged clusters and repairs changed ones. Reports
+the time per batch and how far the repaired distance is from a full solve.
+
+Run from the backend directory:  python -m benchmarks.replan_benchmark
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from clustering import IncrementalClusterer
+from route_memo import ClusterRouteMemo
+from routing import RouteBuilder
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+
+def order_frame(generator, count, start_index=0):
+    columns = generator.order_columns(count, start_index=start_index)
+    frame = pd.DataFrame({name: columns[name] for name in ('order_id', 'latitude', 'longitude', 'volume', 'weight')})
+    frame['delivery_time_numeric'] = generator.rng.integers(1, 7, count).astype(np.float64)
+    return frame
+
+
+def route_batch(orders, labels, solve):
+    """(seconds, total distance) to route every cluster with solve(label, *columns)"""
+    start = time.perf_counter()
+    distance = 0.0
+    for label in np.unique(labels).tolist():
+        cluster = orders[labels == label]
+        vehicle_routes = solve(label, cluster['order_id'].tolist(), cluster['latitude'].to_numpy(),
+                               cluster['longitude'].to_numpy(), cluster['volume'].to_numpy(),
+                               cluster['weight'].to_numpy())
+        distance += sum(vehicle_route['distance_km'] for vehicle_route in vehicle_routes)
+    return time.perf_counter() - start, distance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--change', type=float, default=0.02, help='share of orders replaced per batch')
+    parser.add_argument('--unchanged', type=int, default=2, help='batches repeated without any change')
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(seed=42)
+    builder = RouteBuilder()
+    memo = ClusterRouteMemo()
+    clusterer = IncrementalClusterer()
+    orders = order_frame(generator, args.orders)
+    next_index = args.orders
+    labels = clusterer.fit_predict(orders)
+    route_batch(orders, labels, lambda label, *columns: memo.solve(label, *columns, builder)[1])
+
+    print(f"{'batch':>5} {'changed':>8} {'full ms':>9} {'incremental ms':>15} {'speed-up':>9} "
+          f"{'distance':>9}  outcomes")
+    full_total = incremental_total = 0.0
+    for batch in range(args.batches + args.unchanged):
+        changed = 0
+        if batch < args.batches:
+            changed = max(1, int(args.change * len(orders)))
+            keep = np.sort(generator.rng.choice(len(orders), len(orders) - changed, replace=False))
+            orders = pd.concat([orders.iloc[keep], order_frame(generator, changed, next_index)], ignore_index=True)
+            next_index += changed
+            labels = clusterer.fit_predict(orders)
+
+        full_seconds, full_distance = route_batch(orders, labels, lambda label, *columns: builder.build(*columns))
+        outcomes = Counter()
+
+        def incremental(label, *columns):
+            _, vehicle_routes, outcome = memo.solve(label, *columns, builder)
+            outcomes[outcome] += 1
+            return vehicle_routes
+        incremental_seconds, incremental_distance = route_batch(orders, labels, incremental)
+        full_total += full_seconds
+        incremental_total += incremental_seconds
+        print(f"{batch + 1:>5} {changed:>8} {full_seconds * 1000:>9.1f} {incremental_seconds * 1000:>15.1f} "
+              f"{full_seconds / incremental_seconds:>8.1f}x {incremental_distance / full_distance - 1:>+8.1%}  "
+              f"{dict(outcomes)}")
+    print(f"total {full_total * 1000:.0f} ms full, {incremental_total * 1000:.0f} ms incremental "
+          f"({full_total / incremental_total:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
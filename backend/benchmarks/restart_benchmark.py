@@ -0,0 +1,74 @@
+"""Warm-restart time: snapshot write, then restore of a fresh fleet state and state store.
+
+Fills the stores with synthetic orders and drivers, writes a snapshot,
+logs a few more driver updates, then times restore() into empty stores
+and the warm-up it defers to a background thread. Restore reads from the page cache here; a cold disk adds read time.
+
+Run from the backend directory:  python -m benchmarks.restart_benchmark
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.memory_benchmark import driver_records, order_records
+from fleet_state import FleetState
+from persistence import StatePersistence
+from state_store import StateStore
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--drivers', type=int, default=10_000)
+    parser.add_argument('--log-updates', type=int, default=100)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(seed=42)
+    orders = order_records(generator, args.orders)
+    drivers = driver_records(generator, args.drivers)
+    fleet_state, state_store = FleetState(), StateStore()
+    fleet_state.upsert_orders(orders)
+    fleet_state.upsert_drivers(drivers)
+    state_store.replace('orders', orders)
+    state_store.replace('drivers', drivers)
+    del orders
+
+    directory = tempfile.mkdtemp(prefix='restart-benchmark-')
+    try:
+        persistence = StatePersistence(directory, state_store, fleet_state)
+        persistence.start()
+        start = time.perf_counter()
+        persistence.snapshot()
+        print(f"snapshot write        {time.perf_counter() - start:8.3f} s")
+        for i in range(args.log_updates):
+            update = [dict(drivers[i % len(drivers)], deliveries_today=i)]
+            fleet_state.upsert_drivers(update)
+            state_store.upsert('drivers', update)
+        persistence.close()
+
+        restored_fleet, restored_store = FleetState(), StateStore()
+        restored = StatePersistence(directory, restored_store, restored_fleet)
+        start = time.perf_counter()
+        version = restored.restore()
+        elapsed = time.perf_counter() - start
+        print(f"restore               {elapsed:8.3f} s  ({args.orders:,} orders, version {version})")
+        assert restored_fleet.stats() == fleet_state.stats()
+        assert restored_store.section_json('orders') == state_store.section_json('orders')
+
+        start = time.perf_counter()
+        restored.warm_up()
+        print(f"background warm-up    {time.perf_counter() - start:8.3f} s")
+        assert restored_store.export()[2] == state_store.export()[2]
+        assert restored_fleet.order_records(['ORD-001', 'missing']) == fleet_state.order_records(['ORD-001', 'missing'])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
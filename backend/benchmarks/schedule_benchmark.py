@@ -0,0 +1,71 @@
+"""Time-window scheduling time and quality for thousands of routes.
+
+Packs synthetic vehicle routes into the delivery windows on a given number
+of drivers and reports how long it took, the utilization of every window
+and the orders left unscheduled or booked outside their requested window.
+For comparison it also scores the old assignment, which put each cluster
+in window cluster_id % 6 regardless of demand or drivers.
+
+Run from the backend directory:  python -m benchmarks.schedule_benchmark
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scheduling import TIME_WINDOWS, WINDOW_MINUTES, schedule_report, schedule_routes
+
+
+def synthetic_routes(rng, count, stops):
+    """Route durations in minutes and (routes x windows) requested stop counts
+
+    Routes come from clusters built on location and slot, so most of a
+    route's stops share one window; demand peaks at midday and evening.
+    """
+    demand = np.array([0.12, 0.22, 0.14, 0.12, 0.25, 0.15])
+    main = rng.choice(len(TIME_WINDOWS), count, p=demand)
+    stop_counts = rng.integers(stops // 2, stops * 3 // 2, count)
+    requested = np.zeros((count, len(TIME_WINDOWS)), dtype=np.int64)
+    on_slot = rng.binomial(stop_counts, 0.85)
+    requested[np.arange(count), main] += on_slot
+    stray = rng.choice(len(TIME_WINDOWS), count)
+    requested[np.arange(count), stray] += stop_counts - on_slot
+    durations = rng.normal(6 * stop_counts, 15).clip(20, None).round()
+    return durations, requested
+
+
+def show(label, elapsed, report):
+    print(f"{label:<22} {elapsed:7.3f} s  scheduled {report['scheduled_routes']:>6}/{report['routes']}  "
+          f"unscheduled orders {report['unscheduled_orders']:>6}  off-window {report['off_window_orders']:>6}")
+    print('    ' + '  '.join(f"{w['time_window']} {w['utilization'] or 0:5.1%}" for w in report['windows']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--routes', type=int, default=5000)
+    parser.add_argument('--drivers', type=int, default=2000)
+    parser.add_argument('--stops', type=int, default=12, help='average stops per route')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    durations, requested = synthetic_routes(rng, args.routes, args.stops)
+    window_drivers = np.full(len(TIME_WINDOWS), args.drivers)
+    print(f"{args.routes} routes, {args.drivers} drivers, "
+          f"{durations.sum() / (args.drivers * len(TIME_WINDOWS) * WINDOW_MINUTES):.0%} of driver time requested")
+
+    start = time.perf_counter()
+    windows, starts = schedule_routes(durations, requested, window_drivers)
+    elapsed = time.perf_counter() - start
+    show('capacity-aware', elapsed, schedule_report(durations, requested, window_drivers, windows, starts))
+
+    # Cluster ids are unrelated to slots, so the modulo window is effectively random;
+    # routes start as soon as their window opens, on as many drivers as it takes
+    start = time.perf_counter()
+    windows = np.arange(args.routes) % len(TIME_WINDOWS)
+    starts = windows * float(WINDOW_MINUTES)
+    elapsed = time.perf_counter() - start
+    show('cluster_id % 6', elapsed, schedule_report(durations, requested, window_drivers, windows, starts))
+
+
+if __name__ == '__main__':
+    main()
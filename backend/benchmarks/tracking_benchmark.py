@@ -0,0 +1,79 @@
+"""Tracking points ingested per second on one core, and track query latency.
+
+'columns' feeds TrackStore.ingest pre-built arrays; 'messages' runs the
+consumer's whole path per message (JSON decode, tracking_columns, ingest).
+The target is 50k points/s.
+
+Run from the backend directory:  python -m benchmarks.tracking_benchmark
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from tracking import TRACK_FIELDS, TrackStore, tracking_columns
+
+
+def make_message(rng, routes, now):
+    """A tracking_updates message in the data processor's format with one point per route"""
+    stamp = datetime.fromtimestamp(now).isoformat()
+    points = {
+        f'RTE-{i:04d}': {
+            'route_id': f'RTE-{i:04d}', 'driver_id': f'DRV-{i:04d}',
+            'current_latitude': 40.7589 + rng.normal(0, 0.02), 'current_longitude': -73.9851 + rng.normal(0, 0.02),
+            'progress': rng.random(), 'status': 'In Transit', 'next_delivery': 'ORD-001', 'eta': '12:30',
+            'speed': rng.uniform(15, 45), 'fuel_level': rng.uniform(0.2, 1.0), 'temperature': rng.uniform(-5, 35),
+            'last_update': stamp
+        }
+        for i in range(routes)
+    }
+    return json.dumps({'type': 'tracking_update', 'tracking_data': points})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--routes', type=int, default=2000)
+    parser.add_argument('--points', type=int, default=500000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+    rng = np.random.default_rng(42)
+
+    for batch in args.batch:
+        store = TrackStore(capacity=600)
+        route_ids = np.array([f'RTE-{i:04d}' for i in range(args.routes)])
+        columns = {'route_id': route_ids[rng.integers(0, args.routes, batch)],
+                   'timestamp': np.zeros(batch)}
+        for field in TRACK_FIELDS:
+            columns[field] = rng.random(batch)
+        start = time.perf_counter()
+        for i in range(args.points // batch):
+            columns['timestamp'] = np.full(batch, float(i))
+            store.ingest(columns)
+        elapsed = time.perf_counter() - start
+        print(f"columns  batch={batch:>6} {args.points / elapsed:12,.0f} points/s")
+
+    store = TrackStore(capacity=600)
+    messages = [make_message(rng, args.routes, 1.7e9 + i) for i in range(max(1, args.points // args.routes // 10))]
+    start = time.perf_counter()
+    for body in messages:
+        store.ingest(tracking_columns(json.loads(body)['tracking_data'], time.time()))
+    elapsed = time.perf_counter() - start
+    print(f"messages batch={args.routes:>6} {len(messages) * args.routes / elapsed:12,.0f} points/s")
+
+    for _ in range(600):
+        store.ingest(tracking_columns(json.loads(messages[0])['tracking_data'], time.time()))
+    start = time.perf_counter()
+    for _ in range(1000):
+        store.latest('RTE-0001')
+    latest_us = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(100):
+        store.track('RTE-0001', max_points=100)
+    track_ms = (time.perf_counter() - start) * 10
+    print(f"latest {latest_us:.1f} us, downsampled track of 600 points {track_ms:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Publish-to-ack throughput and latency of the message transports.
+
+Publishes order batches as fast as the transport accepts them to a consumer
+that decodes each into a DataFrame and acks it, then reports messages per
+second and publish-to-decoded latency (which includes time spent queued).
+The in-memory transport needs nothing else running; --rabbitmq also
+measures the broker (RABBITMQ_HOST etc.) with columnar-encoded batches.
+
+Run from the backend directory:  python -m benchmarks.transport_benchmark
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from batch_decoder import decode_order_batch
+from publisher import PublisherPool
+from transport import InMemoryTransport, RabbitMQTransport
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from batch_encoder import CONTENT_TYPE, encode_order_batch  # noqa: E402
+from synthetic_data import SyntheticDataGenerator  # noqa: E402
+
+
+def run(label, transport, messages, batch_size, prefetch):
+    columns = SyntheticDataGenerator(seed=42).order_columns(batch_size)
+    latencies = []
+    done = threading.Event()
+
+    def on_message(delivery):
+        metadata, _ = decode_order_batch(delivery.body, delivery.content_type)
+        latencies.append(time.perf_counter() - metadata['sent_at'])
+        delivery.ack()
+        if len(latencies) == messages:
+            done.set()
+
+    threading.Thread(target=transport.consume, args=('order_data', on_message, prefetch), daemon=True).start()
+    start = time.perf_counter()
+    for _ in range(messages):
+        metadata = {'type': 'order_batch', 'sent_at': time.perf_counter()}
+        if transport.in_process:
+            transport.publish('order_data', dict(metadata, orders=columns))
+        else:
+            transport.publish('order_data', encode_order_batch(columns, metadata), CONTENT_TYPE)
+    done.wait()
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1000
+    print(f"{label:<10} batch={batch_size:>5} {messages / elapsed:9.1f} msg/s "
+          f"p50={np.percentile(ms, 50):8.2f} ms p99={np.percentile(ms, 99):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[50, 1000])
+    parser.add_argument('--prefetch', type=int, default=8)
+    parser.add_argument('--rabbitmq', action='store_true')
+    args = parser.parse_args()
+
+    for batch_size in args.batch_sizes:
+        memory = InMemoryTransport(maxsize=1000)
+        run('memory', memory, args.messages, batch_size, args.prefetch)
+        memory.close()
+        if args.rabbitmq:
+            import app as backend
+            rabbitmq = RabbitMQTransport(backend.get_connection_parameters(),
+                                         PublisherPool(backend.get_connection_parameters(), size=1))
+            rabbitmq.start()
+            run('rabbitmq', rabbitmq, args.messages, batch_size, args.prefetch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Bytes on the wire and decode-to-DataFrame time: JSON vs columnar order batches.
+
+Run from the backend directory:  python -m benchmarks.wire_format_benchmark
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from batch_decoder import COLUMNAR_CONTENT_TYPE, decode_order_batch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
+from batch_encoder import encode_order_batch  # noqa: E402
+
+
+def make_orders(n_orders, seed=42):
+    """Order dicts with the same fields and value ranges as generate_order_data"""
+    rng = np.random.default_rng(seed)
+    slots = np.array(['09:00-11:00', '11:00-13:00', '13:00-15:00', '15:00-17:00', '17:00-19:00', '19:00-21:00'])
+    columns = {
+        'order_id': [f'ORD-{str(i + 1).zfill(3)}' for i in range(n_orders)],
+        'latitude': (40.7589 + (rng.random(n_orders) - 0.5) * 0.1).tolist(),
+        'longitude': (-73.9851 + (rng.random(n_orders) - 0.5) * 0.1).tolist(),
+        'delivery_time_slot': slots[rng.integers(0, 6, n_orders)].tolist(),
+        'package_size': np.array(['Small', 'Medium', 'Large'])[rng.integers(0, 3, n_orders)].tolist(),
+        'priority': np.array(['High', 'Medium', 'Low'])[rng.integers(0, 3, n_orders)].tolist(),
+        'volume': rng.uniform(0.1, 0.6, n_orders).tolist(),
+        'weight': rng.uniform(1, 11, n_orders).tolist(),
+        'status': np.array(['Pending', 'Assigned', 'In Transit', 'Delivered'])[rng.integers(0, 4, n_orders)].tolist(),
+        'created_at': ['2024-07-01T10:00:00.000000'] * n_orders,
+        'customer_id': [f'CUST-{c}' for c in rng.integers(1000, 9999, n_orders)],
+        'delivery_address': [f'{a} Main St, New York, NY' for a in rng.integers(100, 999, n_orders)],
+        'phone': [f'+1-{a}-{a}-{a}{a % 10}' for a in rng.integers(100, 999, n_orders)]
+    }
+    return columns
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    metadata = {'type': 'order_batch', 'batch_id': 'BATCH-BENCH', 'timestamp': '2024-07-01T10:00:00'}
+    for size in args.sizes:
+        columns = make_orders(size)
+        orders = [dict(zip(columns, row)) for row in zip(*columns.values())]
+        json_body = json.dumps(dict(metadata, orders=orders)).encode('utf-8')
+        columnar_body = encode_order_batch(columns, metadata)
+
+        json_ms = best_of(lambda: decode_order_batch(json_body, 'application/json'), args.repeats)
+        columnar_ms = best_of(lambda: decode_order_batch(columnar_body, COLUMNAR_CONTENT_TYPE), args.repeats)
+        print(f"orders={size:>8} json={len(json_body) / 1e6:9.2f} MB {json_ms:9.1f} ms | "
+              f"columnar={len(columnar_body) / 1e6:8.2f} MB {columnar_ms:8.1f} ms | "
+              f"{len(json_body) / len(columnar_body):4.1f}x smaller, {json_ms / columnar_ms:5.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
+
+from routing import VEHICLE_CAPACITY_VOLUME, VEHICLE_CAPACITY_WEIGHT
+
+CLUSTER_FEATURES = ['latitude', 'longitude', 'delivery_time_numeric']
+
+# Hierarchical clustering: grid cell size in degrees (~5 km) and process pool size
+CLUSTER_GRID_CELL_DEG = float(os.getenv('CLUSTER_GRID_CELL_DEG', 0.05))
+CLUSTER_WORKERS = int(os.getenv('CLUSTER_WORKERS', os.cpu_count() or 1))
+CLUSTER_PARALLEL_MIN_ORDERS = int(os.getenv('CLUSTER_PARALLEL_MIN_ORDERS', 20000))
+
+
+def cluster_count(n_orders, max_clusters=8, orders_per_cluster=6):
+    """Number of clusters used for a batch of n_orders"""
+    return min(max_clusters, max(2, n_orders // orders_per_cluster))
+
+
+class IncrementalClusterer:
+    """Warm-started MiniBatchKMeans that keeps centroids and labels across batches
+
+    Centroids are kept in raw feature space so they survive updates to the
+    running scaler. Orders whose features are unchanged since the previous
+    batch keep their label; only new or moved orders are fed to partial_fit
+    and reassigned, which keeps cluster IDs stable for the dashboard.
+    """
+
+    def __init__(self, max_clusters=8, orders_per_cluster=6, random_state=42):
+        self.max_clusters = max_clusters
+        self.orders_per_cluster = orders_per_cluster
+        self.random_state = random_state
+        self.scaler = StandardScaler()
+        self.model = None
+        self.raw_centers = None
+        self.assignments = {}  # order_id -> (feature signature, cluster label)
+        self.lock = threading.Lock()
+
+    def new_model(self, n_clusters, init='k-means++'):
+        return MiniBatchKMeans(
+            n_clusters=n_clusters,
+            init=init,
+            n_init=1,
+            random_state=self.random_state
+        )
+
+    def resized_centers(self, n_clusters, raw_features):
+        """Keep existing centroid IDs and add the points farthest from them as new ones"""
+        centers = self.raw_centers[:n_clusters]
+        while len(centers) < n_clusters:
+            scaled_centers = self.scaler.transform(centers)
+            scaled_points = self.scaler.transform(raw_features)
+            dist = ((scaled_points[:, None, :] - scaled_centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+            centers = np.vstack([centers, raw_features[int(np.argmax(dist))]])
+        return centers
+
+    def fit_predict(self, orders_df):
+        """Return a cluster label per row, reassigning only orders that changed"""
+        with self.lock:
+            return self._fit_predict(orders_df)
+
+    def _fit_predict(self, orders_df):
+        raw_features = orders_df[CLUSTER_FEATURES].to_numpy(dtype=np.float64)
+        order_ids = orders_df['order_id'].tolist()
+        n_clusters = min(cluster_count(len(orders_df), self.max_clusters, self.orders_per_cluster), len(orders_df))
+
+        self.scaler.partial_fit(raw_features)
+        features = self.scaler.transform(raw_features)
+
+        previous = [self.assignments.get(order_id) for order_id in order_ids]
+        signatures = [tuple(row) for row in raw_features.tolist()]
+        changed = np.array([
+            prev is None or prev[0] != sig or prev[1] >= n_clusters
+            for prev, sig in zip(previous, signatures)
+        ])
+
+        if self.model is None:
+            self.model = self.new_model(n_clusters)
+            self.model.partial_fit(features)
+            changed[:] = True
+        elif n_clusters != self.model.n_clusters:
+            centers = self.resized_centers(n_clusters, raw_features)
+            self.model = self.new_model(n_clusters, init=self.scaler.transform(centers))
+            self.model.partial_fit(features)
+        else:
+            # Re-express the stored centroids in the updated scaler's space
+            self.model.cluster_centers_ = self.scaler.transform(self.raw_centers)
+            if changed.any():
+                self.model.partial_fit(features[changed])
+
+        labels = np.array([prev[1] if prev is not None else -1 for prev in previous], dtype=np.int64)
+        if changed.any():
+            labels[changed] = self.model.predict(features[changed])
+
+        self.raw_centers = self.scaler.inverse_transform(self.model.cluster_centers_)
+        self.assignments = {
+            order_id: (sig, int(label))
+            for order_id, sig, label in zip(order_ids, signatures, labels)
+        }
+        return labels
+
+
+def partition_keys(latitude, longitude, time_slot, cell_deg):
+    """Partition index per order from its grid cell and delivery time slot"""
+    keys = np.stack([
+        np.floor(latitude / cell_deg).astype(np.int64),
+        np.floor(longitude / cell_deg).astype(np.int64),
+        np.nan_to_num(time_slot, nan=0).astype(np.int64)
+    ], axis=1)
+    _, inverse = np.unique(keys, axis=0, return_inverse=True)
+    return inverse.reshape(-1)
+
+
+def partition_cluster_count(volume, weight, capacity_volume, capacity_weight):
+    """Enough clusters that each one roughly fills a single vehicle"""
+    k = max(
+        int(np.ceil(volume.sum() / capacity_volume)),
+        int(np.ceil(weight.sum() / capacity_weight)),
+        1
+    )
+    return min(k, len(volume))
+
+
+def cluster_partition(task):
+    """Cluster one grid/time-slot partition; runs inside a worker process"""
+    positions, coords, volume, weight, capacity_volume, capacity_weight, random_state = task
+    k = partition_cluster_count(volume, weight, capacity_volume, capacity_weight)
+    if k == 1:
+        return positions, np.zeros(len(positions), dtype=np.int64), 1
+
+    with threadpool_limits(limits=1):
+        scaled = StandardScaler().fit_transform(coords)
+        labels = KMeans(n_clusters=k, n_init=1, random_state=random_state).fit_predict(scaled)
+    return positions, labels.astype(np.int64), k
+
+
+class HierarchicalClusterer:
+    """Two-level clustering: grid/time-slot partitions, then KMeans per partition in a process pool"""
+
+    def __init__(self, workers=CLUSTER_WORKERS, cell_deg=CLUSTER_GRID_CELL_DEG,
+                 capacity_volume=VEHICLE_CAPACITY_VOLUME, capacity_weight=VEHICLE_CAPACITY_WEIGHT,
+                 parallel_min_orders=CLUSTER_PARALLEL_MIN_ORDERS, random_state=42):
+        self.workers = workers
+        self.cell_deg = cell_deg
+        self.capacity_volume = capacity_volume
+        self.capacity_weight = capacity_weight
+        self.parallel_min_orders = parallel_min_orders
+        self.random_state = random_state
+        self.pool = None
+
+    def executor(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def tasks(self, orders_df):
+        latitude = orders_df['latitude'].to_numpy(dtype=np.float64)
+        longitude = orders_df['longitude'].to_numpy(dtype=np.float64)
+        volume = orders_df['volume'].to_numpy(dtype=np.float64)
+        weight = orders_df['weight'].to_numpy(dtype=np.float64)
+        partitions = partition_keys(latitude, longitude,
+                                    orders_df['delivery_time_numeric'].to_numpy(dtype=np.float64),
+                                    self.cell_deg)
+
+        order = np.argsort(partitions, kind='stable')
+        bounds = np.flatnonzero(np.diff(partitions[order])) + 1
+        for positions in np.split(order, bounds):
+            yield (
+                positions,
+                np.column_stack([latitude[positions], longitude[positions]]),
+                volume[positions],
+                weight[positions],
+                self.capacity_volume,
+                self.capacity_weight,
+                self.random_state
+            )
+
+    def fit_predict(self, orders_df):
+        """Return globally unique cluster labels, numbered partition by partition"""
+        tasks = self.tasks(orders_df)
+        if self.workers > 1 and len(orders_df) >= self.parallel_min_orders:
+            results = self.executor().map(cluster_partition, tasks, chunksize=8)
+        else:
+            results = map(cluster_partition, tasks)
+
+        labels = np.empty(len(orders_df), dtype=np.int64)
+        offset = 0
+        for positions, partition_labels, k in results:
+            labels[positions] = partition_labels + offset
+            offset += k
+        return labels
@@ -0,0 +1,273 @@
+import numpy as np
+
+# Column kinds: 'float' (float64), 'int' (int64), 'category' (uint16 codes into a
+# per-column category list; code 0 is None) and 'text' (fixed-width UTF-8 bytes)
+ORDER_SCHEMA = {
+    'order_id': 'text',
+    'customer_id': 'category',
+    'latitude': 'float',
+    'longitude': 'float',
+    'delivery_address': 'text',
+    'phone': 'text',
+    'delivery_time_slot': 'category',
+    'package_size': 'category',
+    'priority': 'category',
+    'volume': 'float',
+    'weight': 'float',
+    'status': 'category',
+    'created_at': 'text',
+    'delivery_time_numeric': 'float',
+    'cluster_id': 'int'
+}
+
+DRIVER_SCHEMA = {
+    'driver_id': 'text',
+    'name': 'category',
+    'status': 'category',
+    'current_load_volume': 'float',
+    'vehicle_capacity_volume': 'float',
+    'current_load_weight': 'float',
+    'vehicle_capacity_weight': 'float',
+    'deliveries_today': 'int',
+    'rating': 'float',
+    'vehicle_type': 'category',
+    'latitude': 'float',
+    'longitude': 'float',
+    'last_update': 'text',
+    'phone': 'text'
+}
+
+# Drivers travel with a nested current_location in messages and API responses
+DRIVER_NESTED = {'current_location': ('latitude', 'longitude')}
+
+EMPTY = {'float': np.nan, 'int': 0, 'category': 0, 'text': b''}
+
+
+def encode_text(values):
+    """Strings to a fixed-width bytes array, taking NumPy's fast path for ASCII"""
+    values = np.asarray(values, dtype=str)
+    try:
+        return values.astype(f'S{max(values.dtype.itemsize // 4, 1)}')
+    except UnicodeEncodeError:
+        return np.char.encode(values, 'utf-8')
+
+
+def decode_text(array):
+    try:
+        return array.astype(f'U{max(array.dtype.itemsize, 1)}')
+    except UnicodeDecodeError:
+        return np.char.decode(array, 'utf-8')
+
+
+class RecordTable:
+    """Records stored as typed NumPy columns, with an ID -> row index
+
+    Repeated strings (statuses, slots, vehicle types) are dictionary-encoded
+    and free text is kept as fixed-width bytes, so a record costs tens of
+    bytes instead of a dict of Python objects. Rows stay dense: deleting a
+    record moves the last row into its place. Writes are vectorized per
+    column; records() rebuilds plain dicts, nested like the input, and is
+    meant for the API and socket boundary only. Not thread-safe on its own:
+    the owner serialises writes.
+    """
+
+    def __init__(self, key, schema, nested=None, capacity=1024):
+        self.key = key
+        self.schema = dict(schema)
+        self.nested = dict(nested or {})
+        self.flattened = {name for fields in self.nested.values() for name in fields}
+        self.row_index = {}
+        self.size = 0
+        self.categories = {name: [None] for name, kind in self.schema.items() if kind == 'category'}
+        self.category_codes = {name: {None: 0} for name in self.categories}
+        self.columns = {name: self.empty(kind, capacity) for name, kind in self.schema.items()}
+
+    @staticmethod
+    def empty(kind, capacity, width=1):
+        if kind == 'float':
+            return np.full(capacity, np.nan)
+        if kind == 'int':
+            return np.zeros(capacity, dtype=np.int64)
+        if kind == 'category':
+            return np.zeros(capacity, dtype=np.uint16)
+        return np.zeros(capacity, dtype=f'S{width}')
+
+    @property
+    def rows(self):
+        """ID -> row; after restore() it is rebuilt from the key column on first use"""
+        if self.row_index is None:
+            keys = decode_text(self.columns[self.key][:self.size]).tolist()
+            self.row_index = dict(zip(keys, range(self.size)))
+        return self.row_index
+
+    def __len__(self):
+        return self.size
+
+    def nbytes(self):
+        """Approximate memory held by the columns and the ID index"""
+        columns = sum(column.nbytes for column in self.columns.values())
+        # A dict slot plus the ID string and row int it points to
+        index = sum(len(key) + 49 + 28 + 24 for key in self.rows)
+        return columns + index
+
+    def grow(self, needed):
+        capacity = len(self.columns[self.key])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, column in self.columns.items():
+            grown = self.empty(self.schema[name], capacity, column.dtype.itemsize)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def encode_category(self, name, values):
+        """Category codes of values; missing ones (None or NaN) get code 0, which decodes to None"""
+        codes = self.category_codes[name]
+        categories = self.categories[name]
+        values = np.asarray(values, dtype=object)
+        # NaN is the one value not equal to itself
+        present = ~(np.equal(values, None) | np.not_equal(values, values))
+        encoded = np.zeros(len(values), dtype=np.uint16)
+        if not present.any():
+            return encoded
+        unique, inverse = np.unique(values[present].astype(str), return_inverse=True)
+        mapped = np.empty(len(unique), dtype=np.uint16)
+        for i, value in enumerate(unique.tolist()):
+            code = codes.get(value)
+            if code is None:
+                if len(categories) >= np.iinfo(np.uint16).max:
+                    raise ValueError(f'Too many distinct values for category column {name}')
+                code = codes[value] = len(categories)
+                categories.append(value)
+            mapped[i] = code
+        encoded[present] = mapped[inverse]
+        return encoded
+
+    def lookup(self, keys):
+        """Row of each key, -1 where the key is unknown"""
+        rows = self.rows
+        return np.fromiter((rows.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+    def flatten(self, records):
+        """List of dicts to column lists, pulling nested fields up"""
+        columns = {}
+        for name in self.schema:
+            if name in self.flattened:
+                continue
+            if any(name in record for record in records[:1]):
+                columns[name] = [record.get(name) for record in records]
+        for parent, fields in self.nested.items():
+            if records and parent in records[0]:
+                for field in fields:
+                    columns[field] = [(record.get(parent) or {}).get(field) for record in records]
+        return columns
+
+    def upsert_records(self, records):
+        return self.upsert_columns(self.flatten(list(records)))
+
+    def upsert_columns(self, columns):
+        """Insert or overwrite rows from column arrays keyed by self.key; returns their rows
+
+        Columns missing from the input keep their old value on existing rows
+        and are empty on new ones. Fields outside the schema are ignored.
+        """
+        keys = [str(key) for key in np.asarray(columns[self.key]).tolist()]
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        rows = self.lookup(keys)
+        new = np.flatnonzero(rows < 0)
+        if len(new):
+            # Duplicate new keys within one batch share a row; the last value wins
+            added = {}
+            for i in new.tolist():
+                rows[i] = added.setdefault(keys[i], self.size + len(added))
+            self.grow(self.size + len(added))
+            self.rows.update(added)
+            self.size += len(added)
+
+        for name, values in columns.items():
+            kind = self.schema.get(name)
+            if kind is None:
+                continue
+            column = self.columns[name]
+            if kind == 'category':
+                column[rows] = self.encode_category(name, values)
+            elif kind == 'text':
+                encoded = encode_text(values)
+                if encoded.dtype.itemsize > column.dtype.itemsize:
+                    column = self.columns[name] = column.astype(encoded.dtype)
+                column[rows] = encoded
+            elif kind == 'int':
+                column[rows] = np.asarray(values, dtype=np.int64)
+            else:
+                column[rows] = np.asarray(values, dtype=np.float64)
+        return rows
+
+    def delete(self, keys):
+        """Remove records by key; the last row moves into each freed slot"""
+        for key in keys:
+            row = self.rows.pop(key, None)
+            if row is None:
+                continue
+            last = self.size - 1
+            if row != last:
+                for name, column in self.columns.items():
+                    column[row] = column[last]
+                moved = decode_text(self.columns[self.key][row:row + 1])[0]
+                self.rows[str(moved)] = row
+            for name, column in self.columns.items():
+                column[last] = EMPTY[self.schema[name]]
+            self.size = last
+
+    def column(self, name):
+        """Live view of one column (category codes for category columns)"""
+        return self.columns[name][:self.size]
+
+    def code(self, name, value):
+        """Category code of a value, or -1 if it has never been stored"""
+        return self.category_codes[name].get(value, -1)
+
+    def values(self, name, rows=None):
+        """Decoded values of a column as a Python list"""
+        column = self.column(name) if rows is None else self.columns[name][rows]
+        kind = self.schema[name]
+        if kind == 'category':
+            categories = np.array(self.categories[name], dtype=object)
+            return categories[column].tolist()
+        if kind == 'text':
+            return decode_text(column).tolist()
+        return column.tolist()
+
+    def records(self, rows=None):
+        """Rows as dicts in the original record shape"""
+        names = [name for name in self.schema if name not in self.flattened]
+        decoded = {name: self.values(name, rows) for name in self.schema}
+        records = [dict(zip(names, row)) for row in zip(*(decoded[name] for name in names))]
+        for parent, fields in self.nested.items():
+            for record, values in zip(records, zip(*(decoded[field] for field in fields))):
+                record[parent] = dict(zip(fields, values))
+        return records
+
+    def export(self):
+        """Copies of the live rows of every column plus the category lists, for a snapshot"""
+        columns = {name: column[:self.size].copy() for name, column in self.columns.items()}
+        return columns, {name: list(values) for name, values in self.categories.items()}
+
+    def restore(self, columns, categories):
+        """Adopt exported columns, possibly memory-mapped, and drop the ID index
+
+        Columns are used as given until the table next grows, so a
+        copy-on-write memory map costs nothing until rows change.
+        """
+        size = len(columns[self.key])
+        self.columns = {name: columns[name] if name in columns else self.empty(kind, size)
+                        for name, kind in self.schema.items()}
+        for name in self.categories:
+            self.categories[name] = list(categories.get(name, [None]))
+            self.category_codes[name] = {value: code for code, value in enumerate(self.categories[name])}
+        self.size = size
+        self.row_index = None
+
+    def get(self, key):
+        row = self.rows.get(key)
+        return None if row is None else self.records(np.array([row]))[0]
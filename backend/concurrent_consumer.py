@@ -0,0 +1,161 @@
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import REGISTRY
+
+STAGE_SECONDS = REGISTRY.histogram('pipeline_stage_seconds', 'Time spent in each stage of handling a message',
+                                   ('consumer', 'stage'))
+EVENTS = REGISTRY.counter('pipeline_events_total', 'Messages received, acked, failed and other consumer events',
+                          ('consumer', 'event'))
+
+
+class StageStats:
+    """Rolling per-stage latencies and completion rate for a consumer
+
+    Everything recorded also goes to the consumer's Prometheus histograms
+    and counters, labelled with name.
+    """
+
+    def __init__(self, name, window=1000):
+        self.name = name
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.completed = deque(maxlen=window)
+        self.counts = defaultdict(int)
+
+    def record(self, timings):
+        for stage, seconds in timings.items():
+            STAGE_SECONDS.observe(seconds, consumer=self.name, stage=stage)
+        with self.lock:
+            for stage, seconds in timings.items():
+                self.latencies[stage].append(seconds)
+
+    def count(self, event, n=1):
+        EVENTS.inc(n, consumer=self.name, event=event)
+        with self.lock:
+            self.counts[event] += n
+            if event == 'acked':
+                self.completed.append(time.time())
+
+    def drain_rate(self, horizon=60):
+        """Messages acknowledged per second over the last horizon seconds"""
+        now = time.time()
+        with self.lock:
+            recent = [t for t in self.completed if now - t <= horizon]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-9)
+
+    def summary(self):
+        with self.lock:
+            stages = {
+                stage: {
+                    'count': len(values),
+                    'p50_ms': round(float(np.percentile(values, 50)) * 1000, 2),
+                    'p95_ms': round(float(np.percentile(values, 95)) * 1000, 2),
+                    'p99_ms': round(float(np.percentile(values, 99)) * 1000, 2),
+                    'max_ms': round(max(values) * 1000, 2)
+                }
+                for stage, values in self.latencies.items() if values
+            }
+            counts = dict(self.counts)
+        return {'counts': counts, 'drain_rate_per_s': round(self.drain_rate(), 2), 'stages': stages}
+
+
+class ConcurrentConsumer:
+    """Consume a queue with prefetch, run the heavy work in a pool, apply and ack in order
+
+    compute(body, content_type) runs in a worker thread or process and returns
+    (result, stage_timings). apply(result) runs on the finishing worker
+    thread, one call at a time. With ordered=True results are applied in
+    delivery order; otherwise they are applied as they finish and any result
+    older than one already applied is dropped, so newer state is never
+    overwritten. Acks go through the transport's Delivery objects, which are
+    safe to settle from worker threads. Each run() is a new generation:
+    results still finishing from an earlier connection are dropped unacked,
+    since their deliveries went with that connection and the broker redelivers them.
+    """
+
+    def __init__(self, queue, compute, apply, workers=4, mode='thread', prefetch=8, ordered=True):
+        self.queue = queue
+        self.compute = compute
+        self.apply = apply
+        self.workers = workers
+        self.mode = mode
+        self.prefetch = prefetch
+        self.ordered = ordered
+        self.stats = StageStats(queue)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        """Start a new generation of sequence numbers and return it"""
+        with self.lock:
+            self.generation += 1
+            self.next_to_apply = 0
+            self.last_applied = -1
+            self.pending = {}
+            self.sequence = itertools.count()
+            return self.generation
+
+    def make_executor(self):
+        if self.mode == 'process':
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f'{self.queue}-worker')
+
+    def run(self, transport):
+        """Consume until the transport's connection closes"""
+        executor = self.make_executor()
+        generation = self.reset()
+        sequence = self.sequence
+
+        def on_message(delivery):
+            seq = next(sequence)
+            received = time.perf_counter()
+            self.stats.count('received')
+            future = executor.submit(self.compute, delivery.body, delivery.content_type)
+            future.add_done_callback(lambda f: self.on_done(generation, seq, delivery, received, f))
+
+        try:
+            transport.consume(self.queue, on_message, prefetch=self.prefetch)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def on_done(self, generation, seq, delivery, received, future):
+        with self.lock:
+            if generation != self.generation:
+                self.stats.count('abandoned')
+                return
+            self.pending[seq] = (delivery, received, future)
+            if self.ordered:
+                while self.next_to_apply in self.pending:
+                    self.finish(self.next_to_apply, *self.pending.pop(self.next_to_apply))
+                    self.next_to_apply += 1
+            else:
+                self.finish(seq, *self.pending.pop(seq))
+
+    def finish(self, seq, delivery, received, future):
+        """Apply one computed result and ack it; caller holds self.lock"""
+        try:
+            result, timings = future.result()
+            if result is not None and seq > self.last_applied:
+                start = time.perf_counter()
+                self.apply(result)
+                timings['apply'] = time.perf_counter() - start
+                self.last_applied = seq
+            elif result is not None:
+                self.stats.count('stale')
+            timings['total'] = time.perf_counter() - received
+            self.stats.record(timings)
+            self.stats.count('acked')
+            delivery.ack()
+        except Exception as e:
+            print(f"Error processing {self.queue} message: {e}")
+            self.stats.count('failed')
+            delivery.nack(requeue=False)
@@ -0,0 +1,225 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+
+from lru_cache import LRUCache
+from routing import AVG_SPEED_KMH, DEPOT_LAT, DEPOT_LON, SERVICE_MINUTES_PER_STOP
+from spatial_index import haversine_km
+
+# Travel-time grid: cells per side of a square this many degrees wide around the depot;
+# points outside it take the pace of the nearest edge cell
+ETA_GRID_CELLS = int(os.getenv('ETA_GRID_CELLS', 32))
+ETA_GRID_SPAN_DEG = float(os.getenv('ETA_GRID_SPAN_DEG', 0.3))
+# Road km driven per km of straight line
+ETA_ROAD_FACTOR = float(os.getenv('ETA_ROAD_FACTOR', 1.3))
+# Observed speeds are folded into the grid at most this often, each refresh moving
+# a cell's speed this share of the way to the mean observed since the last one
+ETA_GRID_REFRESH_SECONDS = float(os.getenv('ETA_GRID_REFRESH_SECONDS', 30))
+ETA_SPEED_SMOOTHING = float(os.getenv('ETA_SPEED_SMOOTHING', 0.3))
+# Per-route stop-to-stop tables kept
+ETA_CACHE_SIZE = int(os.getenv('ETA_CACHE_SIZE', 4096))
+
+# Speed relative to the average by hour of day: free-flowing at night, slowest in the rush hours
+HOURLY_SPEED_FACTOR = np.array([1.35, 1.4, 1.4, 1.4, 1.35, 1.25, 1.0, 0.75, 0.7, 0.8, 0.95, 0.95,
+                                0.9, 0.95, 0.95, 0.9, 0.8, 0.7, 0.7, 0.85, 1.0, 1.1, 1.2, 1.3])
+# Slower points are vehicles stopped at a delivery, not traffic
+MIN_MOVING_KMH = 3.0
+
+
+def utc_offsets(timestamps):
+    """Local UTC offset in seconds at each epoch timestamp, following daylight-saving changes"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    # Offsets change only on quarter-hour boundaries, so each quarter hour is looked up once
+    quarters, inverse = np.unique(np.floor(timestamps / 900), return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(quarter * 900, timezone.utc).astimezone().utcoffset().total_seconds()
+                        for quarter in quarters.tolist()])
+    return offsets[inverse].reshape(timestamps.shape)
+
+
+def hour_of_day(timestamps):
+    """Local hour of epoch timestamps"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    return ((timestamps + utc_offsets(timestamps)) // 3600 % 24).astype(np.intp)
+
+
+def local_clock(timestamp):
+    """Local HH:MM of an epoch timestamp"""
+    return datetime.fromtimestamp(timestamp).strftime('%H:%M')
+
+
+class TravelTimeGrid:
+    """Minutes per km in each cell of a grid over the service area, for each hour of the day
+
+    Cells start from the average speed shaped by HOURLY_SPEED_FACTOR.
+    observe() accumulates the speeds vehicles report; refresh() folds them
+    into the cells and hours they were seen in and bumps the version. The
+    pace table is swapped whole, so readers never take the lock.
+    """
+
+    def __init__(self, center_lat=DEPOT_LAT, center_lon=DEPOT_LON, span=ETA_GRID_SPAN_DEG, cells=ETA_GRID_CELLS,
+                 avg_speed_kmh=AVG_SPEED_KMH, smoothing=ETA_SPEED_SMOOTHING, refresh_seconds=ETA_GRID_REFRESH_SECONDS):
+        self.min_lat = center_lat - span / 2
+        self.min_lon = center_lon - span / 2
+        self.cell_deg = span / cells
+        self.cells = cells
+        self.smoothing = smoothing
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.Lock()
+        self.speed = np.repeat((avg_speed_kmh * HOURLY_SPEED_FACTOR)[:, None], cells * cells, axis=1)
+        self.pace = 60.0 / self.speed
+        self.observed_sum = np.zeros_like(self.speed)
+        self.observed_count = np.zeros(self.speed.shape, dtype=np.int64)
+        self.observations = 0
+        self.refreshed_at = time.time()
+        self.version = 0
+
+    def cell(self, lat, lon):
+        row = np.clip(np.floor((np.asarray(lat) - self.min_lat) / self.cell_deg), 0, self.cells - 1)
+        col = np.clip(np.floor((np.asarray(lon) - self.min_lon) / self.cell_deg), 0, self.cells - 1)
+        return (row * self.cells + col).astype(np.intp)
+
+    def observe(self, lat, lon, speed, timestamps):
+        """Record reported speeds (km/h) at points and epoch times"""
+        speed = np.asarray(speed, dtype=np.float64)
+        moving = speed >= MIN_MOVING_KMH
+        if not moving.any():
+            return
+        hours = hour_of_day(np.asarray(timestamps)[moving])
+        cells = self.cell(np.asarray(lat)[moving], np.asarray(lon)[moving])
+        with self.lock:
+            np.add.at(self.observed_sum, (hours, cells), speed[moving])
+            np.add.at(self.observed_count, (hours, cells), 1)
+            self.observations += int(moving.sum())
+
+    def refresh(self, force=False):
+        """Fold the speeds observed since the last refresh into the grid; True if it changed"""
+        with self.lock:
+            now = time.time()
+            if not force and now - self.refreshed_at < self.refresh_seconds:
+                return False
+            self.refreshed_at = now
+            seen = self.observed_count > 0
+            if not seen.any():
+                return False
+            speed = self.speed.copy()
+            observed = self.observed_sum[seen] / self.observed_count[seen]
+            speed[seen] += self.smoothing * (observed - speed[seen])
+            self.speed, self.pace = speed, 60.0 / speed
+            self.observed_sum[:] = 0
+            self.observed_count[:] = 0
+            self.version += 1
+            return True
+
+    def leg_minutes(self, lat1, lon1, lat2, lon2, hour):
+        """Driving minutes of legs between points, at the mean pace of the cells at both ends and midway"""
+        pace = self.pace[hour]
+        mean_pace = (pace[self.cell(lat1, lon1)] + pace[self.cell((lat1 + lat2) / 2, (lon1 + lon2) / 2)]
+                     + pace[self.cell(lat2, lon2)]) / 3
+        return haversine_km(lat1, lon1, lat2, lon2) * ETA_ROAD_FACTOR * mean_pace
+
+    def summary(self):
+        with self.lock:
+            return {'version': self.version, 'cells': self.cells * self.cells, 'observations': self.observations,
+                    'mean_speed_kmh': round(float(self.speed.mean()), 2)}
+
+
+class ETAEngine:
+    """Arrival times at the remaining stops of many routes in one batched call
+
+    A route is given by its vehicle's position, its stops' coordinates and
+    the index of its next stop. The stop-to-stop legs of a route depend only
+    on its stops, the grid version and the hour, so each route's table of
+    cumulative minutes from its first stop, service time included, is kept
+    in an LRU cache under those. A batch computes the missing tables in one
+    vectorized pass, then the leg from every vehicle to its next stop in
+    another. The whole route is timed at the departure hour's speeds.
+    """
+
+    def __init__(self, grid=None, cache_size=ETA_CACHE_SIZE, service_minutes=SERVICE_MINUTES_PER_STOP, window=1000):
+        self.grid = grid or TravelTimeGrid()
+        self.service_minutes = service_minutes
+        self.tables = LRUCache(cache_size)
+        self.lock = threading.Lock()
+        self.counts = {'batches': 0, 'routes': 0, 'stops': 0}
+        self.latencies = deque(maxlen=window)
+
+    def stop_tables(self, routes, hour):
+        """Cumulative minutes from each route's first stop to every one of its stops"""
+        version = self.grid.version
+        keys = [(route['route_id'], route['stop_lat'].tobytes(), route['stop_lon'].tobytes(), version, hour)
+                for route in routes]
+        tables = [self.tables.get(key) for key in keys]
+        missing = [i for i, table in enumerate(tables) if table is None]
+        if not missing:
+            return tables
+
+        lat = np.concatenate([routes[i]['stop_lat'] for i in missing])
+        lon = np.concatenate([routes[i]['stop_lon'] for i in missing])
+        lengths = np.array([len(routes[i]['stop_lat']) for i in missing])
+        firsts = np.cumsum(lengths) - lengths
+        # Reaching a stop takes the service time at the previous one plus the leg from it
+        minutes = np.zeros(len(lat))
+        minutes[1:] = self.grid.leg_minutes(lat[:-1], lon[:-1], lat[1:], lon[1:], hour) + self.service_minutes
+        minutes[firsts[lengths > 0]] = 0.0
+        cumulative = np.cumsum(minutes)
+        for i, first, length in zip(missing, firsts.tolist(), lengths.tolist()):
+            # Copied out, so the cached table does not keep the whole batch alive
+            table = cumulative[first:first + length].copy()
+            if length:
+                table -= table[0]
+            self.tables.put(keys[i], table)
+            tables[i] = table
+        return tables
+
+    def estimate(self, routes, departure=None):
+        """Minutes from departure to each remaining stop, per route
+
+        routes are dicts with route_id, latitude and longitude of the
+        vehicle, stop_lat and stop_lon arrays and next_stop, the index of the
+        stop it is heading to. Returns {route_id: array over stops from
+        next_stop on}.
+        """
+        start = time.perf_counter()
+        departure = time.time() if departure is None else departure
+        hour = int(hour_of_day(departure))
+        routes = [route for route in routes if 0 <= route['next_stop'] < len(route['stop_lat'])]
+        tables = self.stop_tables(routes, hour)
+
+        if not routes:
+            etas = {}
+        else:
+            # All routes' tables end to end; each route keeps the part from its next stop on
+            lengths = np.array([len(table) for table in tables])
+            heading = np.cumsum(lengths) - lengths + np.array([route['next_stop'] for route in routes])
+            remaining = np.cumsum(lengths) - heading
+            flat = np.concatenate(tables)
+            first_leg = self.grid.leg_minutes(
+                np.array([route['latitude'] for route in routes], dtype=np.float64),
+                np.array([route['longitude'] for route in routes], dtype=np.float64),
+                np.concatenate([route['stop_lat'] for route in routes])[heading],
+                np.concatenate([route['stop_lon'] for route in routes])[heading],
+                hour)
+            positions = np.arange(remaining.sum()) + np.repeat(heading - (np.cumsum(remaining) - remaining),
+                                                               remaining)
+            minutes = flat[positions] + np.repeat(first_leg - flat[heading], remaining)
+            ends = np.cumsum(remaining).tolist()
+            etas = {route['route_id']: minutes[end - count:end]
+                    for route, end, count in zip(routes, ends, remaining.tolist())}
+
+        with self.lock:
+            self.counts['batches'] += 1
+            self.counts['routes'] += len(routes)
+            self.counts['stops'] += sum(len(eta) for eta in etas.values())
+            self.latencies.append(time.perf_counter() - start)
+        return etas
+
+    def summary(self):
+        with self.lock:
+            counts = dict(self.counts)
+            latency = {'p50_ms': round(float(np.percentile(self.latencies, 50)) * 1000, 2),
+                       'p95_ms': round(float(np.percentile(self.latencies, 95)) * 1000, 2)} if self.latencies else {}
+        return {'counts': counts, 'latency': latency, 'cache': self.tables.stats(), 'grid': self.grid.summary()}
@@ -0,0 +1,285 @@
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+import numpy as np
+
+from compact_store import DRIVER_NESTED, DRIVER_SCHEMA, ORDER_SCHEMA, RecordTable, decode_text
+
+OFF_DUTY_STATUSES = ('Offline',)
+
+
+def last_occurrences(keys):
+    """Indices of the last occurrence of each key, in first-seen order of those"""
+    keys = np.asarray(keys)
+    _, reversed_index = np.unique(keys[::-1], return_index=True)
+    return np.sort(len(keys) - 1 - reversed_index)
+
+
+class FleetState:
+    """Drivers and orders in compact record tables, with fleet statistics kept up to date
+
+    Each upsert reads the contribution of the rows it is about to overwrite,
+    writes the new rows and adds their contribution back, all with
+    vectorized column operations. An update therefore costs O(records in
+    the message) and stats() is O(1) whatever the fleet size. Delivery
+    times come from orders seen moving into 'Delivered' and are averaged
+    over the last `delivery_window` deliveries. Records leave as dicts only
+    through the *_records methods.
+    """
+
+    def __init__(self, delivery_window=500):
+        self.lock = threading.Lock()
+        self.drivers = RecordTable('driver_id', DRIVER_SCHEMA, DRIVER_NESTED)
+        self.orders = RecordTable('order_id', ORDER_SCHEMA, capacity=4096)
+        # Status counts keyed by category code
+        self.driver_status = Counter()
+        self.order_status = Counter()
+        self.deliveries_today = 0
+        # Load and capacity of on-duty drivers, for utilization
+        self.load_volume = 0.0
+        self.capacity_volume = 0.0
+        self.delivery_minutes = deque(maxlen=delivery_window)
+        self.delivery_minutes_sum = 0.0
+        self.active_clusters = 0
+
+    def count_codes(self, counter, codes, sign):
+        values, counts = np.unique(codes, return_counts=True)
+        for code, count in zip(values.tolist(), counts.tolist()):
+            counter[code] += sign * count
+
+    def add_drivers(self, rows, sign):
+        """Add (sign=1) or remove (sign=-1) the contribution of driver rows; caller holds the lock"""
+        columns = self.drivers.columns
+        status = columns['status'][rows]
+        self.count_codes(self.driver_status, status, sign)
+        self.deliveries_today += sign * int(columns['deliveries_today'][rows].sum())
+        on_duty = ~np.isin(status, [self.drivers.code('status', s) for s in OFF_DUTY_STATUSES])
+        self.load_volume += sign * float(np.nansum(columns['current_load_volume'][rows][on_duty]))
+        self.capacity_volume += sign * float(np.nansum(columns['vehicle_capacity_volume'][rows][on_duty]))
+
+    def upsert_drivers(self, drivers):
+        """Insert or update drivers from message records (nested current_location)"""
+        columns = self.drivers.flatten(list(drivers))
+        if not columns:
+            return
+        keep = last_occurrences(columns['driver_id'])
+        columns = {name: np.asarray(values, dtype=object)[keep] for name, values in columns.items()}
+        with self.lock:
+            rows = self.drivers.lookup(columns['driver_id'].tolist())
+            self.add_drivers(rows[rows >= 0], -1)
+            rows = self.drivers.upsert_columns(columns)
+            self.add_drivers(rows, 1)
+
+    def remove_drivers(self, driver_ids):
+        with self.lock:
+            rows = self.drivers.lookup(list(driver_ids))
+            self.add_drivers(rows[rows >= 0], -1)
+            self.drivers.delete(driver_ids)
+
+    def record_deliveries(self, rows, now):
+        """Add delivery times of the given order rows to the rolling window; caller holds the lock"""
+        for created_at in decode_text(self.orders.columns['created_at'][rows]).tolist():
+            try:
+                minutes = (now - datetime.fromisoformat(created_at).timestamp()) / 60
+            except ValueError:
+                continue
+            if len(self.delivery_minutes) == self.delivery_minutes.maxlen:
+                self.delivery_minutes_sum -= self.delivery_minutes[0]
+            self.delivery_minutes.append(minutes)
+            self.delivery_minutes_sum += minutes
+
+    def upsert_order_columns(self, columns, now):
+        """Insert or update orders given as column arrays; caller holds the lock
+
+        Returns (IDs of new orders, IDs of existing orders whose fields changed).
+        """
+        keep = last_occurrences(columns['order_id'])
+        columns = {name: np.asarray(values)[keep] for name, values in columns.items()}
+        order_ids = columns['order_id']
+        rows = self.orders.lookup(order_ids.tolist())
+        existing = rows >= 0
+        stored = [name for name in columns if name in self.orders.schema]
+        before = {name: self.orders.columns[name][rows[existing]] for name in stored}
+        previous = before['status'] if 'status' in before else self.orders.columns['status'][rows[existing]]
+        self.count_codes(self.order_status, previous, -1)
+
+        # Upserting may grow the table, so read the columns again afterwards
+        rows = self.orders.upsert_columns(columns)
+        current = self.orders.columns['status'][rows]
+        self.count_codes(self.order_status, current, 1)
+        delivered = self.orders.code('status', 'Delivered')
+        newly_delivered = rows[existing][(current[existing] == delivered) & (previous != delivered)]
+        if len(newly_delivered):
+            self.record_deliveries(newly_delivered, now)
+
+        changed = np.zeros(int(existing.sum()), dtype=bool)
+        for name in stored:
+            old, new = before[name], self.orders.columns[name][rows[existing]]
+            differs = old != new
+            if old.dtype.kind == 'f':
+                differs &= ~(np.isnan(old) & np.isnan(new))
+            changed |= differs
+        return order_ids[~existing].tolist(), order_ids[existing][changed].tolist()
+
+    def upsert_orders(self, orders, now=None):
+        """Insert or update orders from records or column arrays; returns (added IDs, changed IDs)"""
+        columns = orders if isinstance(orders, dict) else self.orders.flatten(list(orders))
+        if not columns:
+            return [], []
+        with self.lock:
+            return self.upsert_order_columns(columns, time.time() if now is None else now)
+
+    def remove_orders(self, order_ids):
+        with self.lock:
+            rows = self.orders.lookup(list(order_ids))
+            self.count_codes(self.order_status, self.orders.columns['status'][rows[rows >= 0]], -1)
+            self.orders.delete(order_ids)
+
+    def replace_orders(self, columns, now=None):
+        """Make the given order columns the whole order set; counters move only for changed orders
+
+        Returns the difference from the previous set as {'added', 'changed', 'removed'} ID lists.
+        """
+        incoming = set(np.asarray(columns['order_id']).tolist())
+        with self.lock:
+            stale = sorted(self.orders.rows.keys() - incoming)
+            rows = self.orders.lookup(stale)
+            self.count_codes(self.order_status, self.orders.columns['status'][rows], -1)
+            self.orders.delete(stale)
+            added, changed = [], []
+            if incoming:
+                added, changed = self.upsert_order_columns(columns, time.time() if now is None else now)
+            return {'added': added, 'changed': changed, 'removed': stale}
+
+    def set_active_clusters(self, count):
+        with self.lock:
+            self.active_clusters = count
+
+    def export(self):
+        """Consistent copy of both tables and the rolling state, for a snapshot"""
+        with self.lock:
+            return {
+                'drivers': self.drivers.export(),
+                'orders': self.orders.export(),
+                'delivery_minutes': list(self.delivery_minutes),
+                'active_clusters': self.active_clusters
+            }
+
+    def restore(self, drivers, orders, delivery_minutes=(), active_clusters=0):
+        """Load exported tables and recompute the counters from them"""
+        with self.lock:
+            self.drivers.restore(*drivers)
+            self.orders.restore(*orders)
+            self.driver_status.clear()
+            self.order_status.clear()
+            self.deliveries_today = 0
+            self.load_volume = self.capacity_volume = 0.0
+            self.add_drivers(np.arange(len(self.drivers)), 1)
+            self.count_codes(self.order_status, self.orders.column('status'), 1)
+            self.delivery_minutes.clear()
+            self.delivery_minutes.extend(delivery_minutes)
+            self.delivery_minutes_sum = float(sum(self.delivery_minutes))
+            self.active_clusters = active_clusters
+
+    def build_indexes(self):
+        """Rebuild the ID -> row maps dropped by restore() now rather than on the first lookup
+
+        Returns the number of IDs indexed.
+        """
+        with self.lock:
+            # RecordTable.rows rebuilds its map from the key column when first read
+            driver_rows = self.drivers.rows
+            order_rows = self.orders.rows
+            return len(driver_rows) + len(order_rows)
+
+    def driver_records(self, driver_ids=None):
+        """All drivers as dicts, or the given IDs in order with None for unknown ones"""
+        with self.lock:
+            return self.table_records(self.drivers, driver_ids)
+
+    def order_records(self, order_ids=None):
+        """All orders as dicts, or the given IDs in order with None for unknown ones"""
+        with self.lock:
+            return self.table_records(self.orders, order_ids)
+
+    @staticmethod
+    def table_records(table, keys):
+        if keys is None:
+            return table.records()
+        rows = table.lookup(list(keys))
+        found = iter(table.records(rows[rows >= 0]))
+        return [next(found) if row >= 0 else None for row in rows.tolist()]
+
+    def available_drivers(self):
+        """(driver IDs, lat, lon, remaining volume, remaining weight) of Available drivers"""
+        with self.lock:
+            columns = self.drivers.columns
+            size = len(self.drivers)
+            rows = np.flatnonzero((columns['status'][:size] == self.drivers.code('status', 'Available')) &
+                                  ~np.isnan(columns['latitude'][:size]))
+            return (self.drivers.values('driver_id', rows),
+                    columns['latitude'][rows], columns['longitude'][rows],
+                    columns['vehicle_capacity_volume'][rows] - columns['current_load_volume'][rows],
+                    columns['vehicle_capacity_weight'][rows] - columns['current_load_weight'][rows])
+
+    def available_driver_columns(self, names):
+        """Arrays of the named driver fields for Available drivers with a known location"""
+        with self.lock:
+            columns = self.drivers.columns
+            size = len(self.drivers)
+            rows = np.flatnonzero((columns['status'][:size] == self.drivers.code('status', 'Available')) &
+                                  ~np.isnan(columns['latitude'][:size]))
+            return {name: columns[name][rows] if self.drivers.schema[name] in ('float', 'int')
+                    else np.array(self.drivers.values(name, rows)) for name in names}
+
+    def open_order_rows(self):
+        """Rows of orders not yet delivered; caller holds the lock"""
+        return np.flatnonzero(self.orders.column('status') != self.orders.code('status', 'Delivered'))
+
+    def open_orders(self):
+        """(order IDs, lat, lon) of orders not yet delivered"""
+        with self.lock:
+            columns = self.orders.columns
+            rows = self.open_order_rows()
+            return self.orders.values('order_id', rows), columns['latitude'][rows], columns['longitude'][rows]
+
+    def order_columns(self, names, order_ids=None):
+        """Arrays of the named order fields for the given IDs (unknown ones skipped) or all open orders"""
+        with self.lock:
+            if order_ids is None:
+                rows = self.open_order_rows()
+            else:
+                rows = self.orders.lookup(list(order_ids))
+                rows = rows[rows >= 0]
+            return {name: self.orders.columns[name][rows] if self.orders.schema[name] in ('float', 'int')
+                    else np.array(self.orders.values(name, rows)) for name in names}
+
+    def on_duty_drivers(self):
+        with self.lock:
+            return len(self.drivers) - sum(self.driver_status[self.drivers.code('status', status)]
+                                           for status in OFF_DUTY_STATUSES)
+
+    def stats(self):
+        with self.lock:
+            def driver_count(status):
+                return self.driver_status[self.drivers.code('status', status)]
+
+            total = len(self.drivers)
+            on_duty = total - sum(driver_count(status) for status in OFF_DUTY_STATUSES)
+            on_route = driver_count('On Route')
+            utilization = self.load_volume / self.capacity_volume if self.capacity_volume > 0 else 0.0
+            delivered = len(self.delivery_minutes)
+            return {
+                'total_drivers': total,
+                'available_drivers': driver_count('Available'),
+                'active_routes': on_route,
+                'pending_orders': self.order_status[self.orders.code('status', 'Pending')],
+                'active_clusters': self.active_clusters,
+                'completed_deliveries': self.deliveries_today,
+                'avg_delivery_time': round(self.delivery_minutes_sum / delivered, 1) if delivered else None,
+                'utilization': round(utilization, 3),
+                # Share of on-duty drivers currently out on a route
+                'efficiency_score': round(100 * on_route / on_duty) if on_duty else 0
+            }
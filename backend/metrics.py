@@ -0,0 +1,262 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# Set to 0 to turn every metric into a no-op
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+
+# Histogram bucket upper bounds: seconds for latencies, plain counts for sizes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """One metric family: a value per combination of label values
+
+    Labels are passed as keyword arguments; labels left out are empty.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, help, labels=(), enabled=True):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def key(self, labels):
+        return tuple(map(labels.get, self.labels))
+
+    def label_text(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{escape("" if value is None else value)}"' for name, value in pairs) + '}'
+
+    def samples(self):
+        """(suffix, label key, extra labels, value) of every sample; caller holds the lock"""
+        return [('', key, (), value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {escape(self.help)}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            samples = self.samples()
+        lines.extend(f'{self.name}{suffix}{self.label_text(key, extra)} {number(value)}'
+                     for suffix, key, extra, value in samples)
+        return lines
+
+
+class CounterMetric(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class GaugeMetric(Metric):
+    """A value that is set, or read from collect() at render time as {label key tuple: value}"""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=(), enabled=True, collect=None):
+        super().__init__(name, help, labels, enabled)
+        self.collect = collect
+
+    def set(self, value, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+    def samples(self):
+        values = dict(self.values)
+        if self.collect is not None:
+            try:
+                values.update(self.collect())
+            except Exception as e:
+                print(f"Error collecting {self.name}: {e}")
+        return [('', key, (), value) for key, value in values.items()]
+
+
+class HistogramMetric(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), enabled=True, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels, enabled)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not self.enabled:
+            return
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        samples = []
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', key, (('le', number(bound)),), cumulative))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), count))
+        return samples
+
+
+class MetricsRegistry:
+    """Named metric families, rendered together in the Prometheus text format
+
+    Asking for a name that is already registered returns the existing family,
+    so modules can declare the metrics they use without coordinating.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, cls, name, help, labels, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, enabled=self.enabled, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(CounterMetric, name, help, labels)
+
+    def gauge(self, name, help, labels=(), collect=None):
+        return self.register(GaugeMetric, name, help, labels, collect=collect)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(HistogramMetric, name, help, labels, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at an interval while it runs
+
+    Counts collapsed stacks ("outer;inner;leaf count", what flame-graph
+    tools read) and the functions on top of them. Stopped, it costs nothing;
+    running, it reports the share of wall time it spent sampling.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        # Code object -> its label, so each function is formatted once
+        self.code_labels = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stacks = Counter()
+            self.leaves = Counter()
+            self.samples = 0
+            self.sampling_seconds = 0.0
+            self.running_seconds = 0.0
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval=None):
+        if interval is not None:
+            self.interval = interval
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def frame_label(self, frame):
+        code = frame.f_code
+        label = self.code_labels.get(code)
+        if label is None:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            self.code_labels[code] = label
+        return label
+
+    def run(self):
+        own = threading.get_ident()
+        started = time.perf_counter()
+        while not self.stop_event.wait(self.interval):
+            begin = time.perf_counter()
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(self.frame_label(frame))
+                    frame = frame.f_back
+                if labels:
+                    stacks.append(labels)
+            with self.lock:
+                for labels in stacks:
+                    self.stacks[';'.join(reversed(labels))] += 1
+                    self.leaves[labels[0]] += 1
+                self.samples += 1
+                self.sampling_seconds += time.perf_counter() - begin
+                self.running_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+
+    def collapsed(self):
+        with self.lock:
+            return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()) + '\n'
+
+    def report(self, limit=25):
+        with self.lock:
+            thread_samples = sum(self.leaves.values())
+            return {
+                'running': self.running,
+                'interval_ms': round(self.interval * 1000, 3),
+                'samples': self.samples,
+                'overhead': round(self.sampling_seconds / self.running_seconds, 4) if self.running_seconds else 0.0,
+                'top_functions': [{'function': name, 'samples': count,
+                                   'share': round(count / thread_samples, 4)}
+                                  for name, count in self.leaves.most_common(limit)]
+            }
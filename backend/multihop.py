@@ -0,0 +1,253 @@
+import heapq
+import json
+import math
+import os
+import numpy as np
+
+from lru_cache import LRUCache
+
+NETWORK_FILE = os.getenv('NETWORK_FILE', os.path.join(os.path.dirname(__file__), 'data', 'delivery_network.json'))
+PATH_CACHE_SIZE = int(os.getenv('PATH_CACHE_SIZE', 10000))
+# Most packages one plan request may route
+MAX_PLAN_PACKAGES = int(os.getenv('MAX_PLAN_PACKAGES', 100000))
+
+METRICS = ('time', 'cost', 'distance')
+
+# Share of each (mean-normalised) metric in the edge weight for a priority
+PRIORITY_WEIGHTS = {
+    'time': (1.0, 0.0, 0.0),
+    'cost': (0.0, 1.0, 0.0),
+    'distance': (0.0, 0.0, 1.0),
+    'balanced': (1 / 3, 1 / 3, 1 / 3)
+}
+
+# Searches for sources without a precomputed tree; sources with one always read it
+ALGORITHMS = ('astar', 'dijkstra')
+
+# Cache default telling a miss from a cached unreachable target (None)
+MISS = object()
+
+
+class DeliveryNetwork:
+    """Warehouse -> hub -> customer graph with precomputed shortest-path trees
+
+    Shortest-path trees are built at load time from every warehouse and hub
+    for every priority, which covers all hub-to-hub pairs and turns queries
+    from those nodes into table lookups. Other queries run A* or Dijkstra
+    and every answer, unreachable targets included, is kept in an LRU cache
+    keyed by (source, target, priority).
+    """
+
+    def __init__(self, nodes, edges, bidirectional=True, cache_size=PATH_CACHE_SIZE):
+        self.nodes = nodes
+        self.node_ids = [node['id'] for node in nodes]
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.coords = np.array([[node['x'], node['y']] for node in nodes], dtype=np.float64)
+
+        pairs = [(self.index[e['from']], self.index[e['to']]) for e in edges]
+        metrics = np.array([[e[m] for m in METRICS] for e in edges], dtype=np.float64)
+        if bidirectional:
+            pairs += [(b, a) for a, b in pairs]
+            metrics = np.vstack([metrics, metrics])
+        self.edge_metrics = metrics
+        self.adjacency = [[] for _ in nodes]
+        for edge, (a, b) in enumerate(pairs):
+            self.adjacency[a].append((b, edge))
+        self.edge_ends = np.array(pairs, dtype=np.intp)
+
+        scale = metrics.mean(axis=0)
+        self.edge_weights = {
+            priority: metrics @ (np.array(shares) / scale)
+            for priority, shares in PRIORITY_WEIGHTS.items()
+        }
+        # Cheapest weight per unit of straight-line length keeps the A* heuristic admissible
+        lengths = np.linalg.norm(self.coords[self.edge_ends[:, 0]] - self.coords[self.edge_ends[:, 1]], axis=1)
+        self.heuristic_scale = {
+            priority: float((weights / np.maximum(lengths, 1e-9)).min())
+            for priority, weights in self.edge_weights.items()
+        }
+
+        self.cache = LRUCache(cache_size)
+        self.trees = {}
+        for node in nodes:
+            if node['type'] in ('warehouse', 'hub'):
+                for priority in PRIORITY_WEIGHTS:
+                    self.trees[(node['id'], priority)] = self.dijkstra(self.index[node['id']], priority)
+
+    @classmethod
+    def load(cls, path=NETWORK_FILE):
+        with open(path) as f:
+            network = json.load(f)
+        return cls(network['nodes'], network['edges'], network.get('bidirectional', True))
+
+    def validate(self, priority, algorithm, source_id=None, packages=1):
+        if not 1 <= packages <= MAX_PLAN_PACKAGES:
+            raise ValueError(f"packages must be between 1 and {MAX_PLAN_PACKAGES}, got {packages}")
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {sorted(PRIORITY_WEIGHTS)}")
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {sorted(ALGORITHMS)}")
+        if source_id is not None and source_id not in self.index:
+            raise ValueError(f"Unknown source node '{source_id}'")
+
+    def search_algorithm(self, source_id, priority, algorithm):
+        """What answers queries from source_id: 'tree' if it has a precomputed one, else algorithm"""
+        return 'tree' if (source_id, priority) in self.trees else algorithm
+
+    def nodes_of_type(self, node_type):
+        return [node['id'] for node in self.nodes if node['type'] == node_type]
+
+    def hub_distances(self, priority='time'):
+        """All-pairs hub-to-hub weighted distances as {hub: {hub: weight}}"""
+        hubs = self.nodes_of_type('hub')
+        return {
+            a: {b: float(self.trees[(a, priority)][0][self.index[b]]) for b in hubs}
+            for a in hubs
+        }
+
+    def dijkstra(self, source, priority, targets=None):
+        """Shortest-path tree from source; stops early once every target is settled"""
+        weights = self.edge_weights[priority]
+        dist = np.full(len(self.nodes), np.inf)
+        prev = np.full(len(self.nodes), -1, dtype=np.intp)
+        prev_edge = np.full(len(self.nodes), -1, dtype=np.intp)
+        dist[source] = 0.0
+        remaining = set(targets) if targets is not None else None
+        heap = [(0.0, source)]
+        settled = np.zeros(len(self.nodes), dtype=bool)
+        while heap:
+            d, node = heapq.heappop(heap)
+            if settled[node]:
+                continue
+            settled[node] = True
+            if remaining is not None:
+                remaining.discard(node)
+                if not remaining:
+                    break
+            for neighbour, edge in self.adjacency[node]:
+                candidate = d + weights[edge]
+                if candidate < dist[neighbour]:
+                    dist[neighbour] = candidate
+                    prev[neighbour] = node
+                    prev_edge[neighbour] = edge
+                    heapq.heappush(heap, (candidate, neighbour))
+        return dist, prev, prev_edge
+
+    def astar(self, source, target, priority):
+        weights = self.edge_weights[priority]
+        scale = self.heuristic_scale[priority]
+        goal = self.coords[target]
+
+        def heuristic(node):
+            return scale * math.dist(self.coords[node], goal)
+
+        dist = {source: 0.0}
+        prev = {source: (-1, -1)}
+        heap = [(heuristic(source), source)]
+        closed = set()
+        while heap:
+            _, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+            for neighbour, edge in self.adjacency[node]:
+                candidate = dist[node] + weights[edge]
+                if candidate < dist.get(neighbour, math.inf):
+                    dist[neighbour] = candidate
+                    prev[neighbour] = (node, edge)
+                    heapq.heappush(heap, (candidate + heuristic(neighbour), neighbour))
+        if target not in prev:
+            return None
+
+        nodes, edges = [target], []
+        while prev[nodes[-1]][0] != -1:
+            node, edge = prev[nodes[-1]]
+            edges.append(edge)
+            nodes.append(node)
+        return nodes[::-1], edges[::-1]
+
+    def path_from_tree(self, tree, target):
+        dist, prev, prev_edge = tree
+        if not np.isfinite(dist[target]):
+            return None
+        nodes, edges = [target], []
+        while prev[nodes[-1]] != -1:
+            edges.append(int(prev_edge[nodes[-1]]))
+            nodes.append(int(prev[nodes[-1]]))
+        return nodes[::-1], edges[::-1]
+
+    def path_result(self, path):
+        if path is None:
+            return None
+        nodes, edges = path
+        totals = self.edge_metrics[edges].sum(axis=0) if edges else np.zeros(len(METRICS))
+        result = {'path': [self.node_ids[n] for n in nodes]}
+        result.update({metric: round(float(total), 3) for metric, total in zip(METRICS, totals)})
+        return result
+
+    def shortest_path(self, source_id, target_id, priority='time', algorithm='astar'):
+        """Best path between two nodes as {'path', 'time', 'cost', 'distance'}"""
+        key = (source_id, target_id, priority)
+        result = self.cache.get(key, MISS)
+        if result is not MISS:
+            return result
+
+        tree = self.trees.get((source_id, priority))
+        if tree is not None:
+            path = self.path_from_tree(tree, self.index[target_id])
+        elif algorithm == 'astar':
+            path = self.astar(self.index[source_id], self.index[target_id], priority)
+        else:
+            path = self.path_from_tree(self.dijkstra(self.index[source_id], priority), self.index[target_id])
+
+        result = self.path_result(path)
+        self.cache.put(key, result)
+        return result
+
+    def shortest_paths(self, source_id, target_ids, priority='time', algorithm='astar'):
+        """Best paths from one source to many targets with a single search for the cache misses"""
+        results = {target_id: self.cache.get((source_id, target_id, priority), MISS) for target_id in target_ids}
+        missing = [target_id for target_id, result in results.items() if result is MISS]
+        tree = self.trees.get((source_id, priority))
+        if len(missing) == 1 or (missing and tree is None and algorithm == 'astar'):
+            for target_id in missing:
+                results[target_id] = self.shortest_path(source_id, target_id, priority, algorithm)
+        elif missing:
+            if tree is None:
+                tree = self.dijkstra(self.index[source_id], priority, [self.index[t] for t in missing])
+            for target_id in missing:
+                result = self.path_result(self.path_from_tree(tree, self.index[target_id]))
+                self.cache.put((source_id, target_id, priority), result)
+                results[target_id] = result
+        return results
+
+    def plan(self, packages, priority='time', algorithm='astar', source_id=None):
+        """Route packages from a source (the warehouse by default) to customers, grouping packages per destination"""
+        self.validate(priority, algorithm, source_id, packages)
+        source_id = source_id or self.nodes_of_type('warehouse')[0]
+        customers = self.nodes_of_type('customer')
+        # Packages are dealt to customers in turn: every one gets `each`, the first `extra` one more
+        each, extra = divmod(packages, len(customers)) if customers else (0, 0)
+        destinations = {customer: each + (i < extra) for i, customer in enumerate(customers) if each + (i < extra)}
+
+        paths = self.shortest_paths(source_id, list(destinations), priority, algorithm)
+        routes = []
+        for destination, count in destinations.items():
+            result = paths[destination]
+            if result is None:
+                continue
+            routes.append(dict(result, destination=destination, packages=count,
+                               hops=len(result['path']) - 1))
+
+        return {
+            'nodes': self.nodes,
+            'source': source_id,
+            'algorithm': self.search_algorithm(source_id, priority, algorithm),
+            'packages': packages,
+            'optimized_routes': routes,
+            'total_cost': round(sum(r['cost'] for r in routes), 2),
+            'total_time': round(sum(r['time'] for r in routes), 3),
+            'total_distance': round(sum(r['distance'] for r in routes), 2)
+        }
@@ -0,0 +1,266 @@
+import json
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+
+import numpy as np
+
+from state_store import SECTION_KEYS
+
+# Log entries: version and payload length, then the encoded state-store delta
+LOG_HEADER = struct.Struct('<QI')
+CURRENT = 'CURRENT'
+
+
+class StatePersistence:
+    """Periodic on-disk snapshots of the dashboard state plus an append-only change log
+
+    Every state-store delta is queued from inside the commit, so in version
+    order, and appended to the current log segment by a writer thread;
+    consumers never wait on the disk. A snapshot takes references to the
+    state store's record dicts and an in-memory copy of the fleet tables,
+    then writes them from its own thread: fleet columns as .npy files,
+    records as newline-joined JSON. Each snapshot starts a new log segment,
+    and segments older than the snapshot are dropped once it is in place.
+
+    restore() memory-maps the newest snapshot's columns copy-on-write and
+    replays the newer log entries on top, cutting any torn tail off a
+    segment so entries appended after the restart follow a complete one.
+    Splitting records out of the joined bytes and rebuilding ID indexes
+    wait for first use or warm_up().
+    """
+
+    def __init__(self, directory, state_store, fleet_state, snapshot_interval=60.0,
+                 snapshot_log_bytes=64 * 2**20, fsync_interval=1.0):
+        self.directory = directory
+        self.state_store = state_store
+        self.fleet_state = fleet_state
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_log_bytes = snapshot_log_bytes
+        self.fsync_interval = fsync_interval
+        self.entries = queue.SimpleQueue()
+        self.snapshot_due = threading.Event()
+        self.stopped = threading.Event()
+        self.snapshot_version = 0
+        self.threads = []
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def start(self):
+        """Begin logging state-store commits and taking snapshots"""
+        with self.state_store.lock:
+            self.entries.put((self.state_store.version, None))
+            self.state_store.on_commit = self.on_commit
+        for target in (self.write_log, self.take_snapshots):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def on_commit(self, version, encoded):
+        """State-store hook; runs under its lock, so only queues the entry"""
+        self.entries.put((version, encoded))
+
+    def write_log(self):
+        """Append queued deltas to the current segment; (version, None) starts a new segment"""
+        log = None
+        written = 0
+        last_sync = time.monotonic()
+        while True:
+            try:
+                version, encoded = self.entries.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                if self.stopped.is_set():
+                    break
+                version = encoded = None
+            if encoded is None and version is not None:
+                if log is not None:
+                    log.close()
+                log = open(self.path(f'log-{version:012d}.bin'), 'ab')
+                written = 0
+            elif encoded is not None:
+                log.write(LOG_HEADER.pack(version, len(encoded)))
+                log.write(encoded)
+                written += LOG_HEADER.size + len(encoded)
+                if written > self.snapshot_log_bytes:
+                    self.snapshot_due.set()
+            if log is not None and (self.entries.empty() or time.monotonic() - last_sync > self.fsync_interval):
+                log.flush()
+                if time.monotonic() - last_sync > self.fsync_interval:
+                    os.fsync(log.fileno())
+                    last_sync = time.monotonic()
+        if log is not None:
+            log.flush()
+            os.fsync(log.fileno())
+            log.close()
+
+    def take_snapshots(self):
+        while not self.stopped.is_set():
+            self.snapshot_due.wait(self.snapshot_interval)
+            self.snapshot_due.clear()
+            if self.stopped.is_set():
+                break
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"Error writing state snapshot: {e}")
+
+    def snapshot(self):
+        """Write a snapshot of the current state; returns its version or None if nothing changed"""
+        with self.state_store.lock:
+            version, section_versions, records = self.state_store.export()
+            if version == self.snapshot_version:
+                return None
+            # Later deltas go to a new segment, so older ones can go with the old snapshot
+            self.entries.put((version, None))
+        # Taken after the version, so replaying newer deltas on top of it is idempotent
+        fleet = self.fleet_state.export()
+
+        name = f'snapshot-{version:012d}'
+        staging = self.path(name + '.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        meta = {
+            'version': version,
+            'section_versions': section_versions,
+            'fleet': {'delivery_minutes': fleet['delivery_minutes'], 'active_clusters': fleet['active_clusters']}
+        }
+        for table in ('drivers', 'orders'):
+            columns, categories = fleet[table]
+            meta['fleet'][table] = {'categories': categories, 'columns': list(columns)}
+            for column, values in columns.items():
+                np.save(os.path.join(staging, f'{table}.{column}.npy'), values)
+        for section, section_records in records.items():
+            with open(os.path.join(staging, f'{section}.keys.json'), 'w') as f:
+                json.dump(list(section_records), f)
+            with open(os.path.join(staging, f'{section}.jsonl'), 'wb') as f:
+                f.write(b'\n'.join(section_records.values()))
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        for filename in os.listdir(staging):
+            with open(os.path.join(staging, filename), 'rb') as f:
+                os.fsync(f.fileno())
+        os.replace(staging, self.path(name))
+
+        with open(self.path(CURRENT + '.tmp'), 'w') as f:
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path(CURRENT + '.tmp'), self.path(CURRENT))
+        self.snapshot_version = version
+        self.prune(version)
+        return version
+
+    def prune(self, version):
+        """Remove snapshots and log segments that the snapshot at version supersedes"""
+        for filename in os.listdir(self.directory):
+            stem, _, suffix = filename.partition('.')
+            kind, _, start = stem.partition('-')
+            if not start.isdigit() or int(start) >= version:
+                continue
+            if kind == 'snapshot':
+                shutil.rmtree(self.path(filename), ignore_errors=True)
+            elif kind == 'log' and suffix == 'bin':
+                os.remove(self.path(filename))
+
+    def restore(self):
+        """Load the newest snapshot and replay the log; returns the restored version or None"""
+        version = self.load_snapshot()
+        replayed = self.replay_log(repair=True)
+        if version is None and not replayed:
+            return None
+        self.snapshot_version = version or 0
+        return self.state_store.version
+
+    def warm_up(self):
+        """Do the per-record work restore() deferred, so the first updates after it don't pay for it"""
+        self.state_store.split_pending()
+        self.fleet_state.build_indexes()
+
+    def load_snapshot(self):
+        try:
+            with open(self.path(CURRENT)) as f:
+                directory = self.path(f.read().strip())
+            with open(os.path.join(directory, 'meta.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        fleet = meta['fleet']
+        tables = {}
+        for table in ('drivers', 'orders'):
+            columns = {column: np.load(os.path.join(directory, f'{table}.{column}.npy'), mmap_mode='c')
+                       for column in fleet[table]['columns']}
+            tables[table] = (columns, fleet[table]['categories'])
+        self.fleet_state.restore(tables['drivers'], tables['orders'],
+                                 fleet['delivery_minutes'], fleet['active_clusters'])
+
+        sections = {}
+        for section in SECTION_KEYS:
+            # Sections added since the snapshot was written start out empty
+            if not os.path.exists(os.path.join(directory, f'{section}.jsonl')):
+                continue
+            with open(os.path.join(directory, f'{section}.jsonl'), 'rb') as f:
+                joined = f.read()
+            sections[section] = (joined, self.section_loader(os.path.join(directory, f'{section}.keys.json'), joined))
+        self.state_store.restore(meta['version'], meta['section_versions'], sections)
+        return meta['version']
+
+    @staticmethod
+    def section_loader(keys_path, joined):
+        def load():
+            with open(keys_path) as f:
+                keys = json.load(f)
+            return dict(zip(keys, joined.split(b'\n'))) if keys else {}
+        return load
+
+    def log_entries(self, repair=False):
+        """(version, encoded delta) from every log segment in order, stopping at a torn write
+
+        With repair, a segment is truncated to its last complete entry once read.
+        """
+        segments = sorted(name for name in os.listdir(self.directory)
+                          if name.startswith('log-') and name.endswith('.bin'))
+        for name in segments:
+            with open(self.path(name), 'rb') as f:
+                data = f.read()
+            end = 0
+            while end + LOG_HEADER.size <= len(data):
+                version, length = LOG_HEADER.unpack_from(data, end)
+                start = end + LOG_HEADER.size
+                if start + length > len(data):
+                    break
+                yield version, data[start:start + length]
+                end = start + length
+            if repair and end < len(data):
+                print(f"Truncating torn log segment {name} from {len(data)} to {end} bytes")
+                os.truncate(self.path(name), end)
+
+    def replay_log(self, repair=False):
+        """Apply logged deltas newer than the loaded state to the store and the fleet tables"""
+        replayed = 0
+        for version, encoded in self.log_entries(repair):
+            if version <= self.state_store.version:
+                continue
+            delta = json.loads(encoded)
+            self.state_store.apply_delta(delta)
+            records = delta['added'] + delta['changed']
+            if delta['section'] == 'orders':
+                self.fleet_state.upsert_orders(records)
+                self.fleet_state.remove_orders(delta['removed'])
+            elif delta['section'] == 'drivers':
+                self.fleet_state.upsert_drivers(records)
+                self.fleet_state.remove_drivers(delta['removed'])
+            replayed += 1
+        return replayed
+
+    def close(self):
+        """Stop the threads after the queued deltas are written"""
+        self.stopped.set()
+        self.snapshot_due.set()
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,148 @@
+import json
+import queue
+import threading
+import time
+
+import pika
+
+# Queues used by the backend and the data processor, declared once at startup
+QUEUES = ['order_data', 'route_optimization', 'driver_updates', 'tracking_updates', 'agent_workflow',
+          'agent_results']
+
+PERSISTENT = pika.BasicProperties(delivery_mode=2, content_type='application/json')
+
+
+class PublisherUnavailable(Exception):
+    """Raised when no healthy broker connection can be obtained"""
+
+
+class PooledChannel:
+    """One long-lived connection and channel; used by a single thread at a time"""
+
+    def __init__(self, parameters, confirms):
+        self.parameters = parameters
+        self.confirms = confirms
+        self.connection = None
+        self.channel = None
+
+    def healthy(self):
+        return (self.connection is not None and self.connection.is_open and
+                self.channel is not None and self.channel.is_open)
+
+    def ensure_open(self):
+        if self.healthy():
+            return
+        self.close()
+        self.connection = pika.BlockingConnection(self.parameters)
+        self.channel = self.connection.channel()
+        if self.confirms:
+            self.channel.confirm_delivery()
+
+    def service(self):
+        """Let pika answer heartbeats and process broker events without blocking"""
+        if self.healthy():
+            self.connection.process_data_events(time_limit=0)
+
+    def close(self):
+        try:
+            if self.connection is not None and self.connection.is_open:
+                self.connection.close()
+        except Exception:
+            pass
+        self.connection = None
+        self.channel = None
+
+
+class PublisherPool:
+    """Shared pool of broker connections for the Flask handlers and consumer threads
+
+    A BlockingConnection is not thread-safe, so each pooled channel is
+    checked out by one thread for the duration of a publish. Broken
+    connections are reopened on checkout and the publish is retried once.
+    A maintenance thread services idle connections so they keep their
+    heartbeats. With confirms enabled basic_publish waits for the broker ack.
+    Every failure to deliver, a nack included, surfaces as PublisherUnavailable.
+    """
+
+    def __init__(self, parameters, size=4, confirms=False, acquire_timeout=5.0, maintenance_interval=10.0):
+        self.parameters = parameters
+        self.acquire_timeout = acquire_timeout
+        self.maintenance_interval = maintenance_interval
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(PooledChannel(parameters, confirms))
+        self.declared = False
+        self.maintenance = None
+
+    def start(self):
+        """Start the maintenance thread and declare queues"""
+        if self.maintenance is None:
+            self.maintenance = threading.Thread(target=self.maintain, daemon=True)
+            self.maintenance.start()
+        self.declare_queues()
+
+    def acquire(self):
+        try:
+            pooled = self.idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PublisherUnavailable('No publisher channel available')
+        try:
+            pooled.ensure_open()
+        except Exception as e:
+            self.idle.put(pooled)
+            raise PublisherUnavailable(f'Failed to connect to RabbitMQ: {e}')
+        return pooled
+
+    def release(self, pooled):
+        self.idle.put(pooled)
+
+    def declare_queues(self, queues=QUEUES):
+        pooled = self.acquire()
+        try:
+            for name in queues:
+                pooled.channel.queue_declare(queue=name, durable=True)
+            self.declared = True
+        except pika.exceptions.AMQPError as e:
+            pooled.close()
+            raise PublisherUnavailable(f'Failed to declare queues: {e!r}') from e
+        finally:
+            self.release(pooled)
+
+    def publish(self, routing_key, message, properties=PERSISTENT):
+        """Publish a JSON-serialisable message, reconnecting once if the channel broke"""
+        body = message if isinstance(message, (bytes, str)) else json.dumps(message)
+        if not self.declared:
+            self.declare_queues()
+        for attempt in range(2):
+            pooled = self.acquire()
+            try:
+                pooled.channel.basic_publish(exchange='', routing_key=routing_key,
+                                             body=body, properties=properties)
+                return
+            except (pika.exceptions.NackError, pika.exceptions.UnroutableError) as e:
+                # The broker refused the message over a working channel; resending won't help
+                raise PublisherUnavailable(f'RabbitMQ rejected the message for {routing_key}: {e!r}') from e
+            except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
+                pooled.close()
+                if attempt:
+                    raise PublisherUnavailable(f'Failed to publish to {routing_key}: {e!r}') from e
+            finally:
+                self.release(pooled)
+
+    def maintain(self):
+        while True:
+            time.sleep(self.maintenance_interval)
+            # Only touch connections that are idle right now
+            idle = []
+            while True:
+                try:
+                    idle.append(self.idle.get_nowait())
+                except queue.Empty:
+                    break
+            for pooled in idle:
+                try:
+                    pooled.service()
+                except Exception:
+                    pooled.close()
+                finally:
+                    self.idle.put(pooled)
@@ -0,0 +1,342 @@
+import hashlib
+import queue
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+
+from clustering import CLUSTER_FEATURES, cluster_count
+from compact_store import encode_text
+from json_codec import dumps
+from routing import (AVG_SPEED_KMH, DEPOT_LAT, DEPOT_LON, ROUTE_TIME_BUDGET_MS, SERVICE_MINUTES_PER_STOP,
+                     VEHICLE_CAPACITY_VOLUME, VEHICLE_CAPACITY_WEIGHT, RouteBuilder)
+
+# Order fields a job reads; together with the parameters they make up its content hash
+JOB_COLUMNS = ('order_id', 'latitude', 'longitude', 'volume', 'weight', 'delivery_time_numeric')
+
+# Parameters a submission may override; clusters=None picks the count from the order volume
+ROUTE_PARAMETERS = {
+    'clusters': None,
+    'depot_lat': DEPOT_LAT,
+    'depot_lon': DEPOT_LON,
+    'capacity_volume': VEHICLE_CAPACITY_VOLUME,
+    'capacity_weight': VEHICLE_CAPACITY_WEIGHT,
+    'avg_speed_kmh': AVG_SPEED_KMH,
+    'service_minutes': SERVICE_MINUTES_PER_STOP,
+    'time_budget_ms': ROUTE_TIME_BUDGET_MS
+}
+
+# Share of a job's progress taken by clustering; sequencing the clusters fills the rest
+CLUSTER_PROGRESS = 0.2
+
+
+def normalize_parameters(parameters):
+    """Defaults merged with a submission's overrides; raises ValueError for unknown or bad values"""
+    parameters = parameters or {}
+    unknown = set(parameters) - set(ROUTE_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown optimization parameters: {', '.join(sorted(unknown))}")
+    normalized = dict(ROUTE_PARAMETERS)
+    for name, value in parameters.items():
+        if value is not None:
+            normalized[name] = int(value) if name == 'clusters' else float(value)
+    if normalized['clusters'] is not None and normalized['clusters'] < 1:
+        raise ValueError('clusters must be at least 1')
+    return normalized
+
+
+def content_key(columns, parameters):
+    """Hash of the order set and parameters; the order in which orders are listed does not matter"""
+    order = np.argsort(np.asarray(columns['order_id']), kind='stable')
+    digest = hashlib.blake2b(digest_size=16)
+    for name in JOB_COLUMNS:
+        values = np.asarray(columns[name])[order]
+        digest.update(encode_text(values).tobytes() if name == 'order_id' else values.astype(np.float64).tobytes())
+    digest.update(dumps(sorted(parameters.items())))
+    return digest.hexdigest()
+
+
+def cluster_job(features, n_clusters):
+    """Cluster labels for a job's orders; runs in a worker process"""
+    if n_clusters <= 1:
+        return np.zeros(len(features), dtype=np.int64)
+    scaled = StandardScaler().fit_transform(features)
+    return KMeans(n_clusters=n_clusters, random_state=42).fit_predict(scaled)
+
+
+def route_cluster(order_ids, latitude, longitude, volume, weight, parameters):
+    """Vehicle routes for one cluster; runs in a worker process"""
+    builder = RouteBuilder(
+        depot=(parameters['depot_lat'], parameters['depot_lon']),
+        capacity_volume=parameters['capacity_volume'],
+        capacity_weight=parameters['capacity_weight'],
+        avg_speed_kmh=parameters['avg_speed_kmh'],
+        service_minutes=parameters['service_minutes'],
+        time_budget_ms=parameters['time_budget_ms']
+    )
+    return builder.build(order_ids, latitude, longitude, volume, weight)
+
+
+def cluster_summary(label, columns, positions, vehicle_routes):
+    """A solved cluster in the shape the order pipeline publishes"""
+    return {
+        'cluster_id': f"CLU-{label:02d}",
+        'centroid_lat': float(columns['latitude'][positions].mean()),
+        'centroid_lon': float(columns['longitude'][positions].mean()),
+        'order_count': int(len(positions)),
+        'total_volume': float(columns['volume'][positions].sum()),
+        'total_weight': float(columns['weight'][positions].sum()),
+        'order_ids': columns['order_id'][positions].tolist(),
+        'stops': [stop for vehicle_route in vehicle_routes for stop in vehicle_route['stops']],
+        'distance_km': round(sum(r['distance_km'] for r in vehicle_routes), 3),
+        'vehicle_routes': vehicle_routes,
+        'estimated_duration': int(sum(r['estimated_duration'] for r in vehicle_routes))
+    }
+
+
+class RouteJobEngine:
+    """Route-optimization jobs solved in a process pool, de-duplicated by content
+
+    A job clusters its orders in one task, then sequences every cluster as
+    its own task, so progress advances as clusters finish and one large job
+    spreads over all workers. Jobs are keyed by a hash of the order set and
+    parameters: a key already in the LRU completes at once from the cached
+    result, and a key that is being solved gets attached to that solve
+    instead of starting another. on_update receives a job's public record
+    on every status or progress change.
+
+    Pool futures' done callbacks run on the executor's management thread,
+    which must not submit more work, so they only hand the follow-up to a
+    dispatcher thread: the cluster fan-out and each cluster's completion
+    run there, one at a time.
+    """
+
+    def __init__(self, workers=2, cache_size=128, history=1000, on_update=None):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.history = history
+        self.on_update = on_update
+        self.executor = None
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.results = OrderedDict()
+        # Content key -> IDs of the jobs waiting on its solve
+        self.solving = {}
+        self.counts = Counter()
+        self.tasks = queue.Queue()
+        self.dispatcher = None
+
+    def pool(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self.executor
+
+    def dispatch(self, fn, *args):
+        """Run fn(*args) on the dispatcher thread"""
+        with self.lock:
+            if self.dispatcher is None:
+                self.dispatcher = threading.Thread(target=self.run_dispatcher, name='route-job-dispatcher',
+                                                   daemon=True)
+                self.dispatcher.start()
+        self.tasks.put((fn, args))
+
+    def run_dispatcher(self):
+        while True:
+            fn, args = self.tasks.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error in route job dispatch: {e}")
+
+    def add(self, job_id=None):
+        """Register a queued job; caller holds the lock"""
+        job_id = job_id or uuid.uuid4().hex
+        job = self.jobs[job_id] = {
+            'job_id': job_id, 'status': 'queued', 'progress': 0.0, 'cached': False,
+            'deduplicated': False, 'submitted_at': time.time()
+        }
+        while len(self.jobs) > self.history:
+            self.jobs.popitem(last=False)
+        return job
+
+    def create(self, job_id=None):
+        with self.lock:
+            return self.public(self.add(job_id))
+
+    @staticmethod
+    def public(job):
+        return {name: value for name, value in job.items() if name != 'result'}
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return None if job is None else self.public(job)
+
+    def result(self, job_id):
+        """(public job record, result or None), or None for an unknown job"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return None if job is None else (self.public(job), job.get('result'))
+
+    def notify(self, jobs):
+        if self.on_update is not None:
+            for job in jobs:
+                self.on_update(job)
+
+    def run(self, job_id, columns, parameters):
+        """Start, join or answer from cache the solve for one submission"""
+        key = content_key(columns, parameters)
+        with self.lock:
+            job = self.jobs.get(job_id) or self.add(job_id)
+            job.update(content_hash=key, order_count=int(len(columns['order_id'])), started_at=time.time())
+            cached = self.results.get(key)
+            start_solve = False
+            if cached is not None:
+                self.results.move_to_end(key)
+                job.update(status='completed', progress=1.0, cached=True, finished_at=time.time(), result=cached)
+                self.counts['cache_hits'] += 1
+            elif key in self.solving:
+                self.solving[key].append(job_id)
+                job.update(status='running', deduplicated=True,
+                           progress=self.jobs[self.solving[key][0]]['progress'])
+                self.counts['deduplicated'] += 1
+            else:
+                self.solving[key] = [job_id]
+                job['status'] = 'running'
+                self.counts['solved'] += 1
+                start_solve = True
+            updated = self.public(job)
+        self.notify([updated])
+        if start_solve:
+            self.solve(key, columns, parameters)
+
+    def solve(self, key, columns, parameters):
+        start = time.perf_counter()
+        columns = {name: np.asarray(columns[name]) for name in JOB_COLUMNS}
+        count = len(columns['order_id'])
+        if count == 0:
+            self.finish(key, {'clusters': [], 'order_count': 0, 'vehicle_count': 0,
+                              'total_distance_km': 0.0, 'solve_seconds': 0.0})
+            return
+        n_clusters = min(parameters['clusters'] or cluster_count(count), count)
+        features = np.column_stack([columns[name] for name in CLUSTER_FEATURES]).astype(np.float64)
+        pool = self.pool()
+        try:
+            future = pool.submit(cluster_job, features, n_clusters)
+        except Exception as e:
+            self.fail(key, e, pool)
+            return
+        future.add_done_callback(lambda f: self.dispatch(self.route_clusters, key, columns, parameters, f, start,
+                                                         pool))
+
+    def route_clusters(self, key, columns, parameters, clustered, start, pool):
+        """Fan the clusters out to the pool once clustering is done; runs on the dispatcher thread"""
+        futures = []
+        try:
+            labels = clustered.result()
+            groups = {label: np.flatnonzero(labels == label) for label in np.unique(labels).tolist()}
+            self.progress(key, CLUSTER_PROGRESS)
+            solved = {}
+            failed = threading.Event()
+
+            def on_routed(label, positions, future):
+                # The first failing cluster fails the job; the rest of its clusters are moot
+                if failed.is_set():
+                    return
+                try:
+                    summary = cluster_summary(label, columns, positions, future.result())
+                except Exception as e:
+                    failed.set()
+                    for pending in futures:
+                        pending.cancel()
+                    self.fail(key, e, pool)
+                    return
+                solved[label] = summary
+                finished = len(solved)
+                if finished < len(groups):
+                    self.progress(key, CLUSTER_PROGRESS + (1 - CLUSTER_PROGRESS) * finished / len(groups))
+                    return
+                clusters = [solved[label] for label in sorted(solved)]
+                self.finish(key, {
+                    'clusters': clusters,
+                    'order_count': len(columns['order_id']),
+                    'vehicle_count': sum(len(cluster['vehicle_routes']) for cluster in clusters),
+                    'total_distance_km': round(sum(cluster['distance_km'] for cluster in clusters), 3),
+                    'solve_seconds': round(time.perf_counter() - start, 3)
+                })
+
+            for label, positions in groups.items():
+                futures.append(pool.submit(
+                    route_cluster, columns['order_id'][positions].tolist(), columns['latitude'][positions],
+                    columns['longitude'][positions], columns['volume'][positions], columns['weight'][positions],
+                    parameters
+                ))
+            for (label, positions), future in zip(groups.items(), futures):
+                future.add_done_callback(
+                    lambda f, label=label, positions=positions: self.dispatch(on_routed, label, positions, f))
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            self.fail(key, e, pool)
+
+    def progress(self, key, progress):
+        with self.lock:
+            jobs = [self.jobs[job_id] for job_id in self.solving.get(key, ()) if job_id in self.jobs]
+            for job in jobs:
+                job['progress'] = round(progress, 3)
+            updated = [self.public(job) for job in jobs]
+        self.notify(updated)
+
+    def finish(self, key, result):
+        with self.lock:
+            self.results[key] = result
+            while len(self.results) > self.cache_size:
+                self.results.popitem(last=False)
+            updated = []
+            for job_id in self.solving.pop(key, ()):
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    job.update(status='completed', progress=1.0, finished_at=time.time(), result=result)
+                    updated.append(self.public(job))
+        self.notify(updated)
+
+    def fail(self, key, error, pool=None):
+        """Fail every job waiting on a solve, once
+
+        If pool broke and is still the current one, it is dropped and
+        replaced on the next submission.
+        """
+        with self.lock:
+            if pool is not None and pool is self.executor and 'BrokenProcessPool' in type(error).__name__:
+                self.executor = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            if key not in self.solving:
+                return
+            updated = []
+            for job_id in self.solving.pop(key):
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    job.update(status='failed', error=str(error), finished_at=time.time())
+                    updated.append(self.public(job))
+            self.counts['failed'] += 1
+        self.notify(updated)
+
+    def fail_job(self, job_id, error):
+        """Fail a single job that never reached the solver, e.g. a malformed message"""
+        with self.lock:
+            job = self.jobs.get(job_id) or self.add(job_id)
+            job.update(status='failed', error=str(error), finished_at=time.time())
+            updated = self.public(job)
+        self.notify([updated])
+
+    def summary(self):
+        with self.lock:
+            statuses = Counter(job['status'] for job in self.jobs.values())
+            return {'counts': dict(self.counts), 'jobs': dict(statuses),
+                    'cached_results': len(self.results), 'solving': len(self.solving)}
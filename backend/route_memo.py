@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from compact_store import encode_text
+
+
+def order_set_digest(order_ids, arrays, extra=b''):
+    """Hash of a set of orders and their numeric fields, independent of the order they are listed in"""
+    order_ids = np.asarray(order_ids)
+    order = np.argsort(order_ids, kind='stable')
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(encode_text(order_ids[order]).tobytes())
+    for values in arrays:
+        digest.update(np.asarray(values, dtype=np.float64)[order].tobytes())
+    digest.update(extra)
+    return digest.hexdigest()
+
+
+class ClusterRouteMemo:
+    """Per-cluster route solutions reused across batches while clusters are unchanged
+
+    A cluster's signature hashes its members' IDs, coordinates, volumes and
+    weights. A signature seen before reuses its stored vehicle routes. A
+    cluster whose membership changed a little is repaired from its previous
+    stop sequence: dropped stops are skipped and new ones inserted, so the
+    work follows the number of changes. Skipping a stop never lengthens a
+    tour, but insertions drift from what a fresh solve would find, so once
+    the stops inserted since the cluster was last solved from scratch
+    exceed `repair_fraction` of it, it is solved from scratch again. Cluster
+    labels must be stable across batches for repairs to apply, as with the
+    incremental clusterer; other labellings still get signature hits.
+    """
+
+    def __init__(self, capacity=512, repair_fraction=0.2):
+        self.capacity = capacity
+        self.repair_fraction = repair_fraction
+        self.lock = threading.Lock()
+        self.solutions = OrderedDict()
+        # Cluster label -> (signature, stop IDs in visiting order, stops inserted since a full solve)
+        self.previous = {}
+
+    def solve(self, label, order_ids, latitude, longitude, volume, weight, builder):
+        """(signature, vehicle routes, 'memo' | 'repaired' | 'solved') for one cluster"""
+        signature = order_set_digest(order_ids, (latitude, longitude, volume, weight))
+        with self.lock:
+            cached = self.solutions.get(signature)
+            if cached is not None:
+                self.solutions.move_to_end(signature)
+            previous = self.previous.get(label)
+
+        if cached is not None:
+            (vehicle_routes, drift), outcome = cached, 'memo'
+        else:
+            previous_stops, drift = None, 0
+            if previous is not None:
+                members = set(order_ids)
+                kept = sum(1 for order_id in previous[1] if order_id in members)
+                inserted = previous[2] + len(order_ids) - kept
+                if inserted <= self.repair_fraction * len(order_ids):
+                    previous_stops, drift = previous[1], inserted
+            vehicle_routes = builder.build(order_ids, latitude, longitude, volume, weight, previous_stops)
+            outcome = 'solved' if previous_stops is None else 'repaired'
+
+        stops = [stop for vehicle_route in vehicle_routes for stop in vehicle_route['stops']]
+        with self.lock:
+            self.solutions[signature] = (vehicle_routes, drift)
+            while len(self.solutions) > self.capacity:
+                self.solutions.popitem(last=False)
+            self.previous[label] = (signature, stops, drift)
+        return signature, vehicle_routes, outcome
@@ -0,0 +1,259 @@
+import os
+import time
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Store the vans leave from and return to
+DEPOT_LAT = float(os.getenv('DEPOT_LAT', 40.7589))
+DEPOT_LON = float(os.getenv('DEPOT_LON', -73.9851))
+
+# Vehicle limits match the fleet published by the data processor
+VEHICLE_CAPACITY_VOLUME = float(os.getenv('VEHICLE_CAPACITY_VOLUME', 10))
+VEHICLE_CAPACITY_WEIGHT = float(os.getenv('VEHICLE_CAPACITY_WEIGHT', 1000))
+
+AVG_SPEED_KMH = float(os.getenv('ROUTE_AVG_SPEED_KMH', 25))
+SERVICE_MINUTES_PER_STOP = float(os.getenv('ROUTE_SERVICE_MINUTES_PER_STOP', 4))
+ROUTE_TIME_BUDGET_MS = float(os.getenv('ROUTE_TIME_BUDGET_MS', 50))
+
+
+def haversine_matrix(lat, lon):
+    """Pairwise great-circle distances in km for equal-length lat/lon arrays"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    # sin((x - y) / 2) expanded into outer products keeps trig calls O(n)
+    sin_lat, cos_lat_half = np.sin(lat / 2), np.cos(lat / 2)
+    sin_lon, cos_lon_half = np.sin(lon / 2), np.cos(lon / 2)
+    sin_dlat = np.multiply.outer(sin_lat, cos_lat_half) - np.multiply.outer(cos_lat_half, sin_lat)
+    sin_dlon = np.multiply.outer(sin_lon, cos_lon_half) - np.multiply.outer(cos_lon_half, sin_lon)
+    cos_lat = np.cos(lat)
+    a = sin_dlat ** 2 + np.multiply.outer(cos_lat, cos_lat) * sin_dlon ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class LazyDistances:
+    """Stands in for haversine_matrix(lat, lon), computing only the entries that are indexed
+
+    dist[i, j] broadcasts i and j like fancy indexing of the full matrix
+    does, so matrix-based search code runs unchanged on it.
+    """
+
+    def __init__(self, lat, lon):
+        self.lat = np.radians(np.asarray(lat, dtype=np.float64))
+        self.lon = np.radians(np.asarray(lon, dtype=np.float64))
+        self.cos_lat = np.cos(self.lat)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, index):
+        i, j = index
+        a = (np.sin((self.lat[j] - self.lat[i]) / 2) ** 2 +
+             self.cos_lat[i] * self.cos_lat[j] * np.sin((self.lon[j] - self.lon[i]) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def tour_length(dist, tour):
+    return float(dist[tour[:-1], tour[1:]].sum())
+
+
+def nearest_neighbour_tour(dist):
+    """Closed tour starting and ending at node 0, visiting the nearest unvisited node each step"""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    tour = np.empty(n + 1, dtype=np.intp)
+    tour[0] = tour[n] = 0
+    current = 0
+    for step in range(1, n):
+        row = np.where(visited, np.inf, dist[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        tour[step] = current
+    return tour
+
+
+def two_opt(dist, tour, deadline):
+    """Improve a closed tour with 2-opt edge exchanges until no gain or the deadline passes"""
+    n = len(tour) - 1
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(0, n - 2):
+            a, b = tour[i], tour[i + 1]
+            c = tour[i + 2:n]
+            d = tour[i + 3:n + 1]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                j += i + 2
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return tour
+
+
+def two_opt_edges(dist, tour, nodes):
+    """2-opt limited to the edges on either side of the given nodes, each trying its best exchange once"""
+    for node in nodes:
+        for side in (0, 1):
+            i = int(np.flatnonzero(tour[1:-1] == node)[0]) + side
+            # Rows for a = tour[i] and b = tour[i + 1], so delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            from_a, from_b = dist[tour[i:i + 2, None], tour]
+            edges = dist[tour[:-1], tour[1:]]
+            delta = from_a[:-1] + from_b[1:] - edges[i] - edges
+            delta[max(i - 1, 0):i + 2] = np.inf
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                lo, hi = min(i, j), max(i, j)
+                tour[lo + 1:hi + 1] = tour[lo + 1:hi + 1][::-1]
+    return tour
+
+
+def or_opt(dist, tour, deadline, max_segment=3):
+    """Relocate segments of 1..max_segment stops to their cheapest position in the tour"""
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            n = len(tour) - 1
+            i = 1
+            while i + length <= n:
+                p, s0, s1, q = tour[i - 1], tour[i], tour[i + length - 1], tour[i + length]
+                removal_gain = dist[p, s0] + dist[s1, q] - dist[p, q]
+                rest = np.concatenate((tour[:i], tour[i + length:]))
+                a, b = rest[:-1], rest[1:]
+                insert_cost = dist[a, s0] + dist[s1, b] - dist[a, b]
+                k = int(np.argmin(insert_cost))
+                # Position i - 1 in rest is the gap the segment was removed from
+                if k != i - 1 and insert_cost[k] < removal_gain - 1e-9:
+                    segment = tour[i:i + length].copy()
+                    tour = np.concatenate((rest[:k + 1], segment, rest[k + 1:]))
+                    improved = True
+                i += 1
+                if time.perf_counter() >= deadline:
+                    return tour
+    return tour
+
+
+class RouteBuilder:
+    """Build capacity-feasible, distance-optimized stop sequences for a cluster"""
+
+    def __init__(self, depot=(DEPOT_LAT, DEPOT_LON),
+                 capacity_volume=VEHICLE_CAPACITY_VOLUME,
+                 capacity_weight=VEHICLE_CAPACITY_WEIGHT,
+                 avg_speed_kmh=AVG_SPEED_KMH,
+                 service_minutes=SERVICE_MINUTES_PER_STOP,
+                 time_budget_ms=ROUTE_TIME_BUDGET_MS):
+        self.depot = depot
+        self.capacity_volume = capacity_volume
+        self.capacity_weight = capacity_weight
+        self.avg_speed_kmh = avg_speed_kmh
+        self.service_minutes = service_minutes
+        self.time_budget_ms = time_budget_ms
+
+    def route_duration(self, distance_km, stop_count):
+        """Driving time at the average speed plus a fixed service time per stop"""
+        return int(round(distance_km / self.avg_speed_kmh * 60 + stop_count * self.service_minutes))
+
+    def sequence(self, dist, deadline):
+        tour = nearest_neighbour_tour(dist)
+        if len(dist) > 3:
+            tour = two_opt(dist, tour, deadline)
+            tour = or_opt(dist, tour, deadline)
+        return tour
+
+    def repair(self, dist, initial, touched=()):
+        """Warm-start tour: surviving stops keep their previous order, the rest go in at their cheapest gap
+
+        initial lists node indices in their previous visiting order and
+        touched the ones whose neighbours changed. Local search is limited
+        to the edges around inserted and touched nodes, so with
+        LazyDistances the work grows with the number of changed stops
+        rather than the cluster size.
+        """
+        tour = np.concatenate(([0], initial, [0])).astype(np.intp)
+        missing = np.ones(len(dist), dtype=bool)
+        missing[tour] = False
+        inserted = np.flatnonzero(missing).tolist()
+        for node in inserted:
+            to_node = dist[node, tour]
+            k = int(np.argmin(to_node[:-1] + to_node[1:] - dist[tour[:-1], tour[1:]]))
+            tour = np.insert(tour, k + 1, node)
+        if len(dist) > 3:
+            tour = two_opt_edges(dist, tour, inserted + list(touched))
+        return tour
+
+    def split_by_capacity(self, tour, volume, weight):
+        """Cut a sequenced tour into consecutive legs that fit one vehicle"""
+        legs, current = [], []
+        load_volume = load_weight = 0.0
+        for node in tour[1:-1]:
+            stop = node - 1
+            if current and (load_volume + volume[stop] > self.capacity_volume or
+                            load_weight + weight[stop] > self.capacity_weight):
+                legs.append(current)
+                current, load_volume, load_weight = [], 0.0, 0.0
+            current.append(stop)
+            load_volume += volume[stop]
+            load_weight += weight[stop]
+        if current:
+            legs.append(current)
+        return legs
+
+    def build(self, order_ids, latitude, longitude, volume, weight, previous_stops=None):
+        """Return the vehicle routes for one cluster of orders
+
+        previous_stops, the cluster's stop IDs from an earlier solution in
+        visiting order, switches to repairing that sequence instead of
+        solving from scratch.
+        """
+        if len(order_ids) == 0:
+            return []
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        volume = np.asarray(volume, dtype=np.float64)
+        weight = np.asarray(weight, dtype=np.float64)
+
+        # Node 0 is the depot, node i + 1 is order i
+        lat = np.concatenate(([self.depot[0]], latitude))
+        lon = np.concatenate(([self.depot[1]], longitude))
+
+        if previous_stops is not None:
+            dist = LazyDistances(lat, lon)
+            index = {order_id: i + 1 for i, order_id in enumerate(order_ids)}
+            initial = [index.get(order_id) for order_id in previous_stops]
+            # Stops right after a removed one have a new incoming edge
+            touched = {node for node, before in zip(initial, [1] + initial[:-1]) if node and before is None}
+            tour = self.repair(dist, np.array([node for node in initial if node], dtype=np.intp), touched)
+        else:
+            dist = haversine_matrix(lat, lon)
+            tour = self.sequence(dist, deadline)
+        legs = self.split_by_capacity(tour, volume, weight)
+
+        vehicle_routes = []
+        for leg in legs:
+            nodes = np.concatenate(([0], np.asarray(leg) + 1))
+            if len(legs) > 1:
+                if previous_stops is not None:
+                    # A leg already follows the repaired tour; only its ends get new (depot) edges
+                    sub_dist = haversine_matrix(lat[nodes], lon[nodes])
+                    sub_tour = self.repair(sub_dist, np.arange(1, len(nodes)), {1, len(nodes) - 1})
+                else:
+                    sub_tour = self.sequence(dist[np.ix_(nodes, nodes)], deadline)
+                nodes = nodes[sub_tour]
+            else:
+                nodes = tour
+            stops = nodes[1:-1] - 1
+            distance = tour_length(dist, nodes)
+            vehicle_routes.append({
+                'stops': [order_ids[s] for s in stops],
+                'distance_km': round(distance, 3),
+                'estimated_duration': self.route_duration(distance, len(stops)),
+                'total_volume': float(volume[stops].sum()),
+                'total_weight': float(weight[stops].sum()),
+                'centroid_lat': float(lat[nodes[1:-1]].mean()),
+                'centroid_lon': float(lon[nodes[1:-1]].mean())
+            })
+        return vehicle_routes
@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+
+# The delivery windows customers choose from, in order through the day
+TIME_WINDOWS = ['09:00-11:00', '11:00-13:00', '13:00-15:00', '15:00-17:00', '17:00-19:00', '19:00-21:00']
+WINDOW_MINUTES = 120
+DAY_START_MINUTE = 9 * 60
+
+# Drivers on shift in each window as comma-separated counts; unset uses every on-duty driver for all of them
+SCHEDULE_DRIVERS_PER_WINDOW = os.getenv('SCHEDULE_DRIVERS_PER_WINDOW', '')
+
+
+def drivers_per_window(on_duty):
+    """Driver count per window: the configured shift plan, or on_duty in every window"""
+    if SCHEDULE_DRIVERS_PER_WINDOW:
+        counts = [int(count) for count in SCHEDULE_DRIVERS_PER_WINDOW.split(',')]
+        if len(counts) != len(TIME_WINDOWS):
+            raise ValueError(f'SCHEDULE_DRIVERS_PER_WINDOW needs {len(TIME_WINDOWS)} counts')
+        return np.array(counts, dtype=np.int64)
+    return np.full(len(TIME_WINDOWS), on_duty, dtype=np.int64)
+
+
+def requested_windows(route_stops, order_ids, slot_numbers):
+    """(routes x windows) count of each route's stops that asked for each window
+
+    slot_numbers holds each order's window as 1..6 (NaN when unknown);
+    stops of unknown orders or slots are not counted.
+    """
+    counts = np.zeros((len(route_stops), len(TIME_WINDOWS)), dtype=np.int64)
+    lengths = [len(stops) for stops in route_stops]
+    if not sum(lengths):
+        return counts
+    index = {order_id: i for i, order_id in enumerate(order_ids)}
+    positions = np.array([index.get(stop, -1) for stops in route_stops for stop in stops], dtype=np.intp)
+    routes = np.repeat(np.arange(len(route_stops)), lengths)
+    slots = np.full(len(positions), np.nan)
+    known = positions >= 0
+    slots[known] = np.asarray(slot_numbers, dtype=np.float64)[positions[known]]
+    valid = ~np.isnan(slots) & (slots >= 1) & (slots <= len(TIME_WINDOWS))
+    np.add.at(counts, (routes[valid], slots[valid].astype(np.int64) - 1), 1)
+    return counts
+
+
+def clock(minute):
+    """Minutes since the first window opened, as HH:MM"""
+    minute = DAY_START_MINUTE + int(minute)
+    return f'{minute // 60:02d}:{minute % 60:02d}'
+
+
+def schedule_routes(durations, requested, window_drivers):
+    """Pack routes into delivery windows on the drivers on shift in each
+
+    Every driver is a timeline through the day. A route starts inside its
+    window, on a driver who is on shift from that start until the route ends,
+    and may run on into the next windows. A route is only placed in a window
+    some of its stops asked for. It tries those windows from most to fewest
+    requested stops, and routes go into each window longest first. The driver
+    chosen is the one who becomes free closest to the start, so the least time
+    is left idle.
+
+    Returns (window index per route, -1 if unscheduled; start minute per route).
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    n_routes, n_windows = len(durations), len(TIME_WINDOWS)
+    window_drivers = np.asarray(window_drivers, dtype=np.int64)
+    n_drivers = int(window_drivers.max()) if len(window_drivers) else 0
+
+    # Driver k works in window w when k < window_drivers[w]; shift_end[k, w] is
+    # when the stretch of windows they work from w on ends (0 if off in w)
+    on_shift = np.arange(n_drivers)[:, None] < window_drivers[None, :]
+    shift_end = np.zeros((n_drivers, n_windows))
+    shift_end[:, -1] = np.where(on_shift[:, -1], n_windows * WINDOW_MINUTES, 0)
+    for w in range(n_windows - 2, -1, -1):
+        runs_on = np.where(on_shift[:, w + 1], shift_end[:, w + 1], (w + 1) * WINDOW_MINUTES)
+        shift_end[:, w] = np.where(on_shift[:, w], runs_on, 0)
+
+    windows = np.full(n_routes, -1, dtype=np.int64)
+    starts = np.zeros(n_routes)
+    free_at = np.zeros(n_drivers)
+    if n_drivers == 0 or n_routes == 0:
+        return windows, starts
+
+    # Routes without any known requested window may go in any window, earliest first
+    requested = np.asarray(requested, dtype=np.int64)
+    unknown = requested.sum(axis=1) == 0
+    preference = np.argsort(-requested, axis=1, kind='stable')
+    choices = np.where(unknown, n_windows, (requested > 0).sum(axis=1))
+
+    for choice in range(n_windows):
+        pending = np.flatnonzero((windows < 0) & (choices > choice))
+        if not len(pending):
+            break
+        window_choice = preference[pending, choice]
+        for r in pending[np.lexsort((-durations[pending], window_choice))].tolist():
+            w = int(preference[r, choice])
+            start = np.maximum(free_at, w * WINDOW_MINUTES)
+            fits = (start < (w + 1) * WINDOW_MINUTES) & (start + durations[r] <= shift_end[:, w])
+            if not fits.any():
+                continue
+            k = int(np.argmax(np.where(fits, free_at, -np.inf)))
+            windows[r], starts[r] = w, start[k]
+            free_at[k] = start[k] + durations[r]
+    return windows, starts
+
+
+def schedule_report(durations, requested, window_drivers, windows, starts, route_stops=None):
+    """Per-window load and utilization, plus orders left unscheduled or booked outside their window
+
+    With route_stops, every stop of an unscheduled route counts as an
+    unscheduled order, slot known or not, and their IDs are listed.
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    requested = np.asarray(requested, dtype=np.int64)
+    scheduled = windows >= 0
+    # Driver minutes each scheduled route spends inside each window
+    bounds = np.arange(len(TIME_WINDOWS) + 1) * WINDOW_MINUTES
+    ends = starts + durations
+    overlap = np.clip(np.minimum(ends[:, None], bounds[None, 1:]) - np.maximum(starts[:, None], bounds[None, :-1]),
+                      0, None) * scheduled[:, None]
+    busy = overlap.sum(axis=0)
+    requested_total = requested.sum(axis=1)
+    on_time = requested[np.flatnonzero(scheduled), windows[scheduled]]
+
+    report = {'windows': [], 'routes': int(len(durations)), 'scheduled_routes': int(scheduled.sum()),
+              'unscheduled_routes': int((~scheduled).sum()),
+              'unscheduled_orders': int(requested_total[~scheduled].sum()),
+              'off_window_orders': int(requested_total[scheduled].sum() - on_time.sum())}
+    if route_stops is not None:
+        unscheduled = [stop for route in np.flatnonzero(~scheduled).tolist() for stop in route_stops[route]]
+        report.update(unscheduled_orders=len(unscheduled), unscheduled_order_ids=unscheduled)
+    for w, name in enumerate(TIME_WINDOWS):
+        capacity = int(window_drivers[w]) * WINDOW_MINUTES
+        report['windows'].append({
+            'time_window': name,
+            'drivers': int(window_drivers[w]),
+            'routes_starting': int((windows == w).sum()),
+            'requested_orders': int(requested[:, w].sum()),
+            'busy_minutes': round(float(busy[w]), 1),
+            'utilization': round(float(busy[w]) / capacity, 4) if capacity else None
+        })
+    return report
@@ -0,0 +1,57 @@
+import gzip
+import hashlib
+import threading
+
+from json_codec import dumps
+
+GZIP_LEVEL = 6
+
+
+class DashboardSnapshot:
+    """Immutable, pre-encoded copy of delivery_data for one update
+
+    Each section is encoded once when the snapshot is built. The full body
+    and any ?sections= slice are assembled from those bytes, gzipped and
+    tagged on first request, then reused until the next snapshot replaces
+    this one.
+    """
+
+    def __init__(self, data, version):
+        self.version = version
+        self.section_names = list(data)
+        # Sections may arrive already encoded, e.g. from the state store
+        self.sections = {name: value if isinstance(value, bytes) else dumps(value) for name, value in data.items()}
+        self.renders = {}
+        self.lock = threading.Lock()
+
+    def render(self, sections=None):
+        """Return (body, gzipped_body, etag) for all sections or the named subset"""
+        names = tuple(name for name in (sections or self.section_names) if name in self.sections)
+        with self.lock:
+            rendered = self.renders.get(names)
+            if rendered is None:
+                body = b'{' + b','.join(b'"%s":%s' % (name.encode(), self.sections[name]) for name in names) + b'}'
+                etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+                rendered = (body, gzip.compress(body, GZIP_LEVEL), etag)
+                self.renders[names] = rendered
+            return rendered
+
+
+class SnapshotPublisher:
+    """Holds the latest dashboard snapshot; consumers publish, request handlers read"""
+
+    def __init__(self, data):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.snapshot = DashboardSnapshot(data, self.version)
+
+    def publish(self, data):
+        """Build a new snapshot from a shallow copy of data and make it current"""
+        with self.lock:
+            self.version += 1
+            snapshot = DashboardSnapshot(dict(data), self.version)
+            self.snapshot = snapshot
+        return snapshot
+
+    def current(self):
+        return self.snapshot
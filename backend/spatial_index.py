@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from routing import EARTH_RADIUS_KM
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class PointIndex:
+    """KD-tree over lat/lon points, rebuilt and swapped atomically on each update
+
+    Longitude is scaled by cos(latitude) of the service area so Euclidean
+    distance in the tree ranks points the same way as great-circle distance.
+    The index stores record IDs; `resolve` turns the IDs of a result into
+    current records (None for IDs that no longer exist). With a `source`
+    returning update()'s arguments, writers can just invalidate() and the
+    tree is rebuilt once, by the next query, however many updates came in.
+    """
+
+    def __init__(self, resolve=None, source=None):
+        self.snapshot = None
+        self.resolve = resolve
+        self.source = source
+        self.stale = False
+        self.rebuild_lock = threading.Lock()
+
+    def invalidate(self):
+        """Mark the index out of date; the next query rebuilds it from source"""
+        self.stale = True
+
+    def current(self):
+        if self.stale and self.source is not None:
+            with self.rebuild_lock:
+                if self.stale:
+                    # Cleared first, so an invalidate() during the rebuild triggers another
+                    self.stale = False
+                    self.update(*self.source())
+        return self.snapshot
+
+    def resolved(self, keys):
+        if self.resolve is None:
+            return keys
+        return self.resolve(keys)
+
+    def build(self, keys, latitude, longitude, **columns):
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        lon_scale = np.cos(np.radians(latitude.mean())) if len(latitude) else 1.0
+        tree = cKDTree(np.column_stack([latitude, longitude * lon_scale])) if len(latitude) else None
+        snapshot = {
+            'tree': tree,
+            'keys': list(keys),
+            'latitude': latitude,
+            'longitude': longitude,
+            'lon_scale': lon_scale,
+            'columns': {name: np.asarray(values) for name, values in columns.items()}
+        }
+        # Readers grab self.snapshot once, so replacing it is the only synchronisation needed
+        self.snapshot = snapshot
+
+    def __len__(self):
+        snapshot = self.current()
+        return len(snapshot['keys']) if snapshot else 0
+
+    def nearest(self, lat, lon, k=5, predicate=None):
+        """Return up to k (record, distance_km) pairs, nearest first
+
+        predicate receives the snapshot's column arrays and candidate row
+        indices and returns a boolean mask of rows to keep.
+        """
+        snapshot = self.current()
+        if not snapshot or snapshot['tree'] is None or k <= 0:
+            return []
+        tree, total = snapshot['tree'], len(snapshot['keys'])
+
+        # Over-fetch when filtering and widen the search until enough rows pass
+        fetch = min(total, k if predicate is None else k * 4)
+        while True:
+            _, rows = tree.query([lat, lon * snapshot['lon_scale']], k=fetch)
+            rows = np.atleast_1d(rows)
+            if predicate is not None:
+                rows = rows[predicate(snapshot['columns'], rows)]
+            if len(rows) >= k or fetch == total:
+                break
+            fetch = min(total, fetch * 4)
+
+        rows = rows[:k]
+        distances = haversine_km(lat, lon, snapshot['latitude'][rows], snapshot['longitude'][rows])
+        records = self.resolved([snapshot['keys'][row] for row in rows])
+        return [(record, float(distance)) for record, distance in zip(records, distances) if record is not None]
+
+    def within(self, min_lat, min_lon, max_lat, max_lon, limit=None):
+        """Return the records inside a lat/lon bounding box"""
+        snapshot = self.current()
+        if not snapshot or snapshot['tree'] is None:
+            return []
+        scale = snapshot['lon_scale']
+        center = [(min_lat + max_lat) / 2, (min_lon + max_lon) / 2 * scale]
+        radius = max(max_lat - min_lat, (max_lon - min_lon) * scale) / 2
+        rows = np.asarray(snapshot['tree'].query_ball_point(center, radius, p=np.inf), dtype=np.intp)
+
+        lat, lon = snapshot['latitude'][rows], snapshot['longitude'][rows]
+        rows = np.sort(rows[(lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)])
+        if limit is not None:
+            rows = rows[:limit]
+        return [record for record in self.resolved([snapshot['keys'][row] for row in rows]) if record is not None]
+
+
+class DriverIndex(PointIndex):
+    """Available drivers indexed by current location with their remaining capacity"""
+
+    def update(self, driver_ids, latitude, longitude, remaining_volume, remaining_weight):
+        """Rebuild from the column arrays of FleetState.available_drivers()"""
+        self.build(driver_ids, latitude, longitude,
+                   remaining_volume=remaining_volume, remaining_weight=remaining_weight)
+
+    def nearest_available(self, lat, lon, k=5, min_volume=0.0, min_weight=0.0):
+        predicate = None
+        if min_volume > 0 or min_weight > 0:
+            def predicate(columns, rows):
+                return ((columns['remaining_volume'][rows] >= min_volume) &
+                        (columns['remaining_weight'][rows] >= min_weight))
+        return self.nearest(lat, lon, k, predicate)
+
+
+class OrderIndex(PointIndex):
+    """Open (not yet delivered) orders indexed by delivery location"""
+
+    def update(self, order_ids, latitude, longitude):
+        """Rebuild from the column arrays of FleetState.open_orders()"""
+        self.build(order_ids, latitude, longitude)
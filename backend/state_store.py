@@ -0,0 +1,201 @@
+import threading
+from collections import deque
+
+from json_codec import dumps
+
+# Sections clients can subscribe to and the field that identifies a record in each
+SECTION_KEYS = {
+    'orders': 'order_id',
+    'drivers': 'driver_id',
+    'clusters': 'cluster_id',
+    'routes': 'route_id',
+    'tracking': 'route_id',
+    'assignments': 'route_id',
+    'schedule': None,
+    'stats': None
+}
+
+DELTA_HISTORY = 512
+
+
+class StateStore:
+    """Versioned, keyed copy of the dashboard state that publishes per-section diffs
+
+    Every change bumps a global version. A delta names its section, its
+    version and the previous version of that section, so a client that only
+    follows some sections can still detect gaps. Deltas are encoded once and
+    kept in a bounded history for clients that resync from a version.
+    Records are held as their encoded JSON: diffs compare bytes, and
+    deltas, snapshots and section bodies are spliced together from them
+    without re-encoding.
+    """
+
+    def __init__(self, history=DELTA_HISTORY):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.records = {section: {} for section in SECTION_KEYS}
+        # Restored sections not yet split into records: section -> (newline-joined records, load)
+        self.pending = {}
+        self.section_versions = {section: 0 for section in SECTION_KEYS}
+        self.history = deque(maxlen=history)
+        self.snapshot_cache = {}
+        # Called with (version, encoded delta) under the lock, in version order
+        self.on_commit = None
+
+    def keyed(self, section, records):
+        """Map record key -> encoded record"""
+        if SECTION_KEYS[section] is None:
+            return {'value': dumps(records)}
+        if isinstance(records, dict):
+            records = records.values()
+        key = SECTION_KEYS[section]
+        return {record[key]: dumps(record) for record in records}
+
+    def commit(self, section, added, changed, removed, new_records):
+        """Record a non-empty diff; caller holds the lock"""
+        self.version += 1
+        encoded = b'{"type":"delta","section":%s,"version":%d,"prev_version":%d,' % (
+            dumps(section), self.version, self.section_versions[section]
+        )
+        encoded += b'"added":[%s],"changed":[%s],"removed":%s}' % (
+            b','.join(added), b','.join(changed), dumps(removed)
+        )
+        self.records[section] = new_records
+        self.section_versions[section] = self.version
+        self.history.append((self.version, section, encoded))
+        if self.on_commit is not None:
+            self.on_commit(self.version, encoded)
+        return encoded
+
+    def replace(self, section, records):
+        """Replace a whole section; returns the encoded delta or None if nothing changed"""
+        new_records = self.keyed(section, records)
+        with self.lock:
+            current = self.section_records(section)
+            added = [record for key, record in new_records.items() if key not in current]
+            changed = [record for key, record in new_records.items()
+                       if key in current and current[key] != record]
+            removed = [key for key in current if key not in new_records]
+            if not (added or changed or removed):
+                return None
+            return self.commit(section, added, changed, removed, new_records)
+
+    def upsert(self, section, records, removed_keys=()):
+        """Insert or update individual records without touching the rest of the section"""
+        new_records = self.keyed(section, records)
+        with self.lock:
+            current = self.section_records(section)
+            added = [record for key, record in new_records.items() if key not in current]
+            changed = [record for key, record in new_records.items()
+                       if key in current and current[key] != record]
+            removed = [key for key in removed_keys if key in current]
+            if not (added or changed or removed):
+                return None
+            merged = dict(current)
+            merged.update(new_records)
+            for key in removed:
+                del merged[key]
+            return self.commit(section, added, changed, removed, merged)
+
+    def export(self):
+        """(version, section versions, section records); caller holds the lock
+
+        Commits swap in new record dicts rather than mutating them, so the
+        returned dicts stay consistent after the lock is released.
+        """
+        records = {section: self.section_records(section) for section in SECTION_KEYS}
+        return self.version, dict(self.section_versions), records
+
+    def section_records(self, section):
+        """Record dict of a section, splitting a restored one on first use; caller holds the lock"""
+        pending = self.pending.pop(section, None)
+        if pending is not None:
+            self.records[section] = pending[1]()
+        return self.records[section]
+
+    def restore(self, version, section_versions, sections):
+        """Adopt a snapshot given as section -> (newline-joined encoded records, load)
+
+        load() returns the section's key -> record dict. Until something
+        needs individual records, section bodies are spliced from the joined
+        bytes, so restoring costs no per-record work.
+        """
+        with self.lock:
+            self.version = version
+            self.section_versions.update(section_versions)
+            for section in sections:
+                self.records[section] = {}
+            self.pending.update(sections)
+            self.history.clear()
+            self.snapshot_cache.clear()
+
+    def split_pending(self):
+        """Split restored sections into records ahead of first use, outside the lock"""
+        with self.lock:
+            pending = dict(self.pending)
+        for section, entry in pending.items():
+            records = entry[1]()
+            with self.lock:
+                if self.pending.get(section) is entry:
+                    del self.pending[section]
+                    self.records[section] = records
+
+    def apply_delta(self, delta):
+        """Re-apply a decoded delta from the change log, keeping its version"""
+        section = delta['section']
+        records = delta['added'] + delta['changed']
+        with self.lock:
+            if delta['version'] <= self.version:
+                return False
+            if SECTION_KEYS[section] is None:
+                merged = self.keyed(section, records[-1]) if records else dict(self.section_records(section))
+            else:
+                merged = dict(self.section_records(section))
+                merged.update(self.keyed(section, records))
+            for key in delta['removed']:
+                merged.pop(key, None)
+            self.records[section] = merged
+            self.section_versions[section] = self.version = delta['version']
+            return True
+
+    def section_body(self, section):
+        """(version, records as one encoded JSON value), built once per version; caller holds the lock"""
+        version = self.section_versions[section]
+        cached = self.snapshot_cache.get(section)
+        if cached and cached[0] == version:
+            return cached
+        if section in self.pending:
+            joined = self.pending[section][0]
+            if SECTION_KEYS[section] is None:
+                body = joined or b'{}'
+            else:
+                body = b'[' + joined.replace(b'\n', b',') + b']'
+        elif SECTION_KEYS[section] is None:
+            body = self.records[section].get('value', b'{}')
+        else:
+            body = b'[' + b','.join(self.records[section].values()) + b']'
+        self.snapshot_cache[section] = (version, body)
+        return version, body
+
+    def section_json(self, section):
+        with self.lock:
+            return self.section_body(section)[1]
+
+    def section_snapshot(self, section):
+        """Encoded full copy of one section for a resyncing client"""
+        with self.lock:
+            version, body = self.section_body(section)
+        return b'{"type":"snapshot","section":%s,"version":%d,"records":%s}' % (dumps(section), version, body)
+
+    def resync(self, sections, since_version=None):
+        """Messages that bring a client at since_version up to date for the given sections
+
+        Falls back to full section snapshots when the history no longer
+        reaches back far enough.
+        """
+        with self.lock:
+            oldest = self.history[0][0] if self.history else self.version + 1
+            if since_version is not None and oldest <= since_version + 1 <= self.version + 1:
+                return [encoded for version, section, encoded in self.history
+                        if version > since_version and section in sections]
+        return [self.section_snapshot(section) for section in sections]
@@ -0,0 +1,6 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# The wire-format tests encode batches with the data processor's encoder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data-processor'))
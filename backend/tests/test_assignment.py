@@ -0,0 +1,70 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from assignment import (UNASSIGNED_COST, driver_arrays, match, pair_costs, route_columns, solve_dense,
+                        solve_greedy, solve_sparse)
+
+
+def instance(n_routes, n_drivers, seed):
+    rng = np.random.default_rng(seed)
+    routes = [{'centroid_lat': 40.7 + rng.random() * 0.1, 'centroid_lon': -74.0 + rng.random() * 0.1,
+               'total_volume': rng.uniform(1, 8), 'total_weight': rng.uniform(50, 400)}
+              for _ in range(n_routes)]
+    capacity = rng.choice([5.0, 10.0, 15.0], n_drivers)
+    drivers = {
+        'latitude': 40.7 + rng.random(n_drivers) * 0.1,
+        'longitude': -74.0 + rng.random(n_drivers) * 0.1,
+        'vehicle_capacity_volume': capacity,
+        'current_load_volume': rng.uniform(0, 3, n_drivers),
+        'vehicle_capacity_weight': capacity * 60,
+        'current_load_weight': rng.uniform(0, 100, n_drivers),
+        'vehicle_type': rng.choice(['Motorcycle', 'Van', 'Truck'], n_drivers)
+    }
+    return route_columns(routes), driver_arrays(drivers)
+
+
+def total_cost(routes, drivers, r, d):
+    """Cost of an assignment, charging UNASSIGNED_COST for each route left out"""
+    cost, _, feasible = pair_costs(routes, drivers, np.asarray(r, dtype=np.intp), np.asarray(d, dtype=np.intp))
+    assert feasible.all()
+    return cost.sum() + UNASSIGNED_COST * (len(routes['latitude']) - len(r))
+
+
+def brute_force(routes, drivers):
+    """Cheapest assignment found by trying every driver (or none) for every route"""
+    n_routes, n_drivers = len(routes['latitude']), len(drivers['latitude'])
+    r = np.arange(n_routes)[:, None]
+    cost, _, feasible = pair_costs(routes, drivers, r, np.arange(n_drivers)[None, :])
+    best = np.inf
+    for choice in itertools.product(range(-1, n_drivers), repeat=n_routes):
+        taken = [d for d in choice if d >= 0]
+        if len(taken) != len(set(taken)):
+            continue
+        if any(d >= 0 and not feasible[i, d] for i, d in enumerate(choice)):
+            continue
+        best = min(best, sum(cost[i, d] if d >= 0 else UNASSIGNED_COST for i, d in enumerate(choice)))
+    return best
+
+
+@pytest.mark.parametrize('n_routes,n_drivers,seed', [(3, 3, 0), (3, 5, 1), (4, 3, 2), (4, 4, 3), (5, 4, 4)])
+def test_exact_methods_match_brute_force(n_routes, n_drivers, seed):
+    routes, drivers = instance(n_routes, n_drivers, seed)
+    best = brute_force(routes, drivers)
+
+    assert total_cost(routes, drivers, *solve_dense(routes, drivers)) == pytest.approx(best)
+    everything = np.repeat(np.arange(n_routes), n_drivers), np.tile(np.arange(n_drivers), n_routes)
+    feasible = pair_costs(routes, drivers, *everything)[2]
+    r, d = everything[0][feasible], everything[1][feasible]
+    assert total_cost(routes, drivers, *solve_sparse(routes, drivers, r, d)) == pytest.approx(best)
+    # The greedy fallback is feasible but may cost more
+    assert total_cost(routes, drivers, *solve_greedy(routes, drivers, r, d)) >= best - 1e-9
+
+
+def test_match_uses_each_driver_once():
+    routes, drivers = instance(5, 4, 5)
+    r, d, method = match(routes, drivers)
+    assert method == 'hungarian'
+    assert len(set(d.tolist())) == len(d)
+    assert len(set(r.tolist())) == len(r)
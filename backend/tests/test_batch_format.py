@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from batch_decoder import UnsupportedBatchFormat, decode_columnar, decode_order_batch
+from batch_encoder import CONTENT_TYPE, ORDER_COLUMNS, encode_order_batch, rows_to_columns
+
+
+def orders(n):
+    return [{
+        'order_id': f'ORD-{i:03d}',
+        'customer_id': f'CUST-{i % 7}',
+        'created_at': f'2024-01-01T10:{i % 60:02d}:00',
+        'latitude': 40.75 + i * 1e-3,
+        'longitude': -73.98 - i * 1e-3,
+        'volume': 0.1 * (i + 1),
+        'weight': 1.5 * (i + 1),
+        'delivery_time_slot': ['morning', 'afternoon', 'evening'][i % 3],
+        'priority': 'high' if i % 4 == 0 else 'normal',
+        'package_size': ['small', 'medium', 'large'][i % 3],
+        'status': 'pending'
+    } for i in range(n)]
+
+
+@pytest.mark.parametrize('n', [0, 1, 9, 300])
+def test_columnar_round_trip(n):
+    rows = orders(n)
+    metadata = {'timestamp': '2024-01-01T10:00:00', 'batch_id': 7}
+    body = encode_order_batch(rows_to_columns(rows), metadata)
+    assert body[:4] == b'OBAT'
+
+    decoded_metadata, frame = decode_order_batch(body, CONTENT_TYPE + '; charset=binary')
+    assert decoded_metadata == dict(metadata, rows=n)
+    assert list(frame.columns) == list(ORDER_COLUMNS)
+    for name, kind in ORDER_COLUMNS.items():
+        expected = [row[name] for row in rows]
+        if kind == 'float64':
+            assert np.array_equal(frame[name].to_numpy(), np.array(expected, dtype=np.float64))
+        else:
+            assert frame[name].astype(object).tolist() == expected
+
+
+def test_non_ascii_strings_and_wide_dictionaries():
+    rows = orders(300)
+    for i, row in enumerate(rows):
+        row['customer_id'] = f'Zoë-{i}'
+        row['status'] = f'status-{i}'
+    _, frame = decode_columnar(encode_order_batch(rows_to_columns(rows), {}))
+    assert frame['customer_id'].tolist() == [row['customer_id'] for row in rows]
+    assert frame['status'].astype(object).tolist() == [row['status'] for row in rows]
+
+
+def test_json_messages_still_decode():
+    rows = orders(3)
+    metadata, frame = decode_order_batch(json.dumps({'batch_id': 1, 'orders': rows}).encode())
+    assert metadata == {'batch_id': 1}
+    assert frame.to_dict('records') == rows
+
+
+def test_rejects_unknown_formats():
+    body = bytearray(encode_order_batch(rows_to_columns(orders(2)), {}))
+    with pytest.raises(UnsupportedBatchFormat):
+        decode_order_batch(bytes(body), 'application/x-unknown')
+    body[4] = 99
+    with pytest.raises(UnsupportedBatchFormat):
+        decode_columnar(bytes(body))
+    with pytest.raises(UnsupportedBatchFormat):
+        decode_columnar(b'JSON' + bytes(body[4:]))
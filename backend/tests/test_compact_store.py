@@ -0,0 +1,67 @@
+import numpy as np
+
+from compact_store import DRIVER_NESTED, DRIVER_SCHEMA, ORDER_SCHEMA, RecordTable
+
+
+def order(i, status='Pending', **fields):
+    return dict({'order_id': f'ORD-{i:03d}', 'latitude': 40.7 + i / 100, 'longitude': -74.0, 'volume': 0.1,
+                 'weight': 2.0, 'status': status, 'priority': 'Normal', 'delivery_time_slot': '09:00-11:00'},
+                **fields)
+
+
+def test_records_round_trip_with_categories_and_nesting():
+    table = RecordTable('driver_id', DRIVER_SCHEMA, DRIVER_NESTED, capacity=2)
+    drivers = [{'driver_id': f'DRV-{i}', 'name': f'Driver {i}', 'status': status, 'vehicle_type': 'Van',
+                'current_location': {'latitude': 40.0 + i, 'longitude': -74.0}, 'deliveries_today': i}
+               for i, status in enumerate(['Available', 'On Route', 'Available', 'Offline'])]
+    table.upsert_records(drivers)
+    records = {record['driver_id']: record for record in table.records()}
+    assert len(table) == 4
+    for driver in drivers:
+        record = records[driver['driver_id']]
+        assert {name: record[name] for name in driver} == driver
+    assert table.categories['status'][0] is None
+    assert sorted(table.categories['status'][1:]) == ['Available', 'Offline', 'On Route']
+
+
+def test_missing_category_values_decode_to_none():
+    table = RecordTable('order_id', ORDER_SCHEMA)
+    table.upsert_records([order(0, status=None), order(1, status=float('nan')), order(2)])
+    assert table.values('status') == [None, None, 'Pending']
+    assert table.column('status').tolist() == [0, 0, table.code('status', 'Pending')]
+    assert table.code('status', 'None') == table.code('status', 'nan') == -1
+
+
+def test_delete_moves_the_last_row_into_the_gap():
+    table = RecordTable('order_id', ORDER_SCHEMA, capacity=2)
+    table.upsert_records([order(i, status='Delivered' if i % 2 else 'Pending') for i in range(5)])
+    table.delete(['ORD-001', 'missing'])
+    assert len(table) == 4
+    assert table.rows['ORD-004'] == 1
+    assert table.values('order_id') == ['ORD-000', 'ORD-004', 'ORD-002', 'ORD-003']
+    assert table.values('status') == ['Pending', 'Pending', 'Pending', 'Delivered']
+    # The freed tail row is blank again
+    assert table.columns['status'][4] == 0 and np.isnan(table.columns['latitude'][4])
+
+    table.delete(['ORD-003'])
+    assert table.values('order_id') == ['ORD-000', 'ORD-004', 'ORD-002']
+    assert table.lookup(['ORD-002', 'ORD-003']).tolist() == [2, -1]
+
+
+def test_upsert_overwrites_and_keeps_unlisted_columns():
+    table = RecordTable('order_id', ORDER_SCHEMA)
+    table.upsert_records([order(0), order(1)])
+    table.upsert_columns({'order_id': ['ORD-001', 'ORD-001', 'ORD-002'], 'status': ['Assigned', 'Delivered', None]})
+    assert len(table) == 3
+    assert table.values('status') == ['Pending', 'Delivered', None]
+    assert table.values('priority') == ['Normal', 'Normal', None]
+
+
+def test_export_and_restore_rebuild_the_index():
+    table = RecordTable('order_id', ORDER_SCHEMA)
+    table.upsert_records([order(i, status=None if i == 2 else 'Pending') for i in range(4)])
+    restored = RecordTable('order_id', ORDER_SCHEMA)
+    restored.restore(*table.export())
+    for name in ('order_id', 'status', 'latitude', 'priority'):
+        assert restored.values(name) == table.values(name)
+    assert restored.lookup(['ORD-003', 'ORD-009']).tolist() == [3, -1]
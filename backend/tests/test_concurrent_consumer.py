@@ -0,0 +1,121 @@
+import threading
+import time
+
+from concurrent_consumer import ConcurrentConsumer
+
+
+class FakeDelivery:
+    def __init__(self, body):
+        self.body = body
+        self.content_type = None
+        self.acked = self.nacked = False
+
+    def ack(self):
+        self.acked = True
+
+    def nack(self, requeue=False):
+        self.nacked = True
+
+
+class FakeTransport:
+    """Hands the consumer a fixed list of deliveries, then returns as if the connection closed"""
+
+    def __init__(self, deliveries):
+        self.deliveries = deliveries
+
+    def consume(self, queue, on_message, prefetch=None):
+        for delivery in self.deliveries:
+            on_message(delivery)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_results_are_applied_and_acked_in_delivery_order():
+    releases = {i: threading.Event() for i in range(4)}
+    applied = []
+
+    def compute(body, content_type):
+        releases[body].wait(5)
+        return body, {}
+
+    consumer = ConcurrentConsumer('q', compute, applied.append, workers=4)
+    deliveries = [FakeDelivery(i) for i in range(4)]
+    consumer.run(FakeTransport(deliveries))
+    # Finish out of order: nothing may be applied until message 0 is done
+    for i in (3, 1, 2):
+        releases[i].set()
+    time.sleep(0.05)
+    assert applied == [] and not any(d.acked for d in deliveries)
+    releases[0].set()
+    wait_for(lambda: all(d.acked for d in deliveries))
+    assert applied == [0, 1, 2, 3]
+
+
+def test_unordered_mode_drops_results_older_than_one_applied():
+    releases = {i: threading.Event() for i in range(2)}
+    applied = []
+
+    def compute(body, content_type):
+        releases[body].wait(5)
+        return body, {}
+
+    consumer = ConcurrentConsumer('q', compute, applied.append, workers=2, ordered=False)
+    deliveries = [FakeDelivery(i) for i in range(2)]
+    consumer.run(FakeTransport(deliveries))
+    releases[1].set()
+    wait_for(lambda: deliveries[1].acked)
+    releases[0].set()
+    wait_for(lambda: deliveries[0].acked)
+    assert applied == [1]
+    assert consumer.stats.counts['stale'] == 1
+
+
+def test_failed_compute_is_nacked_without_stalling_later_messages():
+    def compute(body, content_type):
+        if body == 0:
+            raise RuntimeError('bad message')
+        return body, {}
+
+    applied = []
+    consumer = ConcurrentConsumer('q', compute, applied.append, workers=2)
+    deliveries = [FakeDelivery(i) for i in range(3)]
+    consumer.run(FakeTransport(deliveries))
+    wait_for(lambda: deliveries[0].nacked and deliveries[2].acked)
+    assert applied == [1, 2]
+
+
+def test_results_from_a_previous_connection_are_dropped():
+    old_release = threading.Event()
+    applied = []
+
+    def compute(body, content_type):
+        if body == 'old':
+            old_release.wait(5)
+        return body, {}
+
+    consumer = ConcurrentConsumer('q', compute, applied.append, workers=2)
+    old = FakeDelivery('old')
+    consumer.run(FakeTransport([old]))
+
+    # Reconnect: the new generation's sequence numbers start at 0 again
+    fresh = [FakeDelivery('new-0'), FakeDelivery('new-1')]
+    blocker = threading.Event()
+
+    def compute_new(body, content_type):
+        if body == 'new-0':
+            blocker.wait(5)
+        return body, {}
+
+    consumer.compute = compute_new
+    consumer.run(FakeTransport(fresh))
+    old_release.set()
+    wait_for(lambda: consumer.stats.counts['abandoned'] == 1)
+    blocker.set()
+    wait_for(lambda: all(d.acked for d in fresh))
+    assert applied == ['new-0', 'new-1']
+    assert not old.acked and not old.nacked
@@ -0,0 +1,38 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from eta import ETAEngine, hour_of_day, local_clock
+
+
+@pytest.fixture
+def new_york_tz(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_hours_and_clocks_follow_daylight_saving(new_york_tz):
+    summer = datetime(2024, 7, 1, 12, 0).timestamp()
+    winter = datetime(2024, 1, 15, 12, 0).timestamp()
+    assert hour_of_day([summer, winter]).tolist() == [12, 12]
+    assert local_clock(summer) == local_clock(winter) == '12:00'
+
+    # Clocks jump from 02:00 to 03:00 on 2024-03-10
+    before = datetime(2024, 3, 10, 1, 59).timestamp()
+    assert hour_of_day([before, before + 120]).tolist() == [1, 3]
+    assert local_clock(before + 120) == '03:01'
+
+
+def test_cached_stop_tables_do_not_share_the_batch_buffer():
+    engine = ETAEngine()
+    routes = [{'route_id': f'RTE-{i}', 'latitude': 40.75, 'longitude': -73.98,
+               'stop_lat': np.linspace(40.70, 40.80, 5) + i / 100, 'stop_lon': np.full(5, -73.98), 'next_stop': 0}
+              for i in range(3)]
+    tables = engine.stop_tables(routes, hour=12)
+    assert all(table.base is None and table[0] == 0.0 for table in tables)
+    assert all(np.all(np.diff(table) > 0) for table in tables)
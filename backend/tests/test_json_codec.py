@@ -0,0 +1,25 @@
+import json
+
+import numpy as np
+
+from json_codec import dumps, json_default
+
+
+def test_arrays_become_lists():
+    assert json_default(np.arange(3)) == [0, 1, 2]
+    assert json.loads(dumps({'values': np.array([[1.5, 2.0]])})) == {'values': [[1.5, 2.0]]}
+
+
+def test_scalars_become_python_values():
+    assert json.loads(dumps([np.int64(3), np.float32(0.5), np.bool_(True)])) == [3, 0.5, True]
+
+
+def test_other_objects_fall_back_to_str():
+    class Item:
+        def item(self):
+            raise AssertionError('not a NumPy scalar')
+
+        def __str__(self):
+            return 'item'
+
+    assert json_default(Item()) == 'item'
@@ -0,0 +1,46 @@
+import pytest
+
+from multihop import DeliveryNetwork
+
+
+@pytest.fixture(scope='module')
+def network():
+    return DeliveryNetwork.load()
+
+
+def test_packages_are_spread_over_customers(network):
+    customers = network.nodes_of_type('customer')
+    plan = network.plan(2 * len(customers) + 1)
+    counts = {route['destination']: route['packages'] for route in plan['optimized_routes']}
+    assert counts[customers[0]] == 3 and counts[customers[-1]] == 2
+    assert sum(counts.values()) == plan['packages'] and plan['algorithm'] == 'tree'
+
+
+@pytest.mark.parametrize('arguments', [{'packages': 0}, {'packages': -1}, {'packages': 10**9},
+                                       {'packages': 1, 'priority': 'fastest'},
+                                       {'packages': 1, 'algorithm': 'bfs'},
+                                       {'packages': 1, 'source_id': 'nowhere'}])
+def test_invalid_requests_raise_value_error(network, arguments):
+    with pytest.raises(ValueError):
+        network.plan(**arguments)
+
+
+@pytest.mark.parametrize('priority', ['time', 'cost', 'distance'])
+def test_astar_and_dijkstra_agree_from_a_source_without_a_tree(priority):
+    network = DeliveryNetwork.load()
+    source = network.nodes_of_type('customer')[0]
+    astar = network.plan(10, priority, 'astar', source)
+    network.cache.clear()
+    dijkstra = network.plan(10, priority, 'dijkstra', source)
+    assert astar['algorithm'] == 'astar' and dijkstra['algorithm'] == 'dijkstra'
+    assert [route[priority] for route in astar['optimized_routes']] == \
+        pytest.approx([route[priority] for route in dijkstra['optimized_routes']])
+
+
+def test_unreachable_targets_are_cached():
+    nodes = [{'id': 'w', 'type': 'warehouse', 'x': 0, 'y': 0}, {'id': 'a', 'type': 'customer', 'x': 1, 'y': 0},
+             {'id': 'b', 'type': 'customer', 'x': 5, 'y': 5}]
+    network = DeliveryNetwork(nodes, [{'from': 'w', 'to': 'a', 'time': 1, 'cost': 1, 'distance': 1}])
+    assert network.shortest_path('a', 'b') is None
+    assert network.shortest_path('a', 'b') is None
+    assert network.cache.stats()['hits'] == 1
@@ -0,0 +1,97 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from route_jobs import JOB_COLUMNS, RouteJobEngine, normalize_parameters
+
+
+def job_columns(count=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'order_id': np.array([f'ORD-{i:04d}' for i in range(count)], dtype=object),
+        'latitude': 40.75 + rng.normal(0, 0.03, count),
+        'longitude': -73.98 + rng.normal(0, 0.03, count),
+        'volume': rng.uniform(0.01, 0.2, count),
+        'weight': rng.uniform(1, 20, count),
+        'delivery_time_numeric': rng.integers(1, 7, count).astype(np.float64)
+    }
+
+
+def wait_for(engine, job_ids, timeout=60.0):
+    deadline = time.time() + timeout
+    while True:
+        jobs = [engine.get(job_id) for job_id in job_ids]
+        if all(job['status'] in ('completed', 'failed') for job in jobs):
+            return jobs
+        assert time.time() < deadline, jobs
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def engine():
+    engine = RouteJobEngine(workers=2)
+    yield engine
+    if engine.executor is not None:
+        engine.executor.shutdown(cancel_futures=True)
+
+
+def test_same_orders_in_any_order_hit_the_cache(engine):
+    columns = job_columns()
+    parameters = normalize_parameters({'clusters': 3})
+    engine.run('first', columns, parameters)
+    first, = wait_for(engine, ['first'])
+    assert first['status'] == 'completed' and not first['cached']
+
+    shuffled = np.random.default_rng(1).permutation(len(columns['order_id']))
+    engine.run('second', {name: columns[name][shuffled] for name in JOB_COLUMNS}, parameters)
+    second = engine.get('second')
+    assert second['status'] == 'completed' and second['cached']
+    assert second['content_hash'] == first['content_hash']
+    assert engine.result('second')[1] is engine.result('first')[1]
+    assert engine.counts['cache_hits'] == 1 and engine.counts['solved'] == 1
+
+
+def test_concurrent_duplicates_share_one_solve(engine):
+    columns = job_columns()
+    parameters = normalize_parameters({'clusters': 3})
+    engine.run('a', columns, parameters)
+    engine.run('b', columns, parameters)
+    a, b = wait_for(engine, ['a', 'b'])
+    assert b['deduplicated'] and a['status'] == b['status'] == 'completed'
+    assert engine.result('a')[1] is engine.result('b')[1]
+    assert engine.counts['solved'] == 1 and engine.counts['deduplicated'] == 1
+    result = engine.result('a')[1]
+    assert sorted(stop for cluster in result['clusters'] for stop in cluster['stops']) == \
+        sorted(columns['order_id'].tolist())
+
+
+def test_failing_clusters_fail_the_job_once(engine):
+    parameters = dict(normalize_parameters({'clusters': 4}), avg_speed_kmh=None)
+    engine.run('bad', job_columns(), parameters)
+    job, = wait_for(engine, ['bad'])
+    assert job['status'] == 'failed'
+    time.sleep(0.5)
+    assert engine.counts['failed'] == 1
+    assert engine.summary()['solving'] == 0
+
+
+def test_broken_pool_fails_the_job_and_is_replaced(engine):
+    pool = engine.pool()
+    pool.submit(os.getpid).result()
+    for process in list(pool._processes.values()):
+        process.kill()
+    deadline = time.time() + 10
+    while not pool._broken:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    parameters = normalize_parameters({'clusters': 2})
+    engine.run('broken', job_columns(), parameters)
+    job, = wait_for(engine, ['broken'])
+    assert job['status'] == 'failed' and engine.executor is None
+
+    engine.run('retry', job_columns(), parameters)
+    job, = wait_for(engine, ['retry'])
+    assert job['status'] == 'completed' and engine.executor is not pool
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pytest
+
+from routing import (LazyDistances, RouteBuilder, haversine_matrix, nearest_neighbour_tour, or_opt,
+                     tour_length, two_opt)
+
+
+def cluster(n, seed=0):
+    rng = np.random.default_rng(seed)
+    order_ids = [f'ORD-{i:03d}' for i in range(n)]
+    latitude = 40.7589 + (rng.random(n) - 0.5) * 0.1
+    longitude = -73.9851 + (rng.random(n) - 0.5) * 0.1
+    return order_ids, latitude, longitude, rng.uniform(0.5, 3, n), rng.uniform(10, 300, n)
+
+
+def assert_closed_tour(tour, n):
+    assert tour[0] == tour[-1] == 0
+    assert sorted(tour[:-1].tolist()) == list(range(n))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_local_search_never_lengthens_the_tour(seed):
+    _, latitude, longitude, _, _ = cluster(40, seed)
+    dist = haversine_matrix(latitude, longitude)
+    deadline = time.perf_counter() + 10
+    tour = nearest_neighbour_tour(dist)
+    assert_closed_tour(tour, 40)
+    initial = tour_length(dist, tour)
+
+    tour = two_opt(dist, tour, deadline)
+    assert_closed_tour(tour, 40)
+    after_two_opt = tour_length(dist, tour)
+    assert after_two_opt <= initial + 1e-9
+
+    tour = or_opt(dist, tour, deadline)
+    assert_closed_tour(tour, 40)
+    assert tour_length(dist, tour) <= after_two_opt + 1e-9
+
+
+def test_lazy_distances_match_the_matrix():
+    _, latitude, longitude, _, _ = cluster(12)
+    dist = haversine_matrix(latitude, longitude)
+    lazy = LazyDistances(latitude, longitude)
+    i, j = np.arange(12)[:, None], np.arange(12)[None, :]
+    assert np.allclose(lazy[i, j], dist, atol=1e-9)
+
+
+def test_capacity_split_keeps_order_and_fits_each_vehicle():
+    builder = RouteBuilder(capacity_volume=5, capacity_weight=500)
+    _, _, _, volume, weight = cluster(30, 1)
+    tour = np.concatenate(([0], np.random.default_rng(1).permutation(30) + 1, [0]))
+    legs = builder.split_by_capacity(tour, volume, weight)
+
+    assert [stop for leg in legs for stop in leg] == (tour[1:-1] - 1).tolist()
+    assert len(legs) > 1
+    for leg in legs:
+        assert volume[leg].sum() <= 5 and weight[leg].sum() <= 500
+    # Each cut happens only because the next stop would not have fitted
+    for leg, following in zip(legs, legs[1:]):
+        assert volume[leg].sum() + volume[following[0]] > 5 or weight[leg].sum() + weight[following[0]] > 500
+
+
+@pytest.mark.parametrize('warm', [False, True])
+def test_build_covers_every_order_within_capacity(warm):
+    builder = RouteBuilder(capacity_volume=6, capacity_weight=600, time_budget_ms=1000)
+    order_ids, latitude, longitude, volume, weight = cluster(25, 2)
+    previous = None
+    if warm:
+        # An earlier solution missing two of the orders and holding one that has since gone
+        previous = order_ids[2:] + ['ORD-GONE']
+    routes = builder.build(order_ids, latitude, longitude, volume, weight, previous)
+
+    stops = [stop for route in routes for stop in route['stops']]
+    assert sorted(stops) == sorted(order_ids)
+    index = {order_id: i for i, order_id in enumerate(order_ids)}
+    for route in routes:
+        rows = [index[stop] for stop in route['stops']]
+        assert route['total_volume'] == pytest.approx(volume[rows].sum())
+        assert route['total_volume'] <= 6 and route['total_weight'] <= 600
+        path = np.concatenate(([builder.depot[0]], latitude[rows], [builder.depot[0]])), \
+            np.concatenate(([builder.depot[1]], longitude[rows], [builder.depot[1]]))
+        legs = haversine_matrix(*path)
+        assert route['distance_km'] == pytest.approx(np.diag(legs, 1).sum(), abs=1e-3)
+
+
+def test_build_without_orders_is_empty():
+    assert RouteBuilder().build([], [], [], [], []) == []
@@ -0,0 +1,71 @@
+import json
+
+from state_store import SECTION_KEYS, StateStore
+
+
+def order(i, status='pending'):
+    return {'order_id': f'ORD-{i}', 'status': status, 'volume': i * 0.5}
+
+
+def record_changes(store):
+    store.replace('orders', [order(i) for i in range(5)])
+    store.upsert('orders', [order(1, 'assigned'), order(7)], removed_keys=['ORD-3', 'ORD-missing'])
+    store.replace('drivers', [{'driver_id': 'DRV-1', 'status': 'available'}])
+    store.replace('stats', {'total_orders': 6, 'by_status': {'pending': 4}})
+    store.replace('orders', [order(1, 'assigned'), order(7), order(8)])
+    store.upsert('drivers', [{'driver_id': 'DRV-2', 'status': 'busy'}])
+    store.replace('stats', {'total_orders': 3, 'by_status': {'assigned': 1}})
+    store.replace('schedule', {'slots': ['morning']})
+
+
+def replayed(deltas):
+    replica = StateStore()
+    for _, encoded in deltas:
+        assert replica.apply_delta(json.loads(encoded))
+    return replica
+
+
+def test_replaying_deltas_reproduces_the_store():
+    source = StateStore()
+    deltas = []
+    source.on_commit = lambda version, encoded: deltas.append((version, encoded))
+    record_changes(source)
+
+    replica = replayed(deltas)
+    assert [version for version, _ in deltas] == list(range(1, source.version + 1))
+    assert replica.version == source.version
+    assert replica.section_versions == source.section_versions
+    for section in SECTION_KEYS:
+        assert json.loads(replica.section_json(section)) == json.loads(source.section_json(section))
+        assert {key: json.loads(value) for key, value in replica.records[section].items()} == \
+            {key: json.loads(value) for key, value in source.records[section].items()}
+
+
+def test_unchanged_writes_commit_nothing():
+    store = StateStore()
+    deltas = []
+    store.on_commit = lambda version, encoded: deltas.append(version)
+    store.replace('orders', [order(1)])
+    assert store.replace('orders', [order(1)]) is None
+    assert store.upsert('orders', [order(1)], removed_keys=['ORD-2']) is None
+    assert deltas == [1]
+
+
+def test_old_deltas_are_skipped():
+    source = StateStore()
+    deltas = []
+    source.on_commit = lambda version, encoded: deltas.append((version, encoded))
+    record_changes(source)
+
+    replica = replayed(deltas)
+    assert not replica.apply_delta(json.loads(deltas[2][1]))
+    assert json.loads(replica.section_json('orders')) == json.loads(source.section_json('orders'))
+
+
+def test_resync_returns_history_or_snapshots():
+    store = StateStore(history=3)
+    record_changes(store)
+    recent = store.resync(['orders', 'stats'], since_version=store.version - 3)
+    assert [json.loads(message)['version'] for message in recent] == [store.version - 1]
+    stale = store.resync(['orders'], since_version=1)
+    assert [json.loads(message)['type'] for message in stale] == ['snapshot']
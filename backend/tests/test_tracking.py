@@ -0,0 +1,50 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tracking import TrackStore, tracking_columns
+
+
+@pytest.fixture
+def new_york_tz(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def point(route_id, last_update):
+    return {'route_id': route_id, 'current_latitude': 40.7, 'current_longitude': -74.0, 'speed': 30.0,
+            'fuel_level': 80.0, 'temperature': 4.0, 'last_update': last_update}
+
+
+def test_naive_last_update_is_local_time(new_york_tz):
+    now = time.time()
+    local = datetime.fromtimestamp(now).isoformat()
+    columns = tracking_columns({'RTE-1': point('RTE-1', local)}, received_at=0.0)
+    assert columns['timestamp'][0] == pytest.approx(now, abs=1e-3)
+
+
+def test_last_update_with_offset(new_york_tz):
+    moment = datetime(2024, 6, 1, 12, 0, tzinfo=timezone(timedelta(hours=2)))
+    columns = tracking_columns({'RTE-1': point('RTE-1', moment.isoformat())}, received_at=0.0)
+    assert columns['timestamp'][0] == moment.timestamp()
+
+
+def test_since_filter_uses_local_timestamps(new_york_tz):
+    now = time.time()
+    store = TrackStore(capacity=8)
+    for age in (120, 60, 0):
+        store.ingest(tracking_columns({'RTE-1': point('RTE-1', datetime.fromtimestamp(now - age).isoformat())},
+                                      received_at=0.0))
+    track = store.track('RTE-1', since=now - 90)
+    assert len(track['timestamp']) == 2
+
+
+def test_missing_last_update_uses_received_at():
+    entry = point('RTE-1', None)
+    del entry['last_update']
+    columns = tracking_columns({'RTE-1': entry}, received_at=123.0)
+    assert columns['timestamp'][0] == 123.0
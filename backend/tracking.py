@@ -0,0 +1,157 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# Numeric telemetry kept per point; route metadata (driver, ETA, ...) keeps only its latest value
+TRACK_FIELDS = ('latitude', 'longitude', 'speed', 'fuel_level', 'temperature')
+ROUTE_ATTRIBUTES = ('driver_id', 'status', 'next_delivery', 'eta', 'progress')
+
+
+def tracking_columns(tracking_data, received_at):
+    """Column arrays for a tracking_updates message's {route_id: point} mapping"""
+    points = list(tracking_data.values())
+    columns = {'route_id': np.array([p['route_id'] for p in points])}
+    for field in TRACK_FIELDS:
+        source = 'current_' + field if field in ('latitude', 'longitude') else field
+        columns[field] = np.array([p[source] for p in points], dtype=np.float64)
+    try:
+        # Naive ISO strings are local time, as the producer writes them; fromisoformat also takes an offset
+        columns['timestamp'] = np.array([datetime.fromisoformat(p['last_update']).timestamp() for p in points],
+                                        dtype=np.float64)
+    except (KeyError, TypeError, ValueError):
+        columns['timestamp'] = np.full(len(points), received_at)
+    columns['attributes'] = [{name: p.get(name) for name in ROUTE_ATTRIBUTES} for p in points]
+    return columns
+
+
+class TrackStore:
+    """Per-route GPS and telemetry history in fixed-size ring buffers
+
+    All routes share preallocated (route, slot) arrays: one float64 matrix
+    per field plus timestamps, so a batch of points is written with a few
+    vectorized assignments and the latest point of a route is a single
+    index. When a route has reported more than `capacity` points the oldest
+    are overwritten. Routes touched since the last drain are remembered so
+    the emitter can send one coalesced update per tick.
+    """
+
+    def __init__(self, capacity=600, initial_routes=64):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.route_ids = []
+        self.attributes = []
+        self.allocate(initial_routes)
+        self.dirty = set()
+
+    def allocate(self, routes):
+        times = np.zeros((routes, self.capacity))
+        values = np.zeros((len(TRACK_FIELDS), routes, self.capacity))
+        written = np.zeros(routes, dtype=np.int64)
+        if hasattr(self, 'written'):
+            n = len(self.written)
+            times[:n], values[:, :n], written[:n] = self.times, self.values, self.written
+        self.times, self.values, self.written = times, values, written
+
+    def row(self, route_id):
+        """Row of a route, adding it (and growing the arrays) if new; caller holds the lock"""
+        row = self.rows.get(route_id)
+        if row is None:
+            row = self.rows[route_id] = len(self.route_ids)
+            self.route_ids.append(route_id)
+            self.attributes.append({})
+            if row >= len(self.written):
+                self.allocate(2 * len(self.written))
+        return row
+
+    def ingest(self, columns):
+        """Append a batch of points given as column arrays (see tracking_columns)"""
+        route_ids = np.asarray(columns['route_id'])
+        if not len(route_ids):
+            return
+        unique_ids, inverse = np.unique(route_ids, return_inverse=True)
+        with self.lock:
+            rows = np.array([self.row(route_id) for route_id in unique_ids.tolist()])[inverse]
+
+            # Consecutive slots for points of the same route, in arrival order
+            order = np.argsort(rows, kind='stable')
+            sorted_rows = rows[order]
+            group_start = np.r_[0, np.flatnonzero(sorted_rows[1:] != sorted_rows[:-1]) + 1]
+            group_sizes = np.diff(np.r_[group_start, len(sorted_rows)])
+            offset = np.arange(len(sorted_rows)) - np.repeat(group_start, group_sizes)
+            slots = (self.written[sorted_rows] + offset) % self.capacity
+
+            self.times[sorted_rows, slots] = np.asarray(columns['timestamp'])[order]
+            for i, field in enumerate(TRACK_FIELDS):
+                self.values[i, sorted_rows, slots] = np.asarray(columns[field])[order]
+            touched = sorted_rows[group_start]
+            self.written[touched] += group_sizes
+
+            attributes = columns.get('attributes')
+            if attributes is not None:
+                # Only each route's last point in the batch matters for metadata
+                for position in order[group_start + group_sizes - 1].tolist():
+                    self.attributes[rows[position]].update(attributes[position])
+            self.dirty.update(touched.tolist())
+
+    def latest_row(self, row):
+        """Latest point of a row as a record; caller holds the lock"""
+        slot = (self.written[row] - 1) % self.capacity
+        record = {'route_id': self.route_ids[row]}
+        record.update(self.attributes[row])
+        for i, field in enumerate(TRACK_FIELDS):
+            record[field] = float(self.values[i, row, slot])
+        record['timestamp'] = float(self.times[row, slot])
+        record['points'] = int(min(self.written[row], self.capacity))
+        return record
+
+    def latest(self, route_id):
+        with self.lock:
+            row = self.rows.get(route_id)
+            if row is None or not self.written[row]:
+                return None
+            return self.latest_row(row)
+
+    def latest_all(self):
+        with self.lock:
+            return [self.latest_row(row) for row in range(len(self.route_ids)) if self.written[row]]
+
+    def drain_dirty(self):
+        """Latest records of the routes updated since the previous call"""
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            return [self.latest_row(row) for row in sorted(dirty)]
+
+    def track(self, route_id, bucket_seconds=None, since=None, max_points=None):
+        """Chronological history of one route, optionally downsampled
+
+        Points are grouped into bucket_seconds-wide time buckets and the last
+        point of each bucket is kept; max_points picks the bucket width that
+        yields at most that many points. Returns column lists or None.
+        """
+        with self.lock:
+            row = self.rows.get(route_id)
+            if row is None:
+                return None
+            count = int(min(self.written[row], self.capacity))
+            slots = (self.written[row] - count + np.arange(count)) % self.capacity
+            times = self.times[row, slots]
+            values = self.values[:, row, slots]
+
+        if since is not None:
+            keep = times > since
+            times, values = times[keep], values[:, keep]
+        if max_points and len(times) > max_points:
+            # Buckets are aligned to the epoch, so a span can straddle one extra bucket
+            span = times[-1] - times[0]
+            bucket_seconds = max(bucket_seconds or 0, span / max(max_points - 1, 1) * (1 + 1e-9))
+        if bucket_seconds and len(times):
+            buckets = np.floor(times / bucket_seconds)
+            keep = np.r_[buckets[1:] != buckets[:-1], True]
+            times, values = times[keep], values[:, keep]
+
+        track = {'route_id': route_id, 'timestamp': times.tolist()}
+        for i, field in enumerate(TRACK_FIELDS):
+            track[field] = values[i].tolist()
+        return track
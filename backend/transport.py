@@ -0,0 +1,244 @@
+"""Message transports between the data processor and the backend.
+
+A transport publishes messages to named queues and runs consumers on them.
+Consumers receive Delivery objects whose ack()/nack() may be called from
+any thread, so work can be handed to a pool and acknowledged when done.
+
+RabbitMQTransport is the networked deployment: bodies are bytes on the
+wire and publishing goes through the shared PublisherPool. InMemoryTransport
+keeps everything in one process: messages are the Python objects that were
+published, with no serialization, held in bounded queues that honour the
+consumer's prefetch and requeue nacked messages like the broker does.
+Producers check `in_process` to decide whether to encode at all. The data
+processor's rabbitmq_transport.py implements the producer half of this interface.
+"""
+import functools
+import json
+import threading
+from collections import deque
+
+import pika
+
+from publisher import PERSISTENT, QUEUES
+
+BINARY_TYPES = (bytes, bytearray, memoryview, str)
+
+
+class QueueFull(Exception):
+    """Raised when an in-memory queue stays full for the whole publish timeout"""
+
+
+def decode_json(body):
+    """Message body as a Python object, whichever transport delivered it"""
+    return json.loads(body) if isinstance(body, BINARY_TYPES) else body
+
+
+class Delivery:
+    """One received message; ack or nack it exactly once"""
+
+    def __init__(self, body, content_type=None):
+        self.body = body
+        self.content_type = content_type
+
+    def ack(self):
+        raise NotImplementedError
+
+    def nack(self, requeue=False):
+        raise NotImplementedError
+
+
+class RabbitMQDelivery(Delivery):
+    def __init__(self, connection, channel, method, properties, body):
+        super().__init__(body, properties.content_type)
+        self.connection = connection
+        self.channel = channel
+        self.delivery_tag = method.delivery_tag
+
+    def ack(self):
+        # Channels are not thread-safe; run the ack on the connection's thread
+        self.connection.add_callback_threadsafe(
+            functools.partial(self.channel.basic_ack, delivery_tag=self.delivery_tag)
+        )
+
+    def nack(self, requeue=False):
+        self.connection.add_callback_threadsafe(
+            functools.partial(self.channel.basic_nack, delivery_tag=self.delivery_tag, requeue=requeue)
+        )
+
+
+class RabbitMQTransport:
+    """Broker-backed transport: one consumer connection per consume call, pooled publishing"""
+
+    in_process = False
+
+    def __init__(self, parameters, publisher):
+        self.parameters = parameters
+        self.publisher = publisher
+        self.closed = False
+
+    def start(self):
+        self.publisher.start()
+
+    def publish(self, queue, message, content_type=None):
+        properties = PERSISTENT
+        if content_type is not None:
+            properties = pika.BasicProperties(delivery_mode=2, content_type=content_type)
+        self.publisher.publish(queue, message, properties)
+
+    def consume(self, queue, callback, prefetch=1):
+        """Deliver messages to callback(delivery) until the connection closes"""
+        connection = pika.BlockingConnection(self.parameters)
+        channel = connection.channel()
+        channel.basic_qos(prefetch_count=prefetch)
+
+        def on_message(ch, method, properties, body):
+            callback(RabbitMQDelivery(connection, ch, method, properties, body))
+
+        channel.basic_consume(queue=queue, on_message_callback=on_message)
+        channel.start_consuming()
+
+    def queue_depth(self, queue):
+        pooled = self.publisher.acquire()
+        try:
+            return pooled.channel.queue_declare(queue=queue, passive=True).method.message_count
+        finally:
+            self.publisher.release(pooled)
+
+    def close(self):
+        self.closed = True
+
+
+class MemoryDelivery(Delivery):
+    def __init__(self, queue, body, content_type, credit):
+        super().__init__(body, content_type)
+        self.queue = queue
+        self.credit = credit
+        self.settled = False
+
+    def settle(self):
+        if self.settled:
+            raise RuntimeError('Delivery already acknowledged')
+        self.settled = True
+        self.credit.release()
+
+    def ack(self):
+        self.settle()
+        self.queue.acked()
+
+    def nack(self, requeue=False):
+        self.settle()
+        self.queue.nacked(self.body, self.content_type, requeue)
+
+
+class MemoryQueue:
+    """Bounded FIFO shared by the producers and consumers of one queue name"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.messages = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.unacked = 0
+        self.dropped = 0
+
+    def put(self, body, content_type, timeout):
+        with self.condition:
+            if not self.condition.wait_for(lambda: len(self.messages) < self.maxsize or self.closed, timeout):
+                raise QueueFull(f'In-memory queue is full ({self.maxsize} messages)')
+            self.messages.append((body, content_type))
+            self.condition.notify_all()
+
+    def get(self):
+        """Next (body, content_type), or None once the queue is closed"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.messages or self.closed)
+            if self.closed:
+                return None
+            self.unacked += 1
+            message = self.messages.popleft()
+            self.condition.notify_all()
+            return message
+
+    def acked(self):
+        with self.condition:
+            self.unacked -= 1
+
+    def nacked(self, body, content_type, requeue):
+        with self.condition:
+            self.unacked -= 1
+            if requeue:
+                # Like the broker, a requeued message goes back to the head
+                self.messages.appendleft((body, content_type))
+                self.condition.notify_all()
+            else:
+                self.dropped += 1
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class InMemoryTransport:
+    """Single-process transport that hands published objects straight to consumers
+
+    Publishing blocks while a queue is full (backpressure) and raises
+    QueueFull after publish_timeout seconds. Each consumer holds at most
+    `prefetch` unacknowledged messages; several consumers on one queue
+    compete for messages.
+    """
+
+    in_process = True
+
+    def __init__(self, maxsize=10000, publish_timeout=5.0):
+        self.maxsize = maxsize
+        self.publish_timeout = publish_timeout
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.closed = False
+
+    def queue(self, name):
+        with self.lock:
+            if name not in self.queues:
+                self.queues[name] = MemoryQueue(self.maxsize)
+            return self.queues[name]
+
+    def start(self):
+        for name in QUEUES:
+            self.queue(name)
+
+    def publish(self, queue, message, content_type=None):
+        self.queue(queue).put(message, content_type, self.publish_timeout)
+
+    def consume(self, queue, callback, prefetch=1):
+        """Deliver messages to callback(delivery) until the transport is closed"""
+        memory_queue = self.queue(queue)
+        credit = threading.BoundedSemaphore(prefetch)
+        while True:
+            # Wait for an ack before taking more than `prefetch` messages
+            while not credit.acquire(timeout=1.0):
+                if memory_queue.closed:
+                    return
+            message = memory_queue.get()
+            if message is None:
+                return
+            callback(MemoryDelivery(memory_queue, *message, credit))
+
+    def queue_depth(self, queue):
+        return len(self.queue(queue).messages)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            queues = list(self.queues.values())
+        for memory_queue in queues:
+            memory_queue.close()
+
+
+def make_transport(kind, parameters, publisher, maxsize=10000):
+    """Transport for the TRANSPORT setting: 'rabbitmq' or 'memory'"""
+    if kind == 'memory':
+        return InMemoryTransport(maxsize=maxsize)
+    if kind == 'rabbitmq':
+        return RabbitMQTransport(parameters, publisher)
+    raise ValueError(f'Unknown transport {kind}')
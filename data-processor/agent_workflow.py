@@ -0,0 +1,235 @@
+"""Agent workflows run as dependency DAGs on an asyncio event loop.
+
+Each workflow runs the six delivery agents. An agent starts as soon as the
+agents it depends on have finished, so independent agents overlap, and many
+workflows share the loop at once. Every agent attempt has a timeout and
+failed attempts are retried with backoff. An agent whose dependency failed
+is skipped rather than run on missing input.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+
+class Agent:
+    """One node of the workflow DAG: handler(context) is a coroutine returning the agent's result"""
+
+    def __init__(self, name, handler, depends_on=()):
+        self.name = name
+        self.handler = handler
+        self.depends_on = tuple(depends_on)
+
+
+def simulated_agent(message, min_seconds, max_seconds, failure_rate=0.0):
+    """Handler standing in for a real agent: waits a random time, then reports message"""
+    async def handler(context):
+        await asyncio.sleep(random.uniform(min_seconds, max_seconds))
+        if random.random() < failure_rate:
+            raise RuntimeError('Simulated agent failure')
+        return message
+    return handler
+
+
+def default_agents(failure_rate=0.0):
+    """The delivery agents and their dependencies
+
+    Planning feeds the ESG review, and route optimization waits for both plus
+    the incident handler's view of disruptions. Customer notifications and
+    driver briefings both follow from the optimized routes.
+    """
+    return [
+        Agent('planner_agent', simulated_agent('Route planning completed', 0.4, 1.0, failure_rate)),
+        Agent('incident_handler', simulated_agent('Monitoring active', 0.3, 1.0, failure_rate)),
+        Agent('esg_agent', simulated_agent('Environmental impact minimized', 0.3, 0.8, failure_rate),
+              depends_on=['planner_agent']),
+        Agent('route_optimizer', simulated_agent('Routes optimized for efficiency', 0.6, 1.5, failure_rate),
+              depends_on=['planner_agent', 'esg_agent', 'incident_handler']),
+        Agent('cx_agent', simulated_agent('Customer notifications sent', 0.2, 0.6, failure_rate),
+              depends_on=['route_optimizer']),
+        Agent('driver_support', simulated_agent('Driver briefings completed', 0.2, 0.6, failure_rate),
+              depends_on=['route_optimizer'])
+    ]
+
+
+def topological_order(agents):
+    """Agents ordered so each comes after its dependencies; raises ValueError on cycles or unknown names"""
+    by_name = {agent.name: agent for agent in agents}
+    ordered, state = [], {}
+
+    def visit(name, path):
+        if name not in by_name:
+            raise ValueError(f"Unknown agent dependency: {name}")
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Agent dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = 'visiting'
+        for dependency in by_name[name].depends_on:
+            visit(dependency, path + [name])
+        state[name] = 'done'
+        ordered.append(by_name[name])
+
+    for agent in agents:
+        visit(agent.name, [])
+    return ordered
+
+
+def critical_path(agents, runs):
+    """(seconds, agent names) of the longest dependency chain, weighted by each agent's run time"""
+    finish, chain = {}, {}
+    for agent in agents:
+        before = max(agent.depends_on, key=lambda name: finish[name], default=None)
+        finish[agent.name] = runs[agent.name]['seconds'] + (finish[before] if before else 0.0)
+        chain[agent.name] = (chain[before] if before else []) + [agent.name]
+    last = max(finish, key=finish.get)
+    return finish[last], chain[last]
+
+
+class WorkflowEngine:
+    """Runs workflows concurrently on an event loop in a background thread
+
+    submit() may be called from any thread and returns a concurrent.futures
+    Future for the workflow's result record. At most max_in_flight workflows
+    run at once; later ones wait for a slot. on_complete(record), if given,
+    is called on the loop thread and must not block.
+    """
+
+    def __init__(self, agents=None, timeout=10.0, retries=2, backoff=0.2, max_in_flight=64,
+                 on_complete=None, window=1000):
+        self.agents = topological_order(agents or default_agents())
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_in_flight = max_in_flight
+        self.on_complete = on_complete
+        self.loop = None
+        self.slots = None
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.counts = {'completed': 0, 'failed': 0, 'retries': 0, 'timeouts': 0}
+        self.finished = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+        self.critical_paths = deque(maxlen=window)
+        self.serial = deque(maxlen=window)
+
+    def start(self):
+        if self.loop is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.slots = asyncio.Semaphore(self.max_in_flight)
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+
+    def submit(self, workflow_id, workflow_type, data=None):
+        self.start()
+        with self.lock:
+            self.in_flight += 1
+        return asyncio.run_coroutine_threadsafe(self.run(workflow_id, workflow_type, data or {}), self.loop)
+
+    async def run(self, workflow_id, workflow_type, data):
+        try:
+            async with self.slots:
+                started = time.perf_counter()
+                tasks = {}
+                for agent in self.agents:
+                    tasks[agent.name] = asyncio.ensure_future(self.run_agent(agent, tasks, data, started))
+                runs = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+                latency = time.perf_counter() - started
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+        path_seconds, path = critical_path(self.agents, runs)
+        failed = [name for name, agent_run in runs.items() if agent_run['status'] != 'completed']
+        record = {
+            'workflow_id': workflow_id,
+            'type': workflow_type,
+            'status': 'failed' if failed else 'completed',
+            'results': {name: agent_run.get('result') for name, agent_run in runs.items()},
+            'agents': runs,
+            'latency_seconds': round(latency, 4),
+            'critical_path_seconds': round(path_seconds, 4),
+            'critical_path': path,
+            'serial_seconds': round(sum(agent_run['seconds'] for agent_run in runs.values()), 4),
+            'timestamp': datetime.now().isoformat()
+        }
+        self.record(record)
+        if self.on_complete is not None:
+            self.on_complete(record)
+        return record
+
+    async def run_agent(self, agent, tasks, data, started):
+        """Wait for the agent's dependencies, then run it with a timeout per attempt and retries"""
+        upstream = {name: await tasks[name] for name in agent.depends_on}
+        begin = time.perf_counter()
+        agent_run = {'status': 'skipped', 'attempts': 0, 'start_offset': round(begin - started, 4)}
+        if any(dependency['status'] != 'completed' for dependency in upstream.values()):
+            agent_run['seconds'] = 0.0
+            return agent_run
+
+        context = {'data': data, 'upstream': {name: run['result'] for name, run in upstream.items()}}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.count('retries')
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            agent_run['attempts'] = attempt + 1
+            try:
+                agent_run['result'] = await asyncio.wait_for(agent.handler(context), self.timeout)
+                agent_run['status'] = 'completed'
+                agent_run.pop('error', None)
+                break
+            except asyncio.TimeoutError:
+                self.count('timeouts')
+                agent_run.update(status='failed', error=f'Timed out after {self.timeout}s')
+            except Exception as e:
+                agent_run.update(status='failed', error=str(e))
+        agent_run['seconds'] = round(time.perf_counter() - begin, 4)
+        return agent_run
+
+    def count(self, event):
+        with self.lock:
+            self.counts[event] += 1
+
+    def record(self, record):
+        with self.lock:
+            self.counts[record['status']] += 1
+            self.finished.append(time.time())
+            self.latencies.append(record['latency_seconds'])
+            self.critical_paths.append(record['critical_path_seconds'])
+            self.serial.append(record['serial_seconds'])
+
+    def throughput(self, horizon=60):
+        """Workflows finished per second over the last horizon seconds"""
+        now = time.time()
+        with self.lock:
+            recent = [t for t in self.finished if now - t <= horizon]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-9)
+
+    def summary(self):
+        with self.lock:
+            counts = dict(self.counts, in_flight=self.in_flight)
+            latencies = {
+                name: {'p50_s': round(float(np.percentile(values, 50)), 3),
+                       'p95_s': round(float(np.percentile(values, 95)), 3)}
+                for name, values in (('latency', self.latencies), ('critical_path', self.critical_paths),
+                                     ('serial', self.serial)) if values
+            }
+        return {'counts': counts, 'throughput_per_s': round(self.throughput(), 2), 'latency': latencies}
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
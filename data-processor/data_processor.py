@@ -1,14 +1,17 @@
+import argparse
 import pika
 import json
 import time
 import threading
-import numpy as np
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-import random
-from sklearn.cluster import KMeans
+import queue
 from sklearn.preprocessing import StandardScaler
+from batch_encoder import CONTENT_TYPE as COLUMNAR_CONTENT_TYPE, encode_order_batch
+from synthetic_data import SyntheticDataGenerator, columns_to_rows
+from rabbitmq_transport import RabbitMQTransport
+from load_generator import DEFAULT_SCENARIO, LoadGenerator, load_scenario
+from agent_workflow import WorkflowEngine
 
 # RabbitMQ Configuration
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST', 'localhost')
@@ -16,192 +19,172 @@ RABBITMQ_PORT = int(os.getenv('RABBITMQ_PORT', 5672))
 RABBITMQ_USER = os.getenv('RABBITMQ_USER', 'admin')
 RABBITMQ_PASS = os.getenv('RABBITMQ_PASS', 'admin123')
 
+# Wire format for order batches: 'json' or 'columnar' (see batch_encoder.py)
+ORDER_WIRE_FORMAT = os.getenv('ORDER_WIRE_FORMAT', 'columnar')
+
+# Fixed seed for reproducible synthetic data; unset for a fresh run each time
+DATA_SEED = int(os.environ['DATA_SEED']) if os.getenv('DATA_SEED') else None
+
+# Agent workflows: how many run at once, and the timeout and retries of each agent attempt
+AGENT_WORKFLOW_CONCURRENCY = int(os.getenv('AGENT_WORKFLOW_CONCURRENCY', 64))
+AGENT_TIMEOUT = float(os.getenv('AGENT_TIMEOUT', 10))
+AGENT_RETRIES = int(os.getenv('AGENT_RETRIES', 2))
+
 class DeliveryDataProcessor:
-    def __init__(self):
+    def __init__(self, transport=None, on_publish=None):
         self.scaler = StandardScaler()
-        self.connection = None
-        self.channel = None
+        self.generator = SyntheticDataGenerator(seed=DATA_SEED)
+        self.verbose = True
+        # The backend passes its in-memory transport when it runs this processor in-process
+        self.transport = transport
+        # on_publish(queue, {stage: seconds}) is told how long each publish took to generate, encode and send
+        self.on_publish = on_publish
         self.setup_connection()
         
     def setup_connection(self):
         """Setup RabbitMQ connection"""
+        if self.transport is not None:
+            return
         try:
             credentials = pika.PlainCredentials(RABBITMQ_USER, RABBITMQ_PASS)
-            self.connection = pika.BlockingConnection(
+            self.transport = RabbitMQTransport(
                 pika.ConnectionParameters(host=RABBITMQ_HOST, port=RABBITMQ_PORT, credentials=credentials)
             )
-            self.channel = self.connection.channel()
-            
-            # Declare queues
-            self.channel.queue_declare(queue='order_data', durable=True)
-            self.channel.queue_declare(queue='driver_updates', durable=True)
-            self.channel.queue_declare(queue='tracking_updates', durable=True)
-            self.channel.queue_declare(queue='route_optimization', durable=True)
-            self.channel.queue_declare(queue='agent_workflow', durable=True)
+            self.transport.start()
             
             print("Connected to RabbitMQ successfully")
             
         except Exception as e:
             print(f"Failed to connect to RabbitMQ: {e}")
             
+    def generate_order_columns(self, num_orders=50):
+        """Generate order data as column arrays"""
+        return self.generator.order_columns(num_orders)
+    
     def generate_order_data(self, num_orders=50):
         """Generate realistic order data"""
-        time_slots = ['09:00-11:00', '11:00-13:00', '13:00-15:00', '15:00-17:00', '17:00-19:00', '19:00-21:00']
-        package_sizes = ['Small', 'Medium', 'Large']
-        priorities = ['High', 'Medium', 'Low']
-        statuses = ['Pending', 'Assigned', 'In Transit', 'Delivered']
-        
-        orders = []
-        for i in range(num_orders):
-            order = {
-                'order_id': f'ORD-{str(i + 1).zfill(3)}',
-                'latitude': 40.7589 + (random.random() - 0.5) * 0.1,
-                'longitude': -73.9851 + (random.random() - 0.5) * 0.1,
-                'delivery_time_slot': random.choice(time_slots),
-                'package_size': random.choice(package_sizes),
-                'priority': random.choice(priorities),
-                'volume': random.uniform(0.1, 0.6),
-                'weight': random.uniform(1, 11),
-                'status': random.choice(statuses),
-                'created_at': datetime.now().isoformat(),
-                'customer_id': f'CUST-{random.randint(1000, 9999)}',
-                'delivery_address': f'{random.randint(100, 999)} Main St, New York, NY',
-                'phone': f'+1-{random.randint(100, 999)}-{random.randint(100, 999)}-{random.randint(1000, 9999)}'
-            }
-            orders.append(order)
-        
-        return orders
+        return columns_to_rows(self.generate_order_columns(num_orders))
     
     def generate_driver_data(self, num_drivers=10):
         """Generate realistic driver data"""
-        driver_names = [
-            'Alice Johnson', 'Bob Smith', 'Carol Brown', 'David Wilson', 
-            'Eva Davis', 'Frank Miller', 'Grace Lee', 'Henry Chen', 
-            'Iris Garcia', 'Jack Taylor'
-        ]
-        
-        vehicle_types = ['Van', 'Truck', 'Motorcycle']
-        statuses = ['Available', 'On Route', 'Break', 'Offline']
-        
-        drivers = []
-        for i in range(num_drivers):
-            driver = {
-                'driver_id': f'DRV-{str(i + 1).zfill(2)}',
-                'name': driver_names[i],
-                'status': random.choice(statuses),
-                'current_load_volume': random.uniform(0, 8),
-                'vehicle_capacity_volume': 10,
-                'current_load_weight': random.uniform(0, 800),
-                'vehicle_capacity_weight': 1000,
-                'deliveries_today': random.randint(0, 15),
-                'rating': round(random.uniform(4.0, 5.0), 1),
-                'vehicle_type': random.choice(vehicle_types),
-                'current_location': {
-                    'latitude': 40.7589 + (random.random() - 0.5) * 0.1,
-                    'longitude': -73.9851 + (random.random() - 0.5) * 0.1
-                },
-                'last_update': datetime.now().isoformat(),
-                'phone': f'+1-{random.randint(100, 999)}-{random.randint(100, 999)}-{random.randint(1000, 9999)}'
+        columns = self.generator.driver_columns(num_drivers)
+        drivers = columns_to_rows(columns)
+        for driver in drivers:
+            driver['current_location'] = {
+                'latitude': driver.pop('latitude'),
+                'longitude': driver.pop('longitude')
             }
-            drivers.append(driver)
-        
         return drivers
     
     def generate_tracking_data(self, active_routes):
         """Generate real-time tracking data"""
-        tracking_data = {}
-        
-        for route in active_routes:
-            if route['status'] == 'Active':
-                tracking_data[route['route_id']] = {
-                    'route_id': route['route_id'],
-                    'driver_id': route['driver_id'],
-                    'current_latitude': 40.7589 + (random.random() - 0.5) * 0.1,
-                    'current_longitude': -73.9851 + (random.random() - 0.5) * 0.1,
-                    'progress': random.random(),
-                    'status': 'In Transit',
-                    'next_delivery': f'ORD-{str(random.randint(1, 50)).zfill(3)}',
-                    'eta': (datetime.now() + timedelta(minutes=random.randint(10, 120))).strftime('%H:%M'),
-                    'speed': random.uniform(15, 45),  # km/h
-                    'fuel_level': random.uniform(0.2, 1.0),
-                    'temperature': random.uniform(-5, 35),  # Celsius
-                    'last_update': datetime.now().isoformat()
-                }
-        
-        return tracking_data
+        active = [route for route in active_routes if route['status'] == 'Active']
+        columns = self.generator.tracking_columns(
+            [route['route_id'] for route in active],
+            [route['driver_id'] for route in active]
+        )
+        return {row['route_id']: row for row in columns_to_rows(columns)}
+    
+    def report_publish(self, queue, timings):
+        if self.on_publish is not None:
+            self.on_publish(queue, timings)
     
-    def publish_order_data(self):
+    def publish_order_data(self, num_orders=None):
         """Publish order data to RabbitMQ"""
         try:
-            orders = self.generate_order_data(random.randint(30, 70))
+            start = time.perf_counter()
+            if num_orders is None:
+                num_orders = int(self.generator.rng.integers(30, 71))
+            orders = self.generate_order_columns(num_orders)
+            timings = {'generate': time.perf_counter() - start}
             
-            message = {
+            metadata = {
                 'type': 'order_batch',
-                'orders': orders,
                 'timestamp': datetime.now().isoformat(),
-                'batch_id': f'BATCH-{int(time.time())}'
+                'batch_id': f'BATCH-{int(time.time())}',
+                'sent_at': time.time()
             }
             
-            self.channel.basic_publish(
-                exchange='',
-                routing_key='order_data',
-                body=json.dumps(message),
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
+            start = time.perf_counter()
+            if self.transport.in_process:
+                # Same process as the backend: hand over the column arrays as they are
+                body = dict(metadata, orders=orders)
+                content_type = None
+            elif ORDER_WIRE_FORMAT == 'columnar':
+                body = encode_order_batch(orders, metadata)
+                content_type = COLUMNAR_CONTENT_TYPE
+            else:
+                body = json.dumps(dict(metadata, orders=columns_to_rows(orders)))
+                content_type = 'application/json'
+            
+            timings['encode'] = time.perf_counter() - start
             
-            print(f"Published {len(orders)} orders to queue")
+            start = time.perf_counter()
+            self.transport.publish('order_data', body, content_type)
+            timings['publish'] = time.perf_counter() - start
+            self.report_publish('order_data', timings)
+            
+            if self.verbose:
+                print(f"Published {len(orders['order_id'])} orders to queue")
             
         except Exception as e:
             print(f"Error publishing order data: {e}")
     
-    def publish_driver_updates(self):
+    def publish_driver_updates(self, num_drivers=10):
         """Publish driver updates to RabbitMQ"""
         try:
-            drivers = self.generate_driver_data()
+            start = time.perf_counter()
+            drivers = self.generate_driver_data(num_drivers)
+            timings = {'generate': time.perf_counter() - start}
             
             message = {
                 'type': 'driver_status_update',
                 'drivers': drivers,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'sent_at': time.time()
             }
             
-            self.channel.basic_publish(
-                exchange='',
-                routing_key='driver_updates',
-                body=json.dumps(message),
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
+            start = time.perf_counter()
+            self.transport.publish('driver_updates', message)
+            timings['publish'] = time.perf_counter() - start
+            self.report_publish('driver_updates', timings)
             
-            print(f"Published {len(drivers)} driver updates to queue")
+            if self.verbose:
+                print(f"Published {len(drivers)} driver updates to queue")
             
         except Exception as e:
             print(f"Error publishing driver updates: {e}")
     
-    def publish_tracking_updates(self):
+    def publish_tracking_updates(self, num_routes=None):
         """Publish tracking updates to RabbitMQ"""
         try:
+            start = time.perf_counter()
+            if num_routes is None:
+                num_routes = int(self.generator.rng.integers(3, 7))
+            
             # Generate mock active routes
             active_routes = [
                 {'route_id': f'RTE-{str(i+1).zfill(2)}', 'driver_id': f'DRV-{str(i+1).zfill(2)}', 'status': 'Active'}
-                for i in range(random.randint(3, 6))
+                for i in range(num_routes)
             ]
             
             tracking_data = self.generate_tracking_data(active_routes)
+            timings = {'generate': time.perf_counter() - start}
             
             message = {
                 'type': 'tracking_update',
                 'tracking_data': tracking_data,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'sent_at': time.time()
             }
             
-            self.channel.basic_publish(
-                exchange='',
-                routing_key='tracking_updates',
-                body=json.dumps(message),
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
+            start = time.perf_counter()
+            self.transport.publish('tracking_updates', message)
+            timings['publish'] = time.perf_counter() - start
+            self.report_publish('tracking_updates', timings)
             
-            print(f"Published tracking updates for {len(tracking_data)} routes")
+            if self.verbose:
+                print(f"Published tracking updates for {len(tracking_data)} routes")
             
         except Exception as e:
             print(f"Error publishing tracking updates: {e}")
@@ -209,84 +192,69 @@ class DeliveryDataProcessor:
     def simulate_real_time_data(self):
         """Simulate real-time data generation"""
         print("Starting real-time data simulation...")
-        
-        # Initial data burst
-        self.publish_order_data()
-        self.publish_driver_updates()
-        
-        # Continuous updates
-        while True:
-            try:
-                # Publish updates at different intervals
-                current_time = datetime.now()
-                
-                # Order data every 30 seconds
-                if current_time.second % 30 == 0:
-                    self.publish_order_data()
-                
-                # Driver updates every 15 seconds
-                if current_time.second % 15 == 0:
-                    self.publish_driver_updates()
-                
-                # Tracking updates every 10 seconds
-                if current_time.second % 10 == 0:
-                    self.publish_tracking_updates()
-                
-                time.sleep(1)
-                
-            except KeyboardInterrupt:
-                print("Stopping data simulation...")
-                break
-            except Exception as e:
-                print(f"Error in simulation loop: {e}")
-                time.sleep(5)
+        LoadGenerator(self, DEFAULT_SCENARIO).run()
     
     def process_agent_workflow(self):
-        """Process agent workflow requests"""
-        def workflow_callback(ch, method, properties, body):
+        """Process agent workflow requests
+
+        The callback only hands each request to the workflow engine, so the
+        consuming connection keeps serving heartbeats and up to
+        AGENT_WORKFLOW_CONCURRENCY workflows run at once. Finished workflows
+        are published to agent_results by a thread of their own and the
+        request is acked once its results are out.
+        """
+        finished = queue.SimpleQueue()
+        engine = WorkflowEngine(timeout=AGENT_TIMEOUT, retries=AGENT_RETRIES,
+                                max_in_flight=AGENT_WORKFLOW_CONCURRENCY)
+        threading.Thread(target=self.publish_workflow_results, args=(finished, engine), daemon=True).start()
+        
+        def workflow_callback(delivery):
             try:
-                data = json.loads(body)
+                body = delivery.body
+                data = json.loads(body) if isinstance(body, (bytes, str)) else body
                 workflow_type = data.get('workflow_type', 'delivery_planning')
+                workflow_id = data.get('workflow_id') or f'WF-{time.time_ns()}'
                 
-                print(f"Processing agent workflow: {workflow_type}")
-                
-                # Simulate agent processing time
-                time.sleep(random.uniform(2, 5))
-                
-                # Generate agent workflow results
-                workflow_results = {
-                    'workflow_id': f'WF-{int(time.time())}',
-                    'type': workflow_type,
-                    'status': 'completed',
-                    'results': {
-                        'planner_agent': 'Route planning completed',
-                        'cx_agent': 'Customer notifications sent',
-                        'route_optimizer': 'Routes optimized for efficiency',
-                        'driver_support': 'Driver briefings completed',
-                        'esg_agent': 'Environmental impact minimized',
-                        'incident_handler': 'Monitoring active'
-                    },
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                print(f"Completed workflow: {workflow_type}")
-                ch.basic_ack(delivery_tag=method.delivery_tag)
+                future = engine.submit(workflow_id, workflow_type, data.get('data'))
+                future.add_done_callback(lambda f: finished.put((f, delivery, data.get('requested_at'))))
                 
             except Exception as e:
                 print(f"Error processing workflow: {e}")
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+                delivery.nack(requeue=False)
         
-        self.channel.basic_consume(queue='agent_workflow', on_message_callback=workflow_callback)
         print("Started agent workflow processor")
-        self.channel.start_consuming()
+        self.transport.consume('agent_workflow', workflow_callback, prefetch=AGENT_WORKFLOW_CONCURRENCY)
+    
+    def publish_workflow_results(self, finished, engine):
+        """Publish finished workflows and ack their requests; owns its own connection when on RabbitMQ"""
+        transport = self.transport if self.transport.in_process else RabbitMQTransport(self.transport.parameters)
+        while True:
+            future, delivery, requested_at = finished.get()
+            try:
+                results = future.result()
+                transport.publish('agent_results', dict(results, requested_at=requested_at))
+                delivery.ack()
+                if self.verbose:
+                    summary = engine.summary()
+                    print(f"Completed workflow {results['workflow_id']} ({results['status']}) in "
+                          f"{results['latency_seconds']:.2f}s, critical path {results['critical_path_seconds']:.2f}s; "
+                          f"{summary['throughput_per_s']} workflows/s, {summary['counts']['in_flight']} in flight")
+            except Exception as e:
+                print(f"Error publishing workflow results: {e}")
+                delivery.nack(requeue=False)
     
     def close_connection(self):
         """Close RabbitMQ connection"""
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
+        if self.transport is not None:
+            self.transport.close()
             print("RabbitMQ connection closed")
 
 def main():
+    parser = argparse.ArgumentParser(description='Walmart delivery data processor')
+    parser.add_argument('--scenario', help='Run a load-generation scenario file instead of the demo simulation')
+    parser.add_argument('--report', default='load_report.json', help='Where to write the load test report')
+    args = parser.parse_args()
+    
     processor = DeliveryDataProcessor()
     
     try:
@@ -294,8 +262,14 @@ def main():
         workflow_thread = threading.Thread(target=processor.process_agent_workflow, daemon=True)
         workflow_thread.start()
         
-        # Start real-time data simulation
-        processor.simulate_real_time_data()
+        if args.scenario:
+            report = LoadGenerator(processor, load_scenario(args.scenario)).run()
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Load test report written to {args.report}")
+        else:
+            # Start real-time data simulation
+            processor.simulate_real_time_data()
         
     except KeyboardInterrupt:
         print("Shutting down data processor...")
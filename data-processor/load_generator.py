@@ -0,0 +1,179 @@
+"""Scenario-driven load generation for the delivery backend.
+
+A scenario is a JSON object; every key is optional:
+
+    {
+        "duration_s": 600,              # null runs until interrupted
+        "orders_per_sec": 200,
+        "order_batch_size": 50,         # orders per order_data message
+        "drivers": 200,                 # drivers per driver_updates message
+        "driver_update_hz": 0.2,
+        "active_routes": 50,            # routes per tracking_updates message
+        "tracking_hz": 1,
+        "sample_interval_s": 1,         # queue backlog sampling
+        "bursts": [{"start_s": 120, "duration_s": 60, "multiplier": 3, "streams": ["orders"]}]
+    }
+
+Each stream fires on an absolute deadline (due + interval), so a slow
+publish delays one message without shifting the ones after it, and the
+lag behind schedule is recorded. Bursts scale a stream's rate while they
+are active; without "streams" they apply to orders only. Every message
+carries a 'sent_at' wall-clock stamp; the backend turns it into the
+publish-to-emit 'end_to_end' latency that the report reads from
+/api/pipeline-stats, so both hosts need synchronised clocks.
+"""
+import heapq
+import json
+import os
+import time
+import urllib.request
+
+import numpy as np
+
+BACKEND_URL = os.getenv('BACKEND_URL', 'http://localhost:5000')
+LOAD_QUEUES = ['order_data', 'driver_updates', 'tracking_updates']
+
+# Roughly what the demo simulation used to send: a batch of orders every
+# 30 s, driver updates every 15 s and tracking every 10 s
+DEFAULT_SCENARIO = {
+    'duration_s': None,
+    'orders_per_sec': 50 / 30,
+    'order_batch_size': 50,
+    'drivers': 10,
+    'driver_update_hz': 1 / 15,
+    'active_routes': 5,
+    'tracking_hz': 1 / 10,
+    'sample_interval_s': None,
+    'bursts': []
+}
+
+
+def load_scenario(path):
+    with open(path) as f:
+        return dict(DEFAULT_SCENARIO, **json.load(f))
+
+
+def percentiles(values):
+    if not values:
+        return {'count': 0}
+    values = np.asarray(values) * 1000
+    return {
+        'count': int(len(values)),
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+        'p99_ms': round(float(np.percentile(values, 99)), 2),
+        'max_ms': round(float(values.max()), 2)
+    }
+
+
+class LoadGenerator:
+    """Drive a DeliveryDataProcessor's publish methods at the rates of a scenario"""
+
+    def __init__(self, processor, scenario):
+        self.processor = processor
+        self.scenario = dict(DEFAULT_SCENARIO, **scenario)
+        self.sent = {}
+        self.lag = {}
+        self.backlog = []
+        self.publish_timings = {}
+        self.forward_publish = None
+
+    def streams(self):
+        """(name, base interval in seconds, publish callable) for every enabled stream"""
+        s = self.scenario
+        streams = []
+        if s['orders_per_sec']:
+            streams.append(('orders', s['order_batch_size'] / s['orders_per_sec'],
+                            lambda: self.processor.publish_order_data(s['order_batch_size'])))
+        if s['driver_update_hz']:
+            streams.append(('drivers', 1 / s['driver_update_hz'],
+                            lambda: self.processor.publish_driver_updates(s['drivers'])))
+        if s['tracking_hz']:
+            streams.append(('tracking', 1 / s['tracking_hz'],
+                            lambda: self.processor.publish_tracking_updates(s['active_routes'])))
+        if s['sample_interval_s']:
+            streams.append(('backlog', s['sample_interval_s'], self.sample_backlog))
+        return streams
+
+    def multiplier(self, stream, elapsed):
+        rate = 1.0
+        for burst in self.scenario['bursts']:
+            if (stream in burst.get('streams', ['orders']) and
+                    burst['start_s'] <= elapsed < burst['start_s'] + burst['duration_s']):
+                rate *= burst['multiplier']
+        return rate
+
+    def record_publish(self, queue, timings):
+        for stage, seconds in timings.items():
+            self.publish_timings.setdefault(queue, {}).setdefault(stage, []).append(seconds)
+        if self.forward_publish is not None:
+            self.forward_publish(queue, timings)
+
+    def sample_backlog(self):
+        sample = {'t': round(time.monotonic() - self.started, 3)}
+        for name in LOAD_QUEUES:
+            sample[name] = self.processor.transport.queue_depth(name)
+        self.backlog.append(sample)
+
+    def run(self):
+        """Publish until the scenario's duration is over; returns the report"""
+        streams = {name: (interval, publish) for name, interval, publish in self.streams()}
+        duration = self.scenario['duration_s']
+        self.processor.verbose = duration is None
+        # Collect publish-path timings for a timed run's report, still passing them to any existing hook
+        self.forward_publish = self.processor.on_publish
+        if duration is not None:
+            self.processor.on_publish = self.record_publish
+        self.started = time.monotonic()
+        due = [(self.started, name) for name in streams]
+        heapq.heapify(due)
+
+        try:
+            while due:
+                deadline, name = heapq.heappop(due)
+                elapsed = deadline - self.started
+                if duration is not None and elapsed >= duration:
+                    continue
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.lag.setdefault(name, []).append(max(0.0, time.monotonic() - deadline))
+
+                interval, publish = streams[name]
+                publish()
+                self.sent[name] = self.sent.get(name, 0) + 1
+                heapq.heappush(due, (deadline + interval / self.multiplier(name, elapsed), name))
+        except KeyboardInterrupt:
+            print("Stopping data simulation...")
+        finally:
+            self.processor.verbose = True
+            self.processor.on_publish = self.forward_publish
+        return self.report(time.monotonic() - self.started)
+
+    def report(self, elapsed):
+        sent = {name: count for name, count in self.sent.items() if name != 'backlog'}
+        report = {
+            'scenario': self.scenario,
+            'elapsed_s': round(elapsed, 2),
+            'messages_sent': sent,
+            'orders_sent': sent.get('orders', 0) * self.scenario['order_batch_size'],
+            'publish_rate_per_s': {name: round(count / elapsed, 2) for name, count in sent.items()},
+            'schedule_lag': {name: percentiles(values) for name, values in self.lag.items()},
+            'publish_stages': {queue: {stage: percentiles(values) for stage, values in stages.items()}
+                               for queue, stages in self.publish_timings.items()},
+            'queue_backlog': self.backlog,
+            'peak_backlog': {name: max((s[name] for s in self.backlog), default=0) for name in LOAD_QUEUES}
+        }
+        try:
+            with urllib.request.urlopen(f'{BACKEND_URL}/api/pipeline-stats', timeout=5) as response:
+                report['backend'] = json.load(response)
+        except (OSError, ValueError) as e:
+            report['backend'] = {'error': str(e)}
+
+        for queue, stats in report['backend'].items():
+            end_to_end = stats.get('stages', {}).get('end_to_end') if isinstance(stats, dict) else None
+            if end_to_end:
+                print(f"{queue}: end-to-end p50 {end_to_end['p50_ms']} ms, p95 {end_to_end['p95_ms']} ms, "
+                      f"p99 {end_to_end['p99_ms']} ms, drain {stats['drain_rate_per_s']}/s")
+        print(f"Sent {report['orders_sent']} orders in {report['elapsed_s']} s; peak backlog {report['peak_backlog']}")
+        return report
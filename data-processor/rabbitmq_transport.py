@@ -0,0 +1,85 @@
+"""RabbitMQ transport for the data processor.
+
+Mirrors the interface of the backend's transport.py: publish(queue, message,
+content_type), consume(queue, callback, prefetch) with Delivery objects
+that ack()/nack(), queue_depth(queue) and the `in_process` flag. When the
+backend runs this processor in its own process it passes in its
+InMemoryTransport instead, and messages skip encoding altogether.
+"""
+import functools
+import json
+
+import pika
+
+QUEUES = ['order_data', 'driver_updates', 'tracking_updates', 'route_optimization', 'agent_workflow', 'agent_results']
+
+
+class RabbitMQDelivery:
+    def __init__(self, connection, channel, method, properties, body):
+        self.body = body
+        self.content_type = properties.content_type
+        self.connection = connection
+        self.channel = channel
+        self.delivery_tag = method.delivery_tag
+
+    def ack(self):
+        self.connection.add_callback_threadsafe(
+            functools.partial(self.channel.basic_ack, delivery_tag=self.delivery_tag)
+        )
+
+    def nack(self, requeue=False):
+        self.connection.add_callback_threadsafe(
+            functools.partial(self.channel.basic_nack, delivery_tag=self.delivery_tag, requeue=requeue)
+        )
+
+
+class RabbitMQTransport:
+    """Publishing connection for the producing thread; each consume call opens its own
+
+    A BlockingConnection must stay on one thread, so publish and
+    queue_depth belong to the thread that generates data and consumers
+    (the agent workflow thread) get a connection of their own. Another
+    publishing thread creates its own RabbitMQTransport.
+    """
+
+    in_process = False
+
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.connection = None
+        self.channel = None
+
+    def start(self):
+        self.connect()
+        for name in QUEUES:
+            self.channel.queue_declare(queue=name, durable=True)
+
+    def connect(self):
+        if self.channel is None or not self.channel.is_open:
+            self.connection = pika.BlockingConnection(self.parameters)
+            self.channel = self.connection.channel()
+
+    def publish(self, queue, message, content_type=None):
+        body = message if isinstance(message, (bytes, str)) else json.dumps(message)
+        properties = pika.BasicProperties(delivery_mode=2, content_type=content_type)
+        self.connect()
+        self.channel.basic_publish(exchange='', routing_key=queue, body=body, properties=properties)
+
+    def consume(self, queue, callback, prefetch=1):
+        connection = pika.BlockingConnection(self.parameters)
+        channel = connection.channel()
+        channel.basic_qos(prefetch_count=prefetch)
+
+        def on_message(ch, method, properties, body):
+            callback(RabbitMQDelivery(connection, ch, method, properties, body))
+
+        channel.basic_consume(queue=queue, on_message_callback=on_message)
+        channel.start_consuming()
+
+    def queue_depth(self, queue):
+        self.connect()
+        return self.channel.queue_declare(queue=queue, passive=True).method.message_count
+
+    def close(self):
+        if self.connection and not self.connection.is_closed:
+            self.connection.close()
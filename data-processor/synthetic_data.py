@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from functools import reduce
+
+import numpy as np
+
+TIME_SLOTS = np.array(['09:00-11:00', '11:00-13:00', '13:00-15:00', '15:00-17:00', '17:00-19:00', '19:00-21:00'])
+PACKAGE_SIZES = np.array(['Small', 'Medium', 'Large'])
+PRIORITIES = np.array(['High', 'Medium', 'Low'])
+ORDER_STATUSES = np.array(['Pending', 'Assigned', 'In Transit', 'Delivered'])
+VEHICLE_TYPES = np.array(['Van', 'Truck', 'Motorcycle'])
+DRIVER_STATUSES = np.array(['Available', 'On Route', 'Break', 'Offline'])
+FIRST_NAMES = np.array(['Alice', 'Bob', 'Carol', 'David', 'Eva', 'Frank', 'Grace', 'Henry', 'Iris', 'Jack',
+                        'Kara', 'Liam', 'Maya', 'Noah', 'Olga', 'Priya', 'Quinn', 'Raj', 'Sofia', 'Tom'])
+LAST_NAMES = np.array(['Johnson', 'Smith', 'Brown', 'Wilson', 'Davis', 'Miller', 'Lee', 'Chen', 'Garcia',
+                       'Taylor', 'Patel', 'Kim', 'Lopez', 'Nguyen', 'Walker', 'Young', 'Hall', 'Rivera'])
+
+# Demand hotspots: (latitude, longitude, spread in degrees, share of orders)
+DEFAULT_HOTSPOTS = [
+    (40.7589, -73.9851, 0.012, 0.30),  # Midtown
+    (40.7075, -74.0113, 0.008, 0.20),  # Financial District
+    (40.7870, -73.9754, 0.010, 0.20),  # Upper West Side
+    (40.6782, -73.9442, 0.015, 0.15),  # Central Brooklyn
+    (40.7447, -73.9485, 0.008, 0.15),  # Long Island City
+]
+
+# Service area used for background demand and driver positions
+SERVICE_AREA = (40.7589, -73.9851, 0.1)
+
+
+def zero_padded(prefix, numbers, width):
+    return np.char.add(prefix, np.char.zfill(numbers.astype(str), width))
+
+
+def concat(*parts):
+    """Element-wise string concatenation of arrays and scalars"""
+    return reduce(np.char.add, [p.astype(str) if isinstance(p, np.ndarray) else p for p in parts])
+
+
+class SyntheticDataGenerator:
+    """Seedable, NumPy-vectorized generator for orders, drivers and tracking points
+
+    Everything is produced as column arrays. Orders are drawn from a mixture
+    of Gaussian demand hotspots plus a uniform background, and can be
+    streamed in fixed-size chunks so memory stays bounded at any volume.
+    """
+
+    def __init__(self, seed=None, hotspots=DEFAULT_HOTSPOTS, background_share=0.1, service_area=SERVICE_AREA):
+        self.rng = np.random.default_rng(seed)
+        self.hotspots = np.array(hotspots, dtype=np.float64)
+        self.background_share = background_share
+        self.service_area = service_area
+
+    def locations(self, n):
+        """Sample n (latitude, longitude) pairs from the hotspot mixture"""
+        center_lat, center_lon, span = self.service_area
+        latitude = center_lat + (self.rng.random(n) - 0.5) * span
+        longitude = center_lon + (self.rng.random(n) - 0.5) * span
+
+        in_hotspot = self.rng.random(n) >= self.background_share
+        count = int(in_hotspot.sum())
+        shares = self.hotspots[:, 3] / self.hotspots[:, 3].sum()
+        chosen = self.hotspots[self.rng.choice(len(self.hotspots), size=count, p=shares)]
+        latitude[in_hotspot] = chosen[:, 0] + self.rng.normal(0, 1, count) * chosen[:, 2]
+        longitude[in_hotspot] = chosen[:, 1] + self.rng.normal(0, 1, count) * chosen[:, 2]
+        return latitude, longitude
+
+    def phones(self, n):
+        return concat('+1-', self.rng.integers(100, 1000, n), '-',
+                      self.rng.integers(100, 1000, n), '-', self.rng.integers(1000, 10000, n))
+
+    def order_columns(self, n, start_index=0, created_at=None):
+        """One chunk of n orders as column arrays; order IDs start after start_index"""
+        latitude, longitude = self.locations(n)
+        created_at = created_at or datetime.now().isoformat()
+        return {
+            'order_id': zero_padded('ORD-', np.arange(start_index + 1, start_index + n + 1), 3),
+            'latitude': latitude,
+            'longitude': longitude,
+            'delivery_time_slot': TIME_SLOTS[self.rng.integers(0, len(TIME_SLOTS), n)],
+            'package_size': PACKAGE_SIZES[self.rng.integers(0, len(PACKAGE_SIZES), n)],
+            'priority': PRIORITIES[self.rng.integers(0, len(PRIORITIES), n)],
+            'volume': self.rng.uniform(0.1, 0.6, n),
+            'weight': self.rng.uniform(1, 11, n),
+            'status': ORDER_STATUSES[self.rng.integers(0, len(ORDER_STATUSES), n)],
+            'created_at': np.full(n, created_at),
+            'customer_id': concat('CUST-', self.rng.integers(1000, 10000, n)),
+            'delivery_address': concat(self.rng.integers(100, 1000, n), ' Main St, New York, NY'),
+            'phone': self.phones(n)
+        }
+
+    def iter_order_chunks(self, total, chunk_size=100000):
+        """Yield column chunks until total orders have been produced"""
+        for start in range(0, total, chunk_size):
+            yield self.order_columns(min(chunk_size, total - start), start_index=start)
+
+    def driver_columns(self, n):
+        center_lat, center_lon, span = self.service_area
+        now = datetime.now().isoformat()
+        return {
+            'driver_id': zero_padded('DRV-', np.arange(1, n + 1), 2),
+            'name': concat(FIRST_NAMES[self.rng.integers(0, len(FIRST_NAMES), n)], ' ',
+                           LAST_NAMES[self.rng.integers(0, len(LAST_NAMES), n)]),
+            'status': DRIVER_STATUSES[self.rng.integers(0, len(DRIVER_STATUSES), n)],
+            'current_load_volume': self.rng.uniform(0, 8, n),
+            'vehicle_capacity_volume': np.full(n, 10),
+            'current_load_weight': self.rng.uniform(0, 800, n),
+            'vehicle_capacity_weight': np.full(n, 1000),
+            'deliveries_today': self.rng.integers(0, 16, n),
+            'rating': np.round(self.rng.uniform(4.0, 5.0, n), 1),
+            'vehicle_type': VEHICLE_TYPES[self.rng.integers(0, len(VEHICLE_TYPES), n)],
+            'latitude': center_lat + (self.rng.random(n) - 0.5) * span,
+            'longitude': center_lon + (self.rng.random(n) - 0.5) * span,
+            'last_update': np.full(n, now),
+            'phone': self.phones(n)
+        }
+
+    def tracking_columns(self, route_ids, driver_ids, order_count=50):
+        n = len(route_ids)
+        center_lat, center_lon, span = self.service_area
+        now = datetime.now()
+        eta_minutes = self.rng.integers(10, 121, n)
+        return {
+            'route_id': np.asarray(route_ids),
+            'driver_id': np.asarray(driver_ids),
+            'current_latitude': center_lat + (self.rng.random(n) - 0.5) * span,
+            'current_longitude': center_lon + (self.rng.random(n) - 0.5) * span,
+            'progress': self.rng.random(n),
+            'status': np.full(n, 'In Transit'),
+            'next_delivery': zero_padded('ORD-', self.rng.integers(1, order_count + 1, n), 3),
+            'eta': np.array([(now + timedelta(minutes=int(m))).strftime('%H:%M') for m in eta_minutes]),
+            'speed': self.rng.uniform(15, 45, n),
+            'fuel_level': self.rng.uniform(0.2, 1.0, n),
+            'temperature': self.rng.uniform(-5, 35, n),
+            'last_update': np.full(n, now.isoformat())
+        }
+
+
+def columns_to_rows(columns):
+    """Turn column arrays into a list of dicts with plain Python values"""
+    names = list(columns)
+    values = [np.asarray(columns[name]).tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*values)]
@@ -40,8 +40,10 @@ const DeliveryDashboard = () => {
             } else if (update.type === 'driver_update') {
                 setDrivers(update.data.drivers || []);
                 setStats(update.data.stats || {});
+            } else if (update.type === 'tracking_update') {
+                setTracking(Object.fromEntries((update.data.tracking || []).map((track) => [track.route_id, track])));
             }
-        });
+        }, ['orders', 'clusters', 'drivers', 'stats', 'tracking']);
 
         fetchDashboardData();
 
@@ -38,6 +38,21 @@ export const initializeSocket = () => {
   return socket;
 };
 
+// Record key per backend state section; stats is a single object
+const SECTION_KEYS = {
+  orders: 'order_id',
+  drivers: 'driver_id',
+  clusters: 'cluster_id',
+  routes: 'route_id',
+  tracking: 'route_id',
+  stats: null,
+};
+
+// State messages arrive as pre-encoded JSON bytes
+const decodeMessage = (payload) => (
+  JSON.parse(typeof payload === 'string' ? payload : new TextDecoder().decode(payload))
+);
+
 // Get socket instance
 export const getSocket = () => {
   if (!socket) {
@@ -70,6 +85,66 @@ export const apiService = {
     }
   },
 
+  getOptimizationJob: async (jobId) => {
+    try {
+      const response = await api.get(`/optimize-routes/${jobId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching optimization job:', error);
+      throw error;
+    }
+  },
+
+  getOptimizationResult: async (jobId) => {
+    try {
+      const response = await api.get(`/optimize-routes/${jobId}/result`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching optimization result:', error);
+      throw error;
+    }
+  },
+
+  getAssignments: async () => {
+    try {
+      const response = await api.get('/assignments');
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching driver assignments:', error);
+      throw error;
+    }
+  },
+
+  getSchedule: async () => {
+    try {
+      const response = await api.get('/schedule');
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching delivery schedule:', error);
+      throw error;
+    }
+  },
+
+  getRouteETAs: async (routeIds) => {
+    try {
+      const response = await api.get('/eta', { params: routeIds ? { route_id: routeIds.join(',') } : {} });
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching route ETAs:', error);
+      throw error;
+    }
+  },
+
+  estimateETAs: async (routes, departure) => {
+    try {
+      const response = await api.post('/eta', { routes, departure });
+      return response.data;
+    } catch (error) {
+      console.error('Error estimating ETAs:', error);
+      throw error;
+    }
+  },
+
   // Multi-hop delivery planning
   planMultiHopDelivery: async (deliveryConfig) => {
     try {
@@ -92,16 +167,74 @@ export const apiService = {
     }
   },
 
-  // Real-time data subscription
-  subscribeToRealTimeUpdates: (callback) => {
+  getAgentWorkflow: async (workflowId) => {
+    try {
+      const response = await api.get(`/agent-workflow/${workflowId}`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching agent workflow:', error);
+      throw error;
+    }
+  },
+
+  // Real-time data subscription: mirrors backend state sections from versioned deltas
+  subscribeToRealTimeUpdates: (callback, sections = ['orders', 'clusters', 'drivers', 'stats']) => {
     const socketInstance = getSocket();
-    
-    socketInstance.on('data_update', (data) => {
-      callback(data);
-    });
+    const records = {};
+    const versions = {};
+
+    const subscribe = (section) => {
+      socketInstance.emit('subscribe', { sections: [section], version: versions[section] });
+    };
+
+    const values = (section) => (
+      SECTION_KEYS[section] ? Array.from((records[section] || new Map()).values()) : (records[section] || {})
+    );
+
+    const handleDelta = (payload) => {
+      const message = decodeMessage(payload);
+      const { section } = message;
+      const key = SECTION_KEYS[section];
+
+      if (message.type === 'snapshot') {
+        records[section] = key
+          ? new Map(message.records.map((record) => [record[key], record]))
+          : message.records;
+      } else if (versions[section] !== message.prev_version) {
+        // Missed a delta for this section; ask the backend to replay from our version
+        subscribe(section);
+        return;
+      } else if (key) {
+        const current = records[section] || new Map();
+        message.added.concat(message.changed).forEach((record) => current.set(record[key], record));
+        message.removed.forEach((id) => current.delete(id));
+        records[section] = current;
+      } else {
+        records[section] = message.added.concat(message.changed)[0] || {};
+      }
+      versions[section] = message.version;
+
+      if (['orders', 'clusters', 'routes'].includes(section)) {
+        callback({ type: 'orders_processed', data: { orders: values('orders'), clusters: values('clusters'), routes: values('routes') } });
+      } else if (['drivers', 'stats'].includes(section)) {
+        callback({ type: 'driver_update', data: { drivers: values('drivers'), stats: values('stats') } });
+      } else {
+        callback({ type: `${section}_update`, data: { [section]: values(section) } });
+      }
+    };
+
+    const resubscribe = () => sections.forEach(subscribe);
+
+    socketInstance.on('state_delta', handleDelta);
+    socketInstance.on('connect', resubscribe);
+    if (socketInstance.connected) {
+      resubscribe();
+    }
 
     return () => {
-      socketInstance.off('data_update');
+      socketInstance.off('state_delta', handleDelta);
+      socketInstance.off('connect', resubscribe);
+      socketInstance.emit('unsubscribe', { sections });
     };
   },
 